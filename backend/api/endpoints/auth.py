@@ -1,13 +1,19 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Response, status
 from pydantic import BaseModel, EmailStr
 from typing import Optional
 import jwt
 import datetime
-from django.contrib.auth import authenticate
+import uuid
 from django.contrib.auth.models import User
 from django.conf import settings
+from django.db import transaction
 from core.models import AppUser
-from asgiref.sync import sync_to_async
+from core.executors import ExecutorSaturated, orm_executor
+from core.passwords import aauthenticate, ahash_password
+from api.services.principals import Principal, aresolve_app_user, current_user, principal_cache
+from api.services.refresh_tokens import (
+    REFRESH_TOKEN_LIFETIME, RefreshTokenReused, RefreshTokenRevoked, legacy_token_ids, refresh_token_store
+)
 
 router = APIRouter()
 
@@ -41,24 +47,37 @@ def create_access_token(data: dict):
     to_encode.update({"exp": expire, "type": "access"})
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm="HS256")
 
-def create_refresh_token(data: dict):
+def create_refresh_token(data: dict, family: Optional[str] = None):
+    """Single-use refresh token; ``family`` continues a rotation chain, None starts one."""
     to_encode = data.copy()
-    expire = datetime.datetime.utcnow() + datetime.timedelta(days=7)
-    to_encode.update({"exp": expire, "type": "refresh"})
+    expire = datetime.datetime.utcnow() + REFRESH_TOKEN_LIFETIME
+    to_encode.update({
+        "exp": expire, "type": "refresh", "jti": uuid.uuid4().hex, "fam": family or uuid.uuid4().hex
+    })
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm="HS256")
 
-def get_app_user_by_email(email: str):
-    """Get AppUser by email, returns None if not found"""
+def decode_refresh_token(token: str):
     try:
-        return AppUser.objects.get(email=email)
-    except AppUser.DoesNotExist:
-        return None
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token expired")
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if payload.get("type") != "refresh":
+        raise HTTPException(status_code=401, detail="Invalid token type")
+    # Tokens issued before rotation get ids derived from the token, so they are single-use too
+    if not payload.get("jti") or not payload.get("fam"):
+        payload["jti"], payload["fam"] = legacy_token_ids(token)
+    return payload
 
 # Endpoints
 @router.post("/login", response_model=TokenResponse)
-def login(request: LoginRequest):
-    # Try to authenticate with Django
-    user = authenticate(username=request.username, password=request.password)
+async def login(request: LoginRequest):
+    # Authenticate against Django users; the hash check runs on the password pool
+    try:
+        user = await aauthenticate(request.username, request.password)
+    except ExecutorSaturated:
+        raise HTTPException(status_code=503, detail="Server busy, please retry")
     
     if not user:
         raise HTTPException(
@@ -68,7 +87,7 @@ def login(request: LoginRequest):
         )
     
     # Get the AppUser to include the correct user_id
-    app_user = get_app_user_by_email(user.email)
+    app_user = await aresolve_app_user(user)
     app_user_id = app_user.user_id if app_user else user.id
     
     access_token = create_access_token({
@@ -88,31 +107,45 @@ def login(request: LoginRequest):
         "token_type": "bearer"
     }
 
-@router.post("/register", response_model=TokenResponse)
-def register(request: RegisterRequest):
-    # Check if user exists
-    if User.objects.filter(username=request.username).exists():
-        raise HTTPException(status_code=400, detail="Username already exists")
-    
-    if User.objects.filter(email=request.email).exists():
-        raise HTTPException(status_code=400, detail="Email already registered")
-
-    # Create Django User
-    user = User.objects.create_user(
-        username=request.username,
-        email=request.email,
-        password=request.password
-    )
-    
-    # Create AppUser (Business Entity)
-    try:
+def registration_conflict(username, email):
+    if User.objects.filter(username=username).exists():
+        return "Username already exists"
+    if User.objects.filter(email=email).exists():
+        return "Email already registered"
+    return None
+
+def create_account(request: RegisterRequest, encoded_password):
+    """Django User (as create_user() would make it) and its AppUser profile, together or not at all."""
+    with transaction.atomic():
+        user = User.objects.create(
+            username=User.normalize_username(request.username),
+            email=User.objects.normalize_email(request.email),
+            password=encoded_password
+        )
         app_user = AppUser.objects.create(
             name=request.full_name,
             email=request.email,
-            phone=request.phone
+            phone=request.phone,
+            account=user
         )
+    return user, app_user
+
+@router.post("/register", response_model=TokenResponse)
+async def register(request: RegisterRequest):
+    # Check if user exists, then hash on the password pool
+    try:
+        conflict = await orm_executor.run(registration_conflict, request.username, request.email)
+        if conflict:
+            raise HTTPException(status_code=400, detail=conflict)
+        encoded_password = await ahash_password(request.password)
+    except ExecutorSaturated:
+        raise HTTPException(status_code=503, detail="Server busy, please retry")
+
+    try:
+        user, app_user = await orm_executor.run(create_account, request, encoded_password)
+    except ExecutorSaturated:
+        raise HTTPException(status_code=503, detail="Server busy, please retry")
     except Exception as e:
-        user.delete()
         raise HTTPException(status_code=500, detail=f"Failed to create user profile: {str(e)}")
 
     # Use the AppUser's user_id in the token
@@ -134,71 +167,63 @@ def register(request: RegisterRequest):
     }
 
 @router.post("/refresh", response_model=TokenResponse)
-def refresh_token(refresh_token: str):
+async def refresh_token(refresh_token: str):
+    """
+    Rotate a refresh token: the presented token is spent and the new pair
+    continues its family. Replaying a spent token revokes the family.
+    """
+    payload = decode_refresh_token(refresh_token)
+    username = payload.get("sub")
+    user_id = payload.get("user_id")
+    django_user_id = payload.get("django_user_id", user_id)
+    family = payload["fam"]
+
+    # Verify user exists
+    if await principal_cache.aget(django_user_id) is None:
+        raise HTTPException(status_code=401, detail="User not found")
+
+    expires_at = datetime.datetime.fromtimestamp(payload["exp"], tz=datetime.timezone.utc)
     try:
-        payload = jwt.decode(refresh_token, settings.SECRET_KEY, algorithms=["HS256"])
-        if payload.get("type") != "refresh":
-             raise HTTPException(status_code=401, detail="Invalid token type")
-        
-        username = payload.get("sub")
-        user_id = payload.get("user_id")
-        django_user_id = payload.get("django_user_id", user_id)
-        
-        # Verify user exists
-        if not User.objects.filter(id=django_user_id).exists():
-            raise HTTPException(status_code=401, detail="User not found")
-            
-        new_access_token = create_access_token({
-            "sub": username, 
-            "user_id": user_id,
-            "django_user_id": django_user_id
-        })
-        new_refresh_token = create_refresh_token({
-            "sub": username, 
-            "user_id": user_id,
-            "django_user_id": django_user_id
-        })
-        
-        return {
-            "access_token": new_access_token, 
-            "refresh_token": new_refresh_token, 
-            "token_type": "bearer"
-        }
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(status_code=401, detail="Token expired")
-    except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-
-from fastapi.security import OAuth2PasswordBearer
+        await orm_executor.run(refresh_token_store.spend, payload["jti"], family, expires_at)
+    except ExecutorSaturated:
+        raise HTTPException(status_code=503, detail="Server busy, please retry")
+    except RefreshTokenReused:
+        raise HTTPException(status_code=401, detail="Refresh token already used, please log in again")
+    except RefreshTokenRevoked:
+        raise HTTPException(status_code=401, detail="Token revoked")
+
+    new_access_token = create_access_token({
+        "sub": username, 
+        "user_id": user_id,
+        "django_user_id": django_user_id
+    })
+    new_refresh_token = create_refresh_token({
+        "sub": username, 
+        "user_id": user_id,
+        "django_user_id": django_user_id
+    }, family=family)
+    
+    return {
+        "access_token": new_access_token, 
+        "refresh_token": new_refresh_token, 
+        "token_type": "bearer"
+    }
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
+@router.post("/logout", status_code=204)
+async def logout(refresh_token: str):
+    """Revoke the refresh token's whole family (access tokens run out on their own)."""
+    payload = decode_refresh_token(refresh_token)
+    try:
+        await orm_executor.run(refresh_token_store.revoke_family, payload["fam"])
+    except ExecutorSaturated:
+        raise HTTPException(status_code=503, detail="Server busy, please retry")
+    return Response(status_code=204)
 
 @router.get("/me", response_model=UserResponse)
-def get_me(token: str = Depends(oauth2_scheme)):
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-        username = payload.get("sub")
-        user_id = payload.get("user_id")  # This is now AppUser's ID
-        django_user_id = payload.get("django_user_id", user_id)
-        
-        if username is None:
-            raise HTTPException(status_code=401, detail="Invalid authentication credentials")
-    except jwt.PyJWTError:
-        raise HTTPException(status_code=401, detail="Invalid authentication credentials")
-    
-    # Get Django user for username/email
-    django_user = User.objects.filter(id=django_user_id).first()
-    if django_user is None:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    # Get AppUser for the full name
-    app_user = get_app_user_by_email(django_user.email)
-    full_name = app_user.name if app_user else django_user.get_full_name() or django_user.username
-    
+async def get_me(principal: Principal = Depends(current_user)):
     return {
-        "id": user_id,  # Return AppUser's ID for use in API calls
-        "username": django_user.username,
-        "email": django_user.email,
-        "full_name": full_name
+        "id": principal.user_id,  # Return AppUser's ID for use in API calls
+        "username": principal.username,
+        "email": principal.email,
+        "full_name": principal.full_name
     }
-
@@ -1,217 +1,159 @@
-from fastapi import APIRouter, HTTPException, Depends
-from pydantic import BaseModel
-from typing import Optional
-from datetime import datetime
-from core.models import Booking, Flight, AppUser, StatusLookup, Ticket, Payment, InsurancePolicy
+from fastapi import APIRouter, HTTPException, Depends, Header, Response
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from core.models import Flight, AppUser
+from api.services.bookings import create_booking_records, create_booking_batch
+from api.services.idempotency import get_idempotency_store, IdempotencyError, IdempotencyInProgress
+from api.services.principals import Principal, optional_current_user
+from api.services.seats import SEAT_LAYOUT, DEFAULT_CABIN, SeatsUnavailable
+from django.conf import settings
+from core.executors import offload, orm_executor
 from loguru import logger
-import os
 router = APIRouter()
-# Check if blockchain is enabled
-BLOCKCHAIN_ENABLED = os.environ.get('BLOCKCHAIN_ENABLED', 'False') == 'True'
-print(f"⚙️ STARTUP: BLOCKCHAIN_ENABLED env={os.environ.get('BLOCKCHAIN_ENABLED')}, result={BLOCKCHAIN_ENABLED}")  # DEBUG
-# Insurance plan configurations - percentage-based coverage
-INSURANCE_PLANS = {
-    "basic": {
-        "price": 15, 
-        "coverage_percentage": 0.30,  # 30% of ticket price
-        "threshold": 180  # 3 hours
-    },
-    "standard": {
-        "price": 25, 
-        "coverage_percentage": 0.60,  # 60% of ticket price
-        "threshold": 120  # 2 hours
-    },
-    "premium": {
-        "price": 45, 
-        "coverage_percentage": 1.00,  # 100% of ticket price
-        "threshold": 60  # 1 hour
-    },
-}
 class CreateBookingRequest(BaseModel):
     user_id: int
     flight_id: int
     with_insurance: bool
     insurance_plan_id: Optional[str] = None  # "basic", "standard", "premium"
+    cabin: Optional[str] = DEFAULT_CABIN  # "economy", "business"
+class BatchBookingRequest(BaseModel):
+    bookings: List[CreateBookingRequest] = Field(..., min_length=1, max_length=500)
+def run_idempotent(scope, caller_id, idempotency_key, request, response, handler):
+    """
+    Run ``handler(claim)`` once per caller and Idempotency-Key; retries get the
+    stored response. ``claim`` is None for requests without a key.
+    """
+    if not idempotency_key:
+        return handler(None)
+    try:
+        body, replayed = get_idempotency_store().execute(
+            scope, caller_id, idempotency_key, request.model_dump(), handler
+        )
+    except IdempotencyError as e:
+        headers = {"Retry-After": "1"} if isinstance(e, IdempotencyInProgress) else None
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers=headers)
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return body
+
+
 @router.post("/")
-def create_booking(request: CreateBookingRequest):
-    print(f"🎫 BOOKING REQUEST: user={request.user_id}, flight={request.flight_id}, insurance={request.with_insurance}, plan={request.insurance_plan_id}")  # DEBUG
-    
-    # 1. Validate inputs
+@offload(orm_executor)
+def create_booking(
+    request: CreateBookingRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    principal: Optional[Principal] = Depends(optional_current_user),
+):
+    # Keys belong to the signed-in caller, else to the passenger being booked
+    caller_id = principal.user_id if principal else request.user_id
+    return run_idempotent(
+        "bookings.create", caller_id, idempotency_key, request, response,
+        lambda claim: _create_booking(request, claim)
+    )
+
+
+def booking_response(result):
+    policy_id = result.policy.policyId if result.policy else None
+    blockchain_status = result.issuance.state if result.issuance else None
+    return {
+        "status": "success",
+        "booking_id": result.booking.bookingId,
+        "policy_id": policy_id,
+        "seat_number": result.ticket.seatNumber,
+        "blockchain_tx_hash": None,
+        "blockchain_policy_id": None,
+        "blockchain_status": blockchain_status,
+        "query_count": result.query_count,
+        "message": "Booking confirmed successfully" +
+                   (" - blockchain insurance is being issued" if blockchain_status else "")
+    }
+
+
+def _create_booking(request: CreateBookingRequest, claim=None):
+    logger.info(f"🎫 BOOKING REQUEST: user={request.user_id}, flight={request.flight_id}, insurance={request.with_insurance}, plan={request.insurance_plan_id}")
+
+    cabin = request.cabin or DEFAULT_CABIN
+    if cabin not in SEAT_LAYOUT:
+        raise HTTPException(status_code=400, detail=f"Unknown cabin '{cabin}'")
+
+    # 1. Validate and write booking, ticket, payment and policy in one transaction
     try:
-        user = AppUser.objects.get(user_id=request.user_id)
-        flight = Flight.objects.get(flightId=request.flight_id)
+        result = create_booking_records(
+            request.user_id,
+            request.flight_id,
+            request.with_insurance,
+            request.insurance_plan_id,
+            issue_on_chain=settings.BLOCKCHAIN_ENABLED,
+            cabin=cabin,
+            # The key is completed in the booking's own transaction (replays report no query_count)
+            before_commit=(lambda result: claim.complete(booking_response(result))) if claim else None
+        )
     except AppUser.DoesNotExist:
         raise HTTPException(status_code=404, detail="User not found")
     except Flight.DoesNotExist:
         raise HTTPException(status_code=404, detail="Flight not found")
-    # 2. Get Statuses (Case insensitive fallback)
-    # Note: code field is unique in StatusLookup, so we get whatever 'Completed' exists
-    try:
-        confirmed = StatusLookup.objects.filter(code__iexact='Confirmed').first()
-        if not confirmed:
-             confirmed = StatusLookup.objects.create(code='Confirmed', statusType='booking')
-             
-        # Use existing 'Completed' status (code is unique, can't have multiple)
-        completed = StatusLookup.objects.filter(code__iexact='Completed').first()
-        if not completed:
-             completed = StatusLookup.objects.create(code='Completed', statusType='payment')
-
-
-
-
-        active_policy = StatusLookup.objects.filter(code__iexact='Active').first()
-        if not active_policy:
-             active_policy = StatusLookup.objects.create(code='Active', statusType='policy')
-    except Exception as e:
-        # Fallback for dev if seed didn't run or different naming
-        raise HTTPException(status_code=500, detail=f"System configuration error: {e}")
-    # 3. Get insurance plan details if insurance is requested
-    insurance_premium = 0
-    insurance_coverage = 0
-    delay_threshold = 180  # Default 3 hours
-    
-    if request.with_insurance and request.insurance_plan_id:
-        plan = INSURANCE_PLANS.get(request.insurance_plan_id)
-        if plan:
-            insurance_premium = plan["price"]
-            # Calculate coverage as percentage of ticket price
-            # Flight model has no price field, use default base price
-            ticket_price = 250.00  # Default ticket price
-            insurance_coverage = ticket_price * plan["coverage_percentage"]
-            delay_threshold = plan["threshold"]
-        else:
-            # Default to standard if plan not found
-            insurance_premium = 25
-            ticket_price = 250.00
-            insurance_coverage = ticket_price * 0.60  # 60% of ticket
-            delay_threshold = 120
-    # 4. Create Booking
-    booking = Booking.objects.create(
-        user=user,
-        flight=flight,
-        bookingDate=datetime.now(),
-        status=confirmed
-    )
-    # 5. Create Ticket
-    ticket = Ticket.objects.create(
-        booking=booking,
-        seatNumber="12A", # Placeholder logic
-        company="Global Air",
-        price=250.00,
-        issueDate=datetime.now(),
-        isPremium=False
-    )
-    # 6. Create Payment
-    total_amount = 250.00 # Base Fare
-    if request.with_insurance:
-        total_amount += insurance_premium
-    
-    Payment.objects.create(
-        booking=booking,
-        amount=total_amount,
-        paymentMethod="Credit Card",
-        paymentDate=datetime.now(),
-        status=completed
+    except SeatsUnavailable as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    # 2. On-chain issuance happens in the background via the outbox worker;
+    #    poll GET /api/policies/{policy_id}/issuance for the result.
+    return booking_response(result)
+
+
+@router.post("/batch")
+@offload(orm_executor)
+def create_booking_batch_endpoint(
+    request: BatchBookingRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    principal: Optional[Principal] = Depends(optional_current_user),
+):
+    """Group booking: one request, constant number of queries, per-item results."""
+    return run_idempotent(
+        "bookings.batch", principal.user_id if principal else 0, idempotency_key, request, response,
+        lambda claim: _create_booking_batch(request, claim)
     )
-    # 7. Create Insurance (if requested)
-    policy_id = None
-    blockchain_tx_hash = None
-    blockchain_policy_id = None
-    
-    if request.with_insurance:
-        # Create database policy
-        policy = InsurancePolicy.objects.create(
-            booking=booking,
-            coverageAmount=insurance_coverage,
-            premium=insurance_premium,
-            status=active_policy
-        )
-        policy_id = policy.policyId
-        
-        # 8. NEW: Call blockchain smart contract
-        if BLOCKCHAIN_ENABLED:
-            print(f"🔗 BLOCKCHAIN_ENABLED={BLOCKCHAIN_ENABLED}")  # DEBUG
-            try:
-                from blockchain.contract_loader import (
-                    get_insurance_contract, 
-                    get_default_account,
-                    w3
-                )
-                
-                print("📦 Blockchain modules imported successfully")  # DEBUG
-                
-                contract = get_insurance_contract()
-                account = get_default_account()
-                
-                print(f"📍 Contract: {contract is not None}, Account: {account}")  # DEBUG
-                
-                if contract and account and w3:
-                    # Convert amounts to Wei (blockchain format)
-                    premium_wei = w3.to_wei(insurance_premium, 'ether')
-                    payout_wei = w3.to_wei(insurance_coverage, 'ether')
-                    
-                    # For demo: use a fixed flight ID that we know exists
-                    # In production, flights would be properly synced between DB and blockchain
-                    demo_flight_id = "DEMO_FLIGHT"
-                    
-                    print(f"💰 Calling buyPolicy: flight={demo_flight_id} (DB: {flight.flightId}), premium={premium_wei}, payout={payout_wei}")  # DEBUG
-                    
-                    # Step 1: Approve insurance contract to spend tokens (ERC20 approval)
-                    from blockchain.contract_loader import get_token_contract
-                    token_contract = get_token_contract()
-                    if token_contract:
-                        print("🔓 Approving token spend...")
-                        approve_tx = token_contract.functions.approve(
-                            contract.address,  # spender (insurance contract)
-                            premium_wei        # amount to approve
-                        ).transact({'from': account})
-                        w3.eth.wait_for_transaction_receipt(approve_tx)
-                        print("✅ Token approval granted!")
-                    
-                    # Step 2: Call buyPolicy on smart contract
-                    print("📝 Calling buyPolicy on smart contract...")
-                    tx_hash = contract.functions.buyPolicy(
-                        demo_flight_id,          # flightId - using demo flight for now
-                        ticket.ticketId,         # ticketId
-                        booking.bookingId,       # bookingId  
-                        delay_threshold,         # delayThresholdMinutes
-                        premium_wei,             # premiumAmount
-                        payout_wei               # payoutAmount
-                    ).transact({'from': account})
-                    
-                    # Wait for transaction receipt
-                    receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-                    
-                    # Get blockchain policy ID from event logs
-                    event = contract.events.PolicyCreated().process_receipt(receipt)
-                    if event:
-                        blockchain_policy_id = event[0]['args']['policyId']
-                    
-                    blockchain_tx_hash = tx_hash.hex()
-                    
-                    # Save blockchain data to database
-                    policy.blockchainPolicyId = blockchain_policy_id
-                    policy.blockchainTxHash = blockchain_tx_hash
-                    policy.save()
-                    print(f"💾 Saved blockchain IDs to database!")  # DEBUG
-                    
-                    print(f"✅ SUCCESS! TX={blockchain_tx_hash}, PolicyID={blockchain_policy_id}")  # DEBUG
-                    logger.info(f"✅ Blockchain policy created: TX={blockchain_tx_hash}, PolicyID={blockchain_policy_id}")
-                else:
-                    print(f"⚠️ Missing: contract={contract is not None}, account={account}, w3={w3 is not None}")  # DEBUG
-                    logger.warning("⚠️ Blockchain not available, policy saved to database only")
-                    
-            except Exception as e:
-                # Blockchain integration failed - policy still in database
-                print(f"❌ EXCEPTION: {type(e).__name__}: {e}")  # DEBUG
-                logger.error(f"❌ Blockchain integration failed: {e}")
-                logger.warning(f"   Policy {policy_id} saved to database only (graceful fallback)")
+
+
+def batch_response(results, query_count):
+    items = []
+    for item in results:
+        if item.error:
+            items.append({"index": item.index, "status": "error", "detail": item.error})
+            continue
+        result = item.result
+        items.append({
+            "index": item.index,
+            "status": "success",
+            "booking_id": result.booking.bookingId,
+            "ticket_id": result.ticket.ticketId,
+            "seat_number": result.ticket.seatNumber,
+            "policy_id": result.policy.policyId if result.policy else None,
+            "blockchain_status": result.issuance.state if result.issuance else None,
+        })
+
+    succeeded = sum(1 for item in items if item["status"] == "success")
     return {
-        "status": "success",
-        "booking_id": booking.bookingId,
-        "policy_id": policy_id,
-        "blockchain_tx_hash": blockchain_tx_hash,
-        "blockchain_policy_id": blockchain_policy_id,
-        "message": "Booking confirmed successfully" + 
-                   (" with blockchain insurance" if blockchain_tx_hash else "")
+        "status": "success" if succeeded == len(items) else "partial",
+        "total": len(items),
+        "succeeded": succeeded,
+        "failed": len(items) - succeeded,
+        "query_count": query_count,
+        "results": items,
     }
+
+
+def _create_booking_batch(request: BatchBookingRequest, claim=None):
+    logger.info(f"🎫 BATCH BOOKING REQUEST: {len(request.bookings)} items")
+
+    unknown = {item.cabin for item in request.bookings if item.cabin and item.cabin not in SEAT_LAYOUT}
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown cabin(s): {', '.join(sorted(unknown))}")
+
+    results, query_count = create_booking_batch(
+        request.bookings,
+        issue_on_chain=settings.BLOCKCHAIN_ENABLED,
+        before_commit=(lambda results: claim.complete(batch_response(results, None))) if claim else None
+    )
+    return batch_response(results, query_count)
@@ -1,12 +1,40 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List
+from fastapi import APIRouter, HTTPException, Header, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import Dict, List, Optional
 from pydantic import BaseModel, ConfigDict
-from datetime import datetime
-from core.models import Flight, StatusLookup
-from asgiref.sync import sync_to_async
+from datetime import datetime, time, timedelta
+import asyncio
+import csv
+import io
+import json
+from django.conf import settings
+from django.utils import timezone
+from django.db.models import F
+from core.models import Flight
+from core.airports import codes_for_query, get_airport_trie
+from api.services.seats import get_availability, with_seats_available
+from api.services.pagination import decode_cursor, keyset_after, paginate, InvalidCursor
+from api.services.response_cache import conditional_response, flight_response_cache
+from api.services.serializers import Projection
+from core.cache_versions import FLIGHTS_SCOPE, flight_scope, get_version
+from core.executors import ExecutorSaturated, offload, orm_executor
+from core.flight_events import flight_status_broker
 
 router = APIRouter()
 
+FLIGHT_PAGE_KEY = ('departureTime', 'flightId')
+
+# Exactly the FlightSchema fields, fetched as one values_list row per flight
+FLIGHT_LIST_PROJECTION = Projection(
+    flightId='flightId',
+    origin='origin',
+    destination='destination',
+    departureTime='departureTime',
+    arrivalTime='arrivalTime',
+    status_code='status__code',
+    seats_available='seats_available',
+)
+
 class FlightSchema(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     flightId: int
@@ -15,54 +43,296 @@ class FlightSchema(BaseModel):
     departureTime: datetime
     arrivalTime: datetime
     status_code: str = None
+    seats_available: Optional[int] = None
+
+class AirportSchema(BaseModel):
+    code: str
+    city: str
+    name: str
+    country: str
+
+class CabinAvailability(BaseModel):
+    capacity: int
+    available: int
+
+class FlightAvailabilitySchema(BaseModel):
+    flightId: int
+    seats_available: int
+    cabins: Dict[str, CabinAvailability]
+
+def to_flight_schema(f):
+    return FlightSchema(
+        flightId=f.flightId,
+        origin=f.origin,
+        destination=f.destination,
+        departureTime=f.departureTime,
+        arrivalTime=f.arrivalTime,
+        status_code=f.status.code,
+        seats_available=f.seats_available
+    )
+
+def filter_airport(queryset, field, term):
+    """
+    Filter on the indexed IATA code column when ``term`` names a known
+    airport or city; otherwise fall back to a free-text match (trigram
+    indexed on Postgres).
+    """
+    codes = codes_for_query(term)
+    if codes:
+        return queryset.filter(**{f"{field}Code__in": codes})
+    return queryset.filter(**{f"{field}__icontains": term.strip()})
+
+def parse_date(date):
+    """YYYY-MM-DD -> date; invalid dates are ignored (None)."""
+    if not date:
+        return None
+    try:
+        return datetime.strptime(date, "%Y-%m-%d").date()
+    except ValueError:
+        return None
 
-    @staticmethod
-    def resolve_status_code(obj):
-        return obj.status.code
+def departure_day_range(target_date):
+    """
+    Half-open ``[day start, next day start)`` filter for flights departing on
+    ``target_date`` (current time zone). Unlike ``departureTime__date`` it
+    compares the bare column, so the departureTime indexes can be used.
+    """
+    start = timezone.make_aware(datetime.combine(target_date, time.min))
+    return {"departureTime__gte": start, "departureTime__lt": start + timedelta(days=1)}
+
+def filter_flights(queryset, origin, destination, target_date):
+    if origin:
+        queryset = filter_airport(queryset, 'origin', origin)
+    if destination:
+        queryset = filter_airport(queryset, 'destination', destination)
+    if target_date:
+        queryset = queryset.filter(**departure_day_range(target_date))
+    return queryset
 
 @router.get("/", response_model=List[FlightSchema])
-def get_flights(origin: str = None, destination: str = None, date: str = None):
-    queryset = Flight.objects.select_related('status').all().order_by('departureTime')
-    
-    if origin and origin.strip():
-        queryset = queryset.filter(origin__icontains=origin)
-    
-    if destination and destination.strip():
-        queryset = queryset.filter(destination__icontains=destination)
-        
-    if date:
-        # Simple date filtering (assuming YYYY-MM-DD)
-        # Filters for flights departing on that day
+@offload(orm_executor)
+def get_flights(
+    request: Request,
+    origin: str = None,
+    destination: str = None,
+    date: str = None,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's Link header"),
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    Flights ordered by departure, paged by keyset on (departureTime, flightId).
+
+    The body stays a plain list; the next page is advertised in a
+    ``Link: <...>; rel="next"`` header (and ``X-Next-Cursor``). Responses
+    carry a strong ETag and are served from the response cache (or as 304)
+    until a flight, its status or its seat counts change.
+    """
+    cursor_values = None
+    if cursor:
         try:
-            target_date = datetime.strptime(date, "%Y-%m-%d").date()
-            queryset = queryset.filter(departureTime__date=target_date)
-        except ValueError:
-            pass # Ignore invalid dates
-
-    flights = queryset[:50]
-    results = []
-    for f in flights:
-        results.append(FlightSchema(
-            flightId=f.flightId,
-            origin=f.origin,
-            destination=f.destination,
-            departureTime=f.departureTime,
-            arrivalTime=f.arrivalTime,
-            status_code=f.status.code
-        ))
-    return results
+            cursor_values = decode_cursor(cursor, (datetime.fromisoformat, int))
+        except InvalidCursor:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
 
-@router.get("/{flight_id}", response_model=FlightSchema)
-def get_flight(flight_id: int):
-    try:
-        f = Flight.objects.select_related('status').get(flightId=flight_id)
-        return FlightSchema(
-            flightId=f.flightId,
-            origin=f.origin,
-            destination=f.destination,
-            departureTime=f.departureTime,
-            arrivalTime=f.arrivalTime,
-            status_code=f.status.code
+    target_date = parse_date(date)
+    origin = origin.strip() if origin else ""
+    destination = destination.strip() if destination else ""
+    cache_key = ("list", origin.lower(), destination.lower(), target_date, limit, cursor)
+    version = get_version(FLIGHTS_SCOPE)
+    entry = flight_response_cache.get(cache_key, version)
+    if entry is None:
+        queryset = filter_flights(with_seats_available(Flight.objects.all()), origin, destination, target_date)
+        results, next_cursor = paginate(
+            queryset, FLIGHT_PAGE_KEY, cursor_values, limit, projection=FLIGHT_LIST_PROJECTION
+        )
+        entry = flight_response_cache.put(
+            cache_key, version, results, {"X-Next-Cursor": next_cursor} if next_cursor else None
         )
-    except Flight.DoesNotExist:
-        raise HTTPException(status_code=404, detail="Flight not found")
+
+    extra_headers = {}
+    if "X-Next-Cursor" in entry.headers:
+        next_url = request.url.include_query_params(cursor=entry.headers["X-Next-Cursor"])
+        extra_headers["Link"] = f'<{next_url}>; rel="next"'
+    return conditional_response(entry, if_none_match, extra_headers)
+
+EXPORT_FIELDS = [
+    'flightId', 'origin', 'originCode', 'destination', 'destinationCode',
+    'departureTime', 'arrivalTime', 'status_code', 'seats_available',
+]
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "flights.ndjson"),
+    "csv": ("text/csv", "flights.csv"),
+}
+
+def _export_chunk(queryset, after, chunk_size):
+    if after is not None:
+        queryset = queryset.filter(keyset_after(FLIGHT_PAGE_KEY, after))
+    return list(queryset[:chunk_size])
+
+async def _export_rows(queryset, fmt, chunk_size, first_chunk):
+    """
+    Encode the export one keyset chunk at a time, one yield per chunk.
+
+    Each chunk is a separate ``(departureTime, flightId) > last row`` range
+    query on the ORM pool, so a long export never pins a thread or a cursor
+    and only one chunk is ever held in memory.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == "csv" else None
+    if writer:
+        writer.writerow(EXPORT_FIELDS)
+    rows = first_chunk
+    while rows:
+        after = [rows[-1][field] for field in FLIGHT_PAGE_KEY]
+        for row in rows:
+            row['departureTime'] = row['departureTime'].isoformat()
+            row['arrivalTime'] = row['arrivalTime'].isoformat()
+            if writer:
+                writer.writerow([row[name] for name in EXPORT_FIELDS])
+            else:
+                buffer.write(json.dumps(row, separators=(',', ':')))
+                buffer.write("\n")
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        if len(rows) < chunk_size:
+            return
+        while True:
+            try:
+                rows = await orm_executor.run(_export_chunk, queryset, after, chunk_size)
+                break
+            except ExecutorSaturated:
+                # The status line is already sent: wait for room instead of failing
+                await asyncio.sleep(0.05)
+    if buffer.tell():
+        yield buffer.getvalue()
+
+@router.get("/export")
+async def export_flights(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    origin: str = None,
+    destination: str = None,
+    date: str = None
+):
+    """
+    Stream every matching flight (no page limit) as NDJSON or CSV.
+
+    Rows are read in keyset chunks of ``FLIGHT_EXPORT_CHUNK_SIZE`` rather
+    than from one ``iterator(chunk_size=...)`` server-side cursor: a cursor
+    is bound to the thread and connection that opened it, so it would hold
+    an ORM pool worker for as long as the slowest client takes to download.
+    Memory stays flat either way, one chunk at a time.
+    """
+    queryset = filter_flights(
+        with_seats_available(Flight.objects.all()),
+        origin.strip() if origin else "",
+        destination.strip() if destination else "",
+        parse_date(date)
+    ).annotate(status_code=F('status__code')).order_by(*FLIGHT_PAGE_KEY).values(*EXPORT_FIELDS)
+    chunk_size = settings.FLIGHT_EXPORT_CHUNK_SIZE
+    # Fetched before the response starts, so a saturated pool is still a clean 503
+    first_chunk = await orm_executor.run(_export_chunk, queryset, None, chunk_size)
+    media_type, filename = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        _export_rows(queryset, format, chunk_size, first_chunk),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+def parse_flight_ids(flight_ids):
+    """'1,2,3' -> {1, 2, 3}; raises 400 for anything else."""
+    try:
+        ids = {int(part) for part in flight_ids.split(",") if part.strip()}
+    except ValueError:
+        raise HTTPException(status_code=400, detail="flight_ids must be a comma-separated list of integers")
+    if not ids:
+        raise HTTPException(status_code=400, detail="flight_ids is required")
+    if len(ids) > settings.FLIGHT_STREAM_MAX_FLIGHTS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.FLIGHT_STREAM_MAX_FLIGHTS} flights per stream")
+    return ids
+
+def flight_statuses(flight_ids):
+    return dict(Flight.objects.filter(flightId__in=flight_ids).values_list('flightId', 'status__code'))
+
+def sse_event(event, data, event_id=None):
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines += [f"event: {event}", f"data: {json.dumps(data, separators=(',', ':'))}"]
+    return "\n".join(lines) + "\n\n"
+
+@router.get("/stream")
+async def stream_flight_status(
+    request: Request,
+    flight_ids: str = Query(..., description="Comma-separated flight IDs, e.g. 1,2,3")
+):
+    """
+    Server-Sent Events feed of status changes for the given flights.
+
+    Sends a ``snapshot`` event with the current statuses, then one ``status``
+    event per change (``{"flightId", "status", "previous", "at"}``), with
+    comment heartbeats in between so proxies keep the connection open.
+    """
+    ids = parse_flight_ids(flight_ids)
+    current = await orm_executor.run(flight_statuses, ids)
+    subscription = flight_status_broker.subscribe(ids, current)
+
+    async def events():
+        try:
+            yield sse_event("snapshot", [{"flightId": k, "status": v} for k, v in sorted(current.items())])
+            while not await request.is_disconnected():
+                event = await subscription.get(timeout=settings.FLIGHT_STREAM_HEARTBEAT_SECONDS)
+                if event is None:
+                    yield ": keep-alive\n\n"
+                else:
+                    yield sse_event("status", event.to_dict(), event.id)
+        finally:
+            subscription.close()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/airports", response_model=List[AirportSchema])
+async def search_airports(
+    prefix: str = Query(..., min_length=1, max_length=50),
+    limit: int = Query(10, ge=1, le=50)
+):
+    """Autocomplete for the search box; served from memory, no DB access."""
+    return [
+        AirportSchema(code=code, city=city, name=name, country=country)
+        for code, city, name, country in get_airport_trie().search(prefix, limit)
+    ]
+
+@router.get("/{flight_id}", response_model=FlightSchema)
+@offload(orm_executor)
+def get_flight(flight_id: int, if_none_match: Optional[str] = Header(None)):
+    cache_key = ("detail", flight_id)
+    version = get_version(flight_scope(flight_id))
+    entry = flight_response_cache.get(cache_key, version)
+    if entry is None:
+        try:
+            f = with_seats_available(Flight.objects.select_related('status')).get(flightId=flight_id)
+        except Flight.DoesNotExist:
+            raise HTTPException(status_code=404, detail="Flight not found")
+        entry = flight_response_cache.put(cache_key, version, to_flight_schema(f))
+    return conditional_response(entry, if_none_match)
+
+@router.get("/{flight_id}/availability", response_model=FlightAvailabilitySchema)
+@offload(orm_executor)
+def get_flight_availability(flight_id: int, if_none_match: Optional[str] = Header(None)):
+    cache_key = ("availability", flight_id)
+    version = get_version(flight_scope(flight_id))
+    entry = flight_response_cache.get(cache_key, version)
+    if entry is None:
+        if not Flight.objects.filter(flightId=flight_id).exists():
+            raise HTTPException(status_code=404, detail="Flight not found")
+        cabins = get_availability(flight_id)
+        entry = flight_response_cache.put(cache_key, version, {
+            "flightId": flight_id,
+            "seats_available": sum(c["available"] for c in cabins.values()),
+            "cabins": cabins,
+        })
+    return conditional_response(entry, if_none_match)
@@ -1,9 +1,18 @@
-from fastapi import APIRouter, HTTPException, Query
-from typing import List, Optional
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from typing import Annotated, Dict, List, Optional
 from datetime import datetime
-from pydantic import BaseModel
-from django.db.models import Q
-from core.models import InsurancePolicy, Payment, InsuranceClaim, AppUser, StatusLookup, Ticket
+from pydantic import BaseModel, Field
+from core.models import InsurancePolicy, Payment, InsuranceClaim, Ticket, PolicyIssuanceOutbox, Flight, PolicySummary
+from core.executors import offload, orm_executor
+from core.policy_summary import (
+    TICKET_PROJECTION, calculate_duration, first_rows_by_booking, fmt_date, fmt_datetime, fmt_time
+)
+from api.services.ledger import CLAIM, LEDGER_CURSOR_PARSERS, PAYMENT, day_bounds, ledger_page
+from api.services.pagination import decode_cursor, InvalidCursor
+from api.services.response_cache import conditional_response
+from api.services.serializers import Projection, dumps
+from api.services.user_cache import user_response_cache
+from api.services.insurance_plans import public_plans, quote_matrix, PLAN_IDS, BASE_TICKET_PRICE
 
 router = APIRouter()
 
@@ -71,246 +80,292 @@ class TransactionResponse(BaseModel):
     payoutCalculation: Optional[str] = None
     coverage_amount: Optional[str] = None
 
+class PolicyIssuanceResponse(BaseModel):
+    policy_id: int
+    state: str  # "issuing" | "issued" | "failed" | "database_only"
+    attempts: int = 0
+    blockchain_policy_id: Optional[int] = None
+    blockchain_tx_hash: Optional[str] = None
+    last_error: Optional[str] = None
+
 @router.get("/plans")
 def get_plans():
-    return [
-        {
-            "id": "basic",
-            "name": "Basic Protection",
-            "price": 15,
-            "coverage_percentage": 30,  # 30% of ticket price
-            "features": [
-                "Delays over 3 hours",
-                "30% of ticket price payout",
-                "Automatic processing",
-            ],
-            "delay": "3+ hours",
-        },
-        {
-            "id": "standard",
-            "name": "Standard Protection",
-            "price": 25,
-            "coverage_percentage": 60,  # 60% of ticket price
-            "features": [
-                "Delays over 2 hours",
-                "60% of ticket price payout",
-                "Automatic processing",
-                "Cancellation coverage",
-            ],
-            "recommended": True,
-            "delay": "2+ hours",
-        },
-        {
-            "id": "premium",
-            "name": "Premium Protection",
-            "price": 45,
-            "coverage_percentage": 100,  # 100% of ticket price
-            "features": [
-                "Delays over 1 hour",
-                "100% of ticket price payout",
-                "Automatic processing",
-                "Cancellation coverage",
-                "Baggage protection",
-            ],
-            "delay": "1+ hour",
-        },
-    ]
+    return public_plans()
+
+class QuoteRequest(BaseModel):
+    flight_ids: List[int] = Field(..., min_length=1, max_length=1000)
+    # Optional per-flight fare; flights without one use the base ticket price
+    ticket_prices: Optional[Dict[int, Annotated[float, Field(gt=0, allow_inf_nan=False)]]] = Field(
+        None, max_length=1000
+    )
+
+@router.post("/quote")
+@offload(orm_executor)
+def quote_policies(request: QuoteRequest):
+    """Price every plan for a whole search result (N flights x plans) in one call."""
+    flight_ids = list(dict.fromkeys(request.flight_ids))
+    known = set(Flight.objects.filter(flightId__in=flight_ids).values_list('flightId', flat=True))
+    quoted_ids = [flight_id for flight_id in flight_ids if flight_id in known]
+
+    fares = request.ticket_prices or {}
+    ticket_prices = [fares.get(flight_id, BASE_TICKET_PRICE) for flight_id in quoted_ids]
+    premiums, coverages, thresholds = quote_matrix(ticket_prices)
+    premiums, coverages, thresholds = premiums.tolist(), coverages.tolist(), thresholds.tolist()
+
+    quotes = []
+    for row, flight_id in enumerate(quoted_ids):
+        quotes.append({
+            "flight_id": flight_id,
+            "ticket_price": ticket_prices[row],
+            "plans": {
+                plan_id: {
+                    "premium": premiums[row][col],
+                    "coverage": coverages[row][col],
+                    "delay_threshold_minutes": thresholds[row][col],
+                }
+                for col, plan_id in enumerate(PLAN_IDS)
+            },
+        })
+
+    return {
+        "plans": PLAN_IDS,
+        "quotes": quotes,
+        "unknown_flight_ids": [flight_id for flight_id in flight_ids if flight_id not in known],
+    }
 
-def calculate_duration(departure, arrival):
-    """Calculate flight duration as a string"""
-    if not departure or not arrival:
-        return "N/A"
-    delta = arrival - departure
-    hours = int(delta.total_seconds() // 3600)
-    minutes = int((delta.total_seconds() % 3600) // 60)
-    return f"{hours}h {minutes}m"
+PAYMENT_PROJECTION = Projection(
+    id='paymentId',
+    booking_id='booking_id',
+    amount='amount',
+    method='paymentMethod',
+    date='paymentDate',
+    status='status__code',
+    flight_id='booking__flight_id',
+    origin='booking__flight__origin',
+    destination='booking__flight__destination',
+    departure='booking__flight__departureTime',
+    arrival='booking__flight__arrivalTime',
+)
+BOOKING_POLICY_PROJECTION = Projection(
+    booking_id='booking_id', id='policyId', premium='premium', coverage='coverageAmount'
+)
+CLAIM_PROJECTION = Projection(
+    id='claimId',
+    payout='payoutAmount',
+    status='claimStatus',
+    delay='delayDuration',
+    date='claimDate',
+    policy_id='policy_id',
+    premium='policy__premium',
+    coverage='policy__coverageAmount',
+    flight_id='policy__booking__flight_id',
+    origin='policy__booking__flight__origin',
+    destination='policy__booking__flight__destination',
+    departure='policy__booking__flight__departureTime',
+    arrival='policy__booking__flight__arrivalTime',
+)
 
 @router.get("/mine", response_model=List[PolicyResponse])
-def get_my_policies(user_id: int = Query(1, description="User ID for testing")):
+@offload(orm_executor)
+def get_my_policies(
+    user_id: int = Query(1, description="User ID for testing"),
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    Served from the policy_summary read model: one indexed scan on
+    (user, policy) whose stored JSON rows are joined into the response.
+    Repeat loads come from the per-user response cache (or a 304) until
+    one of the user's bookings, payments or flights changes.
+    """
     try:
-        # User validation
-        try:
-            user = AppUser.objects.get(user_id=user_id)
-        except AppUser.DoesNotExist:
-             return [] # Or 404
-
-        # Fetch policies through Booking with related data
-        policies = InsurancePolicy.objects.filter(
-            booking__user=user
-        ).select_related(
-            'booking', 
-            'booking__flight', 
-            'booking__flight__status',
-            'status'
-        ).prefetch_related('booking__ticket_set', 'booking__payment_set')
-        
-        response = []
-        for p in policies:
-            booking = p.booking
-            flight = booking.flight
-            
-            # Get ticket details
-            ticket = booking.ticket_set.first()
-            ticket_price = str(ticket.price) if ticket else "0.00"
-            seat_number = ticket.seatNumber if ticket else "N/A"
-            airline = ticket.company if ticket else "Unknown Airline"
-            is_premium_seat = ticket.isPremium if ticket else False
-            
-            # Get payment details
-            payment = booking.payment_set.first()
-            total_paid = str(payment.amount) if payment else "0.00"
-            
-            # Calculate duration
-            duration = calculate_duration(flight.departureTime, flight.arrivalTime)
-            
-            response.append({
-                "id": p.policyId,
-                "user_id": user.user_id,
-                "flight_id": f"FL{flight.flightId}",
-                "premium_paid": str(p.premium),
-                "coverage_amount": str(p.coverageAmount),
-                "start_time": flight.departureTime.isoformat() if flight.departureTime else "",
-                "end_time": flight.arrivalTime.isoformat() if flight.arrivalTime else "",
-                "status": p.status.code.upper(),
-                "contract_address": "0x7a3F...8b2C",
-                # Flight details
-                "route": f"{flight.origin} → {flight.destination}",
-                "origin": flight.origin,
-                "destination": flight.destination,
-                "departure_date": flight.departureTime.strftime("%B %d, %Y") if flight.departureTime else "",
-                "departure_time_formatted": flight.departureTime.strftime("%I:%M %p") if flight.departureTime else "",
-                "arrival_date": flight.arrivalTime.strftime("%B %d, %Y") if flight.arrivalTime else "",
-                "arrival_time_formatted": flight.arrivalTime.strftime("%I:%M %p") if flight.arrivalTime else "",
-                "flight_duration": duration,
-                # Ticket details
-                "ticket_price": ticket_price,
-                "seat_number": seat_number,
-                "airline": airline,
-                "is_premium_seat": is_premium_seat,
-                # Booking details
-                "booking_id": booking.bookingId,
-                "booking_date": booking.bookingDate.strftime("%B %d, %Y at %I:%M %p") if booking.bookingDate else "",
-                "total_paid": total_paid,
-                # Passenger details
-                "passenger": user.name,
-                "email": user.email,
-                "phone": user.phone
-            })
-        return response
+        cache_key = user_response_cache.key("mine", user_id)
+        version = user_response_cache.version(user_id)
+        entry = user_response_cache.get(cache_key, version)
+        if entry is None:
+            payloads = policy_summary_payloads(user_id)
+            entry = user_response_cache.put(cache_key, version, ("[" + ",".join(payloads) + "]").encode())
+        return conditional_response(entry, if_none_match)
     except Exception as e:
         print(f"Error fetching policies: {e}")
         import traceback
         traceback.print_exc()
         return []
 
-@router.get("/transactions", response_model=List[TransactionResponse])
-def get_my_transactions(user_id: int = Query(1, description="User ID for testing")):
+def policy_summary_payloads(user_id):
+    return list(
+        PolicySummary.objects.filter(user_id=user_id).order_by('policy_id').values_list('payload', flat=True)
+    )
+
+def parse_ledger_date(value, name):
+    """YYYY-MM-DD -> date; anything else is a 400 (unlike the flight search)."""
+    if not value:
+        return None
     try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name}, expected YYYY-MM-DD")
+
+def payment_transaction(pay, ticket, policy):
+    departure, arrival = pay['departure'], pay['arrival']
+    # Determine transaction type: if payment method is "Blockchain Payout", it's a payout
+    is_payout = pay['method'] == "Blockchain Payout"
+    return {
+        "id": f"TX-PAY-{pay['id']}",
+        "type": "payout" if is_payout else "premium",
+        "amount": float(pay['amount']) if is_payout else -float(pay['amount']),  # Positive for payouts, negative for premiums
+        "flight": f"FL{pay['flight_id']}",
+        "date": fmt_datetime(pay['date']),
+        "status": pay['status'],
+        "txHash": f"0x{pay['id']:04x}...{pay['booking_id']:04x}",
+        "route": f"{pay['origin']} → {pay['destination']}",
+        "paymentMethod": pay['method'] or "Credit Card",
+        "blockchainNetwork": "Ethereum Sepolia",
+        "gasUsed": "0.0005 ETH",
+        # Additional details
+        "ticket_price": str(ticket['price']) if ticket else "0.00",
+        "insurance_price": str(policy['premium']) if policy else "0.00",
+        "total_amount": str(pay['amount']),
+        # Flight details
+        "departure_time": fmt_time(departure),
+        "arrival_time": fmt_time(arrival),
+        "flight_duration": calculate_duration(departure, arrival),
+        "departure_date": fmt_date(departure),
+        "policyId": str(policy['id']) if policy else None,
+        # Payout specific
+        "coverage_amount": str(policy['coverage']) if policy and is_payout else None,
+        "delayReason": "Flight Delay" if is_payout else None,
+        "actualDelay": None,
+        "payoutCalculation": None,
+    }
+
+def claim_transaction(claim):
+    departure, arrival = claim['departure'], claim['arrival']
+    return {
+        "id": f"TX-CLM-{claim['id']}",
+        "type": "payout",
+        "amount": float(claim['payout']),
+        "flight": f"FL{claim['flight_id']}",
+        "date": fmt_datetime(claim['date']),
+        "status": claim['status'],
+        "txHash": f"0x{claim['id']:04x}...{claim['policy_id']:04x}",
+        "route": f"{claim['origin']} → {claim['destination']}",
+        "policyId": str(claim['policy_id']),
+        "blockchainNetwork": "Ethereum Sepolia",
+        "gasUsed": "0.0010 ETH",
+        "paymentMethod": None,
+        # Additional details
+        "ticket_price": None,
+        "insurance_price": str(claim['premium']),
+        "total_amount": None,
+        "coverage_amount": str(claim['coverage']),
+        "delayReason": "Flight Delay",
+        "actualDelay": f"{claim['delay']} hours" if claim['delay'] else "Unknown",
+        "payoutCalculation": "Automated Smart Contract Payout",
+        # Flight details
+        "departure_time": fmt_time(departure),
+        "arrival_time": fmt_time(arrival),
+        "flight_duration": calculate_duration(departure, arrival),
+        "departure_date": fmt_date(departure),
+    }
+
+@router.get("/transactions", response_model=List[TransactionResponse])
+@offload(orm_executor)
+def get_my_transactions(
+    request: Request,
+    user_id: int = Query(1, description="User ID for testing"),
+    date_from: Optional[str] = Query(None, description="YYYY-MM-DD, inclusive"),
+    date_to: Optional[str] = Query(None, description="YYYY-MM-DD, inclusive"),
+    limit: int = Query(100, ge=1, le=500, description="Page size"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's Link header"),
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    Payments and claims merged newest first by a single UNION query (see
+    api.services.ledger), keyset-paginated like the flight list: the next
+    page is linked from the ``Link: <...>; rel="next"`` header (and
+    ``X-Next-Cursor``). Pages are kept in the per-user response cache.
+    """
+    cursor_values = None
+    if cursor:
         try:
-            user = AppUser.objects.get(user_id=user_id)
-        except AppUser.DoesNotExist:
-             return []
-             
-        transactions = []
-        
-        # 1. Payments (Premiums)
-        payments = Payment.objects.filter(
-            booking__user=user
-        ).select_related(
-            'booking', 
-            'booking__flight', 
-            'status'
-        ).prefetch_related('booking__ticket_set', 'booking__insurancepolicy_set')
-        
-        for pay in payments:
-            booking = pay.booking
-            flight = booking.flight
-            
-            # Get ticket price
-            ticket = booking.ticket_set.first()
-            ticket_price = str(ticket.price) if ticket else "0.00"
-            
-            # Get insurance policy and premium
-            policy = booking.insurancepolicy_set.first()
-            insurance_price = str(policy.premium) if policy else "0.00"
-            
-            # Calculate duration
-            duration = calculate_duration(flight.departureTime, flight.arrivalTime)
-            
-            # Determine transaction type: if payment method is "Blockchain Payout", it's a payout
-            is_payout = pay.paymentMethod == "Blockchain Payout"
-            
-            transactions.append({
-                "id": f"TX-PAY-{pay.paymentId}",
-                "type": "payout" if is_payout else "premium",
-                "amount": float(pay.amount) if is_payout else -float(pay.amount),  # Positive for payouts, negative for premiums
-                "flight": f"FL{flight.flightId}",
-                "date": pay.paymentDate.strftime("%B %d, %Y at %I:%M %p") if pay.paymentDate else "",
-                "status": pay.status.code,
-                "txHash": f"0x{pay.paymentId:04x}...{booking.bookingId:04x}",
-                "route": f"{flight.origin} → {flight.destination}",
-                "paymentMethod": pay.paymentMethod or "Credit Card",
-                "blockchainNetwork": "Ethereum Sepolia",
-                "gasUsed": "0.0005 ETH",
-                # Additional details
-                "ticket_price": ticket_price,
-                "insurance_price": insurance_price,
-                "total_amount": str(pay.amount),
-                # Flight details
-                "departure_time": flight.departureTime.strftime("%I:%M %p") if flight.departureTime else "",
-                "arrival_time": flight.arrivalTime.strftime("%I:%M %p") if flight.arrivalTime else "",
-                "flight_duration": duration,
-                "departure_date": flight.departureTime.strftime("%B %d, %Y") if flight.departureTime else "",
-                "policyId": str(policy.policyId) if policy else None,
-                # Payout specific
-                "coverage_amount": str(policy.coverageAmount) if policy and is_payout else None,
-                "delayReason": "Flight Delay" if is_payout else None,
-            })
-            
-        # 2. Claims (Payouts)
-        claims = InsuranceClaim.objects.filter(
-            policy__booking__user=user
-        ).select_related(
-            'policy', 
-            'policy__booking', 
-            'policy__booking__flight'
-        )
-        
-        for claim in claims:
-            policy = claim.policy
-            booking = policy.booking
-            flight = booking.flight
-            duration = calculate_duration(flight.departureTime, flight.arrivalTime)
-            
-            transactions.append({
-                "id": f"TX-CLM-{claim.claimId}",
-                "type": "payout",
-                "amount": float(claim.payoutAmount),
-                "flight": f"FL{flight.flightId}",
-                "date": datetime.now().strftime("%B %d, %Y at %I:%M %p"),
-                "status": claim.claimStatus,
-                "txHash": f"0x{claim.claimId:04x}...{policy.policyId:04x}",
-                "route": f"{flight.origin} → {flight.destination}",
-                "policyId": str(policy.policyId),
-                "blockchainNetwork": "Ethereum Sepolia",
-                "gasUsed": "0.0010 ETH",
-                # Additional details
-                "insurance_price": str(policy.premium),
-                "coverage_amount": str(policy.coverageAmount),
-                "delayReason": "Flight Delay",
-                "actualDelay": f"{claim.delayDuration} hours" if claim.delayDuration else "Unknown",
-                "payoutCalculation": "Automated Smart Contract Payout",
-                # Flight details
-                "departure_time": flight.departureTime.strftime("%I:%M %p") if flight.departureTime else "",
-                "arrival_time": flight.arrivalTime.strftime("%I:%M %p") if flight.arrivalTime else "",
-                "flight_duration": duration,
-                "departure_date": flight.departureTime.strftime("%B %d, %Y") if flight.departureTime else "",
-            })
-            
-        return transactions
+            cursor_values = decode_cursor(cursor, LEDGER_CURSOR_PARSERS)
+        except InvalidCursor:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    start, end = day_bounds(parse_ledger_date(date_from, "date_from"), parse_ledger_date(date_to, "date_to"))
+
+    try:
+        cache_key = user_response_cache.key("transactions", user_id, (start, end, limit, cursor))
+        version = user_response_cache.version(user_id)
+        entry = user_response_cache.get(cache_key, version)
+        if entry is None:
+            transactions, next_cursor = build_transactions_page(user_id, start, end, cursor_values, limit)
+            entry = user_response_cache.put(
+                cache_key, version, dumps(transactions),
+                {"X-Next-Cursor": next_cursor} if next_cursor else None
+            )
     except Exception as e:
         print(f"Error fetching transactions: {e}")
         import traceback
         traceback.print_exc()
         return []
 
+    extra_headers = {}
+    if "X-Next-Cursor" in entry.headers:
+        next_url = request.url.include_query_params(cursor=entry.headers["X-Next-Cursor"])
+        extra_headers["Link"] = f'<{next_url}>; rel="next"'
+    return conditional_response(entry, if_none_match, extra_headers)
+
+def build_transactions_page(user_id, start, end, cursor_values, limit):
+    entries, next_cursor = ledger_page(user_id, start, end, cursor_values, limit)
+
+    # Load only this page's rows in full
+    payment_ids = [entry_id for _, kind, entry_id in entries if kind == PAYMENT]
+    claim_ids = [entry_id for _, kind, entry_id in entries if kind == CLAIM]
+    payments, claims = {}, {}
+    if payment_ids:
+        payments = {pay['id']: pay for pay in PAYMENT_PROJECTION.rows(
+            Payment.objects.filter(paymentId__in=payment_ids)
+        )}
+    if claim_ids:
+        claims = {claim['id']: claim for claim in CLAIM_PROJECTION.rows(
+            InsuranceClaim.objects.filter(claimId__in=claim_ids)
+        )}
+    booking_ids = {pay['booking_id'] for pay in payments.values()}
+    tickets = first_rows_by_booking(TICKET_PROJECTION, Ticket, booking_ids)
+    policies = first_rows_by_booking(BOOKING_POLICY_PROJECTION, InsurancePolicy, booking_ids)
+
+    transactions = []
+    for _, kind, entry_id in entries:
+        if kind == PAYMENT:
+            pay = payments[entry_id]
+            transactions.append(payment_transaction(
+                pay, tickets.get(pay['booking_id']), policies.get(pay['booking_id'])
+            ))
+        else:
+            transactions.append(claim_transaction(claims[entry_id]))
+    return transactions, next_cursor
+
+@router.get("/{policy_id}/issuance", response_model=PolicyIssuanceResponse)
+@offload(orm_executor)
+def get_policy_issuance(policy_id: int):
+    """On-chain issuance status for a policy queued by create_booking."""
+    try:
+        policy = InsurancePolicy.objects.get(policyId=policy_id)
+    except InsurancePolicy.DoesNotExist:
+        raise HTTPException(status_code=404, detail="Policy not found")
+
+    issuance = PolicyIssuanceOutbox.objects.filter(policy=policy).first()
+    if issuance is None:
+        state = PolicyIssuanceOutbox.STATE_ISSUED if policy.blockchainTxHash else "database_only"
+        attempts, last_error = 0, None
+    else:
+        state, attempts, last_error = issuance.state, issuance.attempts, issuance.lastError
+
+    return {
+        "policy_id": policy.policyId,
+        "state": state,
+        "attempts": attempts,
+        "blockchain_policy_id": policy.blockchainPolicyId,
+        "blockchain_tx_hash": policy.blockchainTxHash,
+        "last_error": last_error,
+    }
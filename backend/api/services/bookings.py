@@ -0,0 +1,283 @@
+"""
+Booking write pipeline.
+
+All validation and inserts for a booking run inside a single
+``transaction.atomic`` block; statuses come from the warm StatusRegistry. The
+policy_summary row of a new policy is written in the same transaction from
+the objects just created, so nothing is re-read after commit.
+``query_count`` counts every statement, the after-commit cache-version bumps
+included.
+
+On-chain issuance is never done inline: when requested, a
+PolicyIssuanceOutbox row is committed with the policy and the outbox worker
+(blockchain.outbox_worker) submits buyPolicy in the background.
+"""
+from dataclasses import dataclass
+from typing import Optional
+
+from django.db import transaction
+from django.utils import timezone
+from loguru import logger
+
+from core.models import Booking, Flight, AppUser, Ticket, Payment, InsurancePolicy, PolicyIssuanceOutbox
+from core.policy_summary import note_new_bookings, write_new_summaries
+from core.query_counter import count_queries
+from core.status_registry import get_status
+from api.services.seats import allocate_seat, allocate_seats, DEFAULT_CABIN
+from api.services.insurance_plans import INSURANCE_PLANS, DEFAULT_PLAN_ID, BASE_TICKET_PRICE
+
+DEFAULT_AIRLINE = "Global Air"
+DEFAULT_PAYMENT_METHOD = "Credit Card"
+
+
+@dataclass
+class InsuranceQuote:
+    premium: float = 0
+    coverage: float = 0
+    delay_threshold: int = 180  # Default 3 hours
+
+
+@dataclass
+class BookingResult:
+    booking: Booking
+    ticket: Ticket
+    payment: Payment
+    policy: Optional[InsurancePolicy]
+    quote: InsuranceQuote
+    issuance: Optional[PolicyIssuanceOutbox] = None
+    query_count: Optional[int] = None  # set once the transaction has committed
+
+
+@dataclass
+class BatchItemResult:
+    index: int
+    result: Optional[BookingResult] = None
+    error: Optional[str] = None
+
+
+def quote_insurance(with_insurance, plan_id, ticket_price=BASE_TICKET_PRICE):
+    """Price an insurance plan; unknown plan ids fall back to the standard plan."""
+    if not (with_insurance and plan_id):
+        return InsuranceQuote()
+    plan = INSURANCE_PLANS.get(plan_id) or INSURANCE_PLANS[DEFAULT_PLAN_ID]
+    return InsuranceQuote(
+        premium=plan["price"],
+        coverage=ticket_price * plan["coverage_percentage"],
+        delay_threshold=plan["threshold"],
+    )
+
+
+def create_booking_records(user_id, flight_id, with_insurance, plan_id=None, issue_on_chain=False,
+                           cabin=DEFAULT_CABIN, before_commit=None):
+    """
+    Validate and persist a booking with its ticket, payment and (optionally)
+    insurance policy in one transaction. With ``issue_on_chain`` the policy is
+    also queued in the issuance outbox. A seat in ``cabin`` is assigned from
+    the flight's seat inventory. ``before_commit(result)`` runs as the last
+    step of the transaction (the idempotency key is completed there).
+
+    Raises AppUser.DoesNotExist / Flight.DoesNotExist for unknown ids and
+    SeatsUnavailable when the cabin is sold out.
+    """
+    with count_queries() as counter:
+        # Statuses are resolved outside the transaction so a cache miss that
+        # creates a row can never be rolled back underneath the registry.
+        confirmed = get_status('Confirmed', 'booking')
+        completed = get_status('Completed', 'payment')
+        active_policy = get_status('Active', 'policy') if with_insurance else None
+
+        quote = quote_insurance(with_insurance, plan_id)
+        now = timezone.now()
+
+        with transaction.atomic():
+            user = AppUser.objects.get(user_id=user_id)
+            flight = Flight.objects.get(flightId=flight_id)
+            seat_number = allocate_seat(flight.flightId, cabin)
+
+            booking = Booking.objects.create(
+                user=user,
+                flight=flight,
+                bookingDate=now,
+                status=confirmed
+            )
+            ticket = Ticket.objects.create(
+                booking=booking,
+                seatNumber=seat_number,
+                company=DEFAULT_AIRLINE,
+                price=BASE_TICKET_PRICE,
+                issueDate=now,
+                isPremium=cabin == "business"
+            )
+            total_amount = BASE_TICKET_PRICE + (quote.premium if with_insurance else 0)
+            payment = Payment.objects.create(
+                booking=booking,
+                amount=total_amount,
+                paymentMethod=DEFAULT_PAYMENT_METHOD,
+                paymentDate=now,
+                status=completed
+            )
+            policy = None
+            issuance = None
+            if with_insurance:
+                policy = InsurancePolicy.objects.create(
+                    booking=booking,
+                    coverageAmount=quote.coverage,
+                    premium=quote.premium,
+                    status=active_policy
+                )
+                write_new_summaries([(policy, ticket, payment)])
+                if issue_on_chain:
+                    issuance = PolicyIssuanceOutbox.objects.create(
+                        policy=policy,
+                        ticketId=ticket.ticketId,
+                        delayThreshold=quote.delay_threshold,
+                        nextAttemptAt=now
+                    )
+
+            result = BookingResult(
+                booking=booking,
+                ticket=ticket,
+                payment=payment,
+                policy=policy,
+                quote=quote,
+                issuance=issuance,
+            )
+            if before_commit is not None:
+                before_commit(result)
+
+    if issuance is not None:
+        from blockchain.outbox_worker import get_worker
+        get_worker().notify()
+
+    result.query_count = counter.count
+    logger.info(f"Booking {booking.bookingId} written with {counter.count} queries")
+    return result
+
+
+def create_booking_batch(items, issue_on_chain=False, before_commit=None):
+    """
+    Book many passengers/flights at once (tour-operator seat blocks).
+
+    ``items`` are objects with ``user_id``, ``flight_id``, ``with_insurance``,
+    ``insurance_plan_id`` and (optionally) ``cabin`` attributes. Users and flights are fetched with
+    one ``in_bulk`` each and every table is written with a single
+    ``bulk_create``, so the query count stays constant in the batch size.
+    Seats for the whole batch are assigned under one lock of the affected
+    inventory rows. Items with an unknown user or flight, or for a sold-out
+    cabin, are reported per item and skipped; the rest commit together. Returns ``(results, query_count)``.
+    """
+    results = [BatchItemResult(index=i) for i in range(len(items))]
+
+    with count_queries() as counter:
+        confirmed = get_status('Confirmed', 'booking')
+        completed = get_status('Completed', 'payment')
+        active_policy = None
+        if any(item.with_insurance for item in items):
+            active_policy = get_status('Active', 'policy')
+        now = timezone.now()
+
+        with transaction.atomic():
+            users = AppUser.objects.in_bulk({item.user_id for item in items})
+            flights = Flight.objects.in_bulk({item.flight_id for item in items})
+
+            accepted = []
+            for slot, item in zip(results, items):
+                if item.user_id not in users:
+                    slot.error = "User not found"
+                elif item.flight_id not in flights:
+                    slot.error = "Flight not found"
+                else:
+                    accepted.append((slot, item, quote_insurance(item.with_insurance, item.insurance_plan_id)))
+
+            demand = {}
+            for _, item, _ in accepted:
+                key = (item.flight_id, getattr(item, 'cabin', None) or DEFAULT_CABIN)
+                demand[key] = demand.get(key, 0) + 1
+            allocated = allocate_seats(demand) if demand else {}
+            seated = []
+            for slot, item, quote in accepted:
+                cabin = getattr(item, 'cabin', None) or DEFAULT_CABIN
+                seats = allocated[(item.flight_id, cabin)]
+                if seats:
+                    seated.append((slot, item, quote, cabin, seats.pop(0)))
+                else:
+                    slot.error = "No seats available"
+            accepted = [(slot, item, quote) for slot, item, quote, _, _ in seated]
+
+            bookings = Booking.objects.bulk_create([
+                Booking(user=users[item.user_id], flight=flights[item.flight_id], bookingDate=now, status=confirmed)
+                for _, item, _ in accepted
+            ])
+            tickets = Ticket.objects.bulk_create([
+                Ticket(
+                    booking=booking,
+                    seatNumber=seat_number,
+                    company=DEFAULT_AIRLINE,
+                    price=BASE_TICKET_PRICE,
+                    issueDate=now,
+                    isPremium=cabin == "business"
+                )
+                for booking, (_, _, _, cabin, seat_number) in zip(bookings, seated)
+            ])
+            payments = Payment.objects.bulk_create([
+                Payment(
+                    booking=booking,
+                    amount=BASE_TICKET_PRICE + (quote.premium if item.with_insurance else 0),
+                    paymentMethod=DEFAULT_PAYMENT_METHOD,
+                    paymentDate=now,
+                    status=completed
+                )
+                for booking, (_, item, quote) in zip(bookings, accepted)
+            ])
+
+            insured = [
+                (slot, booking, ticket, quote)
+                for booking, ticket, (slot, item, quote) in zip(bookings, tickets, accepted)
+                if item.with_insurance
+            ]
+            policies = InsurancePolicy.objects.bulk_create([
+                InsurancePolicy(
+                    booking=booking,
+                    coverageAmount=quote.coverage,
+                    premium=quote.premium,
+                    status=active_policy
+                )
+                for _, booking, _, quote in insured
+            ])
+            # bulk_create skips the model signals that maintain policy_summary
+            note_new_bookings({booking.bookingId: booking.user_id for booking in bookings})
+            if policies:
+                paid = {payment.booking_id: payment for payment in payments}
+                write_new_summaries([
+                    (policy, ticket, paid[booking.bookingId])
+                    for policy, (_, booking, ticket, _) in zip(policies, insured)
+                ])
+
+            issuances = []
+            if issue_on_chain and policies:
+                issuances = PolicyIssuanceOutbox.objects.bulk_create([
+                    PolicyIssuanceOutbox(
+                        policy=policy,
+                        ticketId=ticket.ticketId,
+                        delayThreshold=quote.delay_threshold,
+                        nextAttemptAt=now
+                    )
+                    for policy, (_, _, ticket, quote) in zip(policies, insured)
+                ])
+
+            for booking, ticket, payment, (slot, _, quote) in zip(bookings, tickets, payments, accepted):
+                slot.result = BookingResult(booking=booking, ticket=ticket, payment=payment, policy=None, quote=quote)
+            for policy, (slot, _, _, _) in zip(policies, insured):
+                slot.result.policy = policy
+            for issuance, (slot, _, _, _) in zip(issuances, insured):
+                slot.result.issuance = issuance
+            if before_commit is not None:
+                before_commit(results)
+
+    if issuances:
+        # The whole block of policies is picked up as one outbox batch
+        from blockchain.outbox_worker import get_worker
+        get_worker().notify()
+
+    logger.info(f"Batch of {len(items)} bookings ({len(accepted)} accepted) written with {counter.count} queries")
+    return results, counter.count
@@ -0,0 +1,234 @@
+"""
+Idempotency-Key support for write endpoints.
+
+The outcome of a keyed request is stored in the ``idempotency_key`` table and
+mirrored in a small in-memory LRU, so a client retry returns the original
+response instead of creating another booking (and another on-chain policy).
+Keys belong to the calling user: the same key sent by two clients names two
+requests.
+
+The handler records its response through ``IdempotencyClaim.complete``
+inside its own write transaction, so the booking and the completed key
+commit together: a crash after the commit still leaves a completed key, and
+a handler that outlived its lease (the key was taken over by a retry) rolls
+its write back instead of committing a second booking.
+
+Concurrent duplicates are serialized twice over: by a per-key lock inside the
+process, and by the table's unique ``(scope, userId, key)`` constraint across
+processes. A duplicate that arrives while the first request is still running
+is answered 409 straight away, without holding a worker thread, and the
+client retries. The owner of an ``in_progress`` row holds it for
+``IDEMPOTENCY_LEASE_SECONDS``; if it dies before completing, the first retry
+after the lease runs out takes the key over instead of waiting for the TTL.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from core.models import IdempotencyKey
+
+PURGE_EVERY = 1000  # new keys between purges of expired rows
+
+
+class IdempotencyError(Exception):
+    status_code = 400
+
+    def __init__(self, detail):
+        super().__init__(detail)
+        self.detail = detail
+
+
+class IdempotencyConflict(IdempotencyError):
+    """The key was already used with a different request body."""
+    status_code = 422
+
+
+class IdempotencyInProgress(IdempotencyError):
+    """The original request is still running; the client should retry shortly."""
+    status_code = 409
+
+
+def request_fingerprint(payload):
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class IdempotencyClaim:
+    """An in-progress key owned by the running request."""
+
+    def __init__(self, rows):
+        self.rows = rows  # the key row, fenced on our lease
+        self.response_json = None
+
+    def complete(self, response):
+        """
+        Record ``response`` as the key's outcome. Call it inside the
+        handler's write transaction; raises IdempotencyInProgress (rolling
+        that transaction back) if a retry took the key over meanwhile.
+        """
+        response_json = json.dumps(response, default=str)
+        if not self.rows.filter(state=IdempotencyKey.STATE_IN_PROGRESS).update(
+            state=IdempotencyKey.STATE_COMPLETED, responseBody=response_json
+        ):
+            raise IdempotencyInProgress("The Idempotency-Key lease ran out and a retry took the request over")
+        self.response_json = response_json
+
+
+class _KeyLocks:
+    """Keys with a request in flight in this process."""
+
+    def __init__(self):
+        self._guard = threading.Lock()
+        self._held = set()
+
+    def acquire(self, key):
+        """Take ``key`` without blocking; False if another request holds it."""
+        with self._guard:
+            if key in self._held:
+                return False
+            self._held.add(key)
+            return True
+
+    def release(self, key):
+        with self._guard:
+            self._held.discard(key)
+
+
+class IdempotencyStore:
+    def __init__(self, ttl_seconds=None, lru_size=None, lease_seconds=None):
+        self.ttl = timedelta(seconds=ttl_seconds or settings.IDEMPOTENCY_TTL_SECONDS)
+        self.lru_size = lru_size or settings.IDEMPOTENCY_LRU_SIZE
+        self.lease = timedelta(seconds=lease_seconds or settings.IDEMPOTENCY_LEASE_SECONDS)
+        self._lru = OrderedDict()  # (scope, user_id, key) -> (request_hash, response_json, created_at)
+        self._lru_lock = threading.Lock()
+        self._locks = _KeyLocks()
+        self._inserts = 0
+
+    # -- LRU ----------------------------------------------------------------
+
+    def _lru_get(self, cache_key):
+        with self._lru_lock:
+            entry = self._lru.get(cache_key)
+            if entry is None:
+                return None
+            if entry[2] + self.ttl < timezone.now():
+                del self._lru[cache_key]
+                return None
+            self._lru.move_to_end(cache_key)
+            return entry
+
+    def _lru_put(self, cache_key, request_hash, response_json, created_at):
+        with self._lru_lock:
+            self._lru[cache_key] = (request_hash, response_json, created_at)
+            self._lru.move_to_end(cache_key)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    # -- DB -----------------------------------------------------------------
+
+    def _claim(self, scope, user_id, key, request_hash):
+        """Insert the in-progress row; returns ``(lease, None)`` if we own it, else ``(None, existing row)``."""
+        now = timezone.now()
+        lease = now + self.lease
+        try:
+            with transaction.atomic():
+                IdempotencyKey.objects.create(
+                    scope=scope, userId=user_id, key=key, requestHash=request_hash, createdAt=now,
+                    leaseExpiresAt=lease
+                )
+        except IntegrityError:
+            return None, IdempotencyKey.objects.filter(scope=scope, userId=user_id, key=key).first()
+        self._inserts += 1
+        if self._inserts % PURGE_EVERY == 0:
+            self.purge_expired()
+        return lease, None
+
+    def _reclaim(self, record):
+        """Take over an in-progress row whose lease ran out; returns the new lease or None."""
+        now = timezone.now()
+        lease = now + self.lease
+        taken = IdempotencyKey.objects.filter(
+            pk=record.pk, state=IdempotencyKey.STATE_IN_PROGRESS, leaseExpiresAt=record.leaseExpiresAt
+        ).update(leaseExpiresAt=lease, createdAt=now)
+        return lease if taken else None
+
+    def purge_expired(self):
+        IdempotencyKey.objects.filter(createdAt__lt=timezone.now() - self.ttl).delete()
+
+    # -- public API ---------------------------------------------------------
+
+    def execute(self, scope, user_id, key, payload, handler):
+        """
+        Run ``handler(claim)`` at most once per ``(scope, user_id, key)``.
+
+        The handler should call ``claim.complete(response)`` inside its write
+        transaction; a handler that does not is completed after it returns.
+        Returns ``(response, replayed)``: the handler's return value, or the
+        recorded response on a replay. Responses must be JSON serializable.
+        If the handler raises, the key is released so the client can retry.
+        """
+        cache_key = (scope, user_id, key)
+        request_hash = request_fingerprint(payload)
+
+        if not self._locks.acquire(cache_key):
+            raise IdempotencyInProgress("A request with this Idempotency-Key is still being processed")
+        try:
+            while True:
+                cached = self._lru_get(cache_key)
+                if cached is not None:
+                    if cached[0] != request_hash:
+                        raise IdempotencyConflict("Idempotency-Key was already used with a different request")
+                    return json.loads(cached[1]), True
+
+                lease, existing = self._claim(scope, user_id, key, request_hash)
+                if lease is not None:
+                    break
+                if existing is None:
+                    continue  # released between our insert and read
+                if existing.requestHash != request_hash:
+                    raise IdempotencyConflict("Idempotency-Key was already used with a different request")
+                if existing.createdAt + self.ttl < timezone.now():
+                    existing.delete()  # expired: treat as a fresh key
+                    continue
+                if existing.state == IdempotencyKey.STATE_COMPLETED:
+                    self._lru_put(cache_key, request_hash, existing.responseBody, existing.createdAt)
+                    return json.loads(existing.responseBody), True
+                if existing.leaseExpiresAt is not None and existing.leaseExpiresAt > timezone.now():
+                    raise IdempotencyInProgress("A request with this Idempotency-Key is still being processed")
+                # The owner died mid-request: take the key over
+                lease = self._reclaim(existing)
+                if lease is not None:
+                    break
+
+            # The lease value fences our writes: a slow owner that lost the
+            # row to a retry leaves it alone
+            claim = IdempotencyClaim(
+                IdempotencyKey.objects.filter(scope=scope, userId=user_id, key=key, leaseExpiresAt=lease)
+            )
+            try:
+                response = handler(claim)
+                if claim.response_json is None:
+                    claim.complete(response)
+            except BaseException:
+                claim.rows.filter(state=IdempotencyKey.STATE_IN_PROGRESS).delete()
+                raise
+
+            self._lru_put(cache_key, request_hash, claim.response_json, timezone.now())
+            return response, False
+        finally:
+            self._locks.release(cache_key)
+
+
+_store = None
+
+
+def get_idempotency_store():
+    global _store
+    if _store is None:
+        _store = IdempotencyStore()
+    return _store
@@ -0,0 +1,90 @@
+"""
+Single source of truth for insurance plans and their pricing.
+
+Used by booking creation, ``GET /api/policies/plans`` and the vectorized
+``POST /api/policies/quote``.
+"""
+import numpy as np
+
+BASE_TICKET_PRICE = 250.00  # Flight model has no price field yet
+
+PLAN_CATALOG = [
+    {
+        "id": "basic",
+        "name": "Basic Protection",
+        "price": 15,
+        "coverage_percentage": 0.30,  # 30% of ticket price
+        "threshold": 180,  # 3 hours
+        "features": [
+            "Delays over 3 hours",
+            "30% of ticket price payout",
+            "Automatic processing",
+        ],
+        "delay": "3+ hours",
+    },
+    {
+        "id": "standard",
+        "name": "Standard Protection",
+        "price": 25,
+        "coverage_percentage": 0.60,  # 60% of ticket price
+        "threshold": 120,  # 2 hours
+        "features": [
+            "Delays over 2 hours",
+            "60% of ticket price payout",
+            "Automatic processing",
+            "Cancellation coverage",
+        ],
+        "recommended": True,
+        "delay": "2+ hours",
+    },
+    {
+        "id": "premium",
+        "name": "Premium Protection",
+        "price": 45,
+        "coverage_percentage": 1.00,  # 100% of ticket price
+        "threshold": 60,  # 1 hour
+        "features": [
+            "Delays over 1 hour",
+            "100% of ticket price payout",
+            "Automatic processing",
+            "Cancellation coverage",
+            "Baggage protection",
+        ],
+        "delay": "1+ hour",
+    },
+]
+DEFAULT_PLAN_ID = "standard"
+
+INSURANCE_PLANS = {plan["id"]: plan for plan in PLAN_CATALOG}
+PLAN_IDS = [plan["id"] for plan in PLAN_CATALOG]
+
+# Column vectors used by quote_matrix, in PLAN_IDS order
+_PLAN_PRICES = np.array([plan["price"] for plan in PLAN_CATALOG], dtype=np.float64)
+_PLAN_COVERAGE = np.array([plan["coverage_percentage"] for plan in PLAN_CATALOG], dtype=np.float64)
+_PLAN_THRESHOLDS = np.array([plan["threshold"] for plan in PLAN_CATALOG], dtype=np.int64)
+
+
+def public_plans():
+    """Plans as served by GET /api/policies/plans (coverage in whole percent)."""
+    return [
+        {
+            key: value for key, value in
+            {**plan, "coverage_percentage": round(plan["coverage_percentage"] * 100)}.items()
+            if key != "threshold"
+        }
+        for plan in PLAN_CATALOG
+    ]
+
+
+def quote_matrix(ticket_prices):
+    """
+    Price every plan for every ticket price in one vectorized pass.
+
+    Returns ``(premiums, coverages, thresholds)``, each of shape
+    ``(len(ticket_prices), len(PLAN_IDS))``.
+    """
+    prices = np.asarray(ticket_prices, dtype=np.float64).reshape(-1, 1)
+    coverages = np.round(prices * _PLAN_COVERAGE, 2)
+    premiums = np.broadcast_to(_PLAN_PRICES, coverages.shape)
+    thresholds = np.broadcast_to(_PLAN_THRESHOLDS, coverages.shape)
+    return premiums, coverages, thresholds
@@ -0,0 +1,71 @@
+"""
+Transaction ledger: a user's payments and claims merged in SQL.
+
+Both sources are projected to ``(ts, kind, entry_id)`` and combined with
+``UNION ALL``, ordered newest first and keyset-paginated on that triple, so a
+page costs two bounded index range scans (``payment_booking_date_idx`` and
+``claim_policy_date_idx``) however long the history is. Only the rows of the
+page are then loaded in full.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db import connection
+from django.db.models import CharField, F, Value
+from django.utils import timezone
+
+from api.services.pagination import encode_cursor, keyset_after
+from core.models import InsuranceClaim, Payment
+
+LEDGER_KEY = ('ts', 'kind', 'entry_id')
+LEDGER_ORDER = tuple(f"-{field}" for field in LEDGER_KEY)
+LEDGER_CURSOR_PARSERS = (datetime.fromisoformat, str, int)
+
+PAYMENT = 'payment'
+CLAIM = 'claim'
+
+
+def day_bounds(date_from, date_to):
+    """Half-open ``[date_from start, day after date_to start)`` (either may be None)."""
+    start = timezone.make_aware(datetime.combine(date_from, time.min)) if date_from else None
+    end = timezone.make_aware(datetime.combine(date_to, time.min)) + timedelta(days=1) if date_to else None
+    return start, end
+
+
+def _branch(queryset, kind, pk, timestamp, start, end, cursor_values):
+    queryset = queryset.annotate(
+        ts=F(timestamp), kind=Value(kind, output_field=CharField()), entry_id=F(pk)
+    )
+    if start is not None:
+        queryset = queryset.filter(ts__gte=start)
+    if end is not None:
+        queryset = queryset.filter(ts__lt=end)
+    if cursor_values is not None:
+        queryset = queryset.filter(keyset_after(LEDGER_KEY, cursor_values, descending=True))
+    return queryset.values_list(*LEDGER_KEY)
+
+
+def ledger_queryset(user_id, start=None, end=None, cursor_values=None, limit=None):
+    """``(ts, kind, entry_id)`` rows of ``user_id``'s ledger, newest first."""
+    payments = _branch(
+        Payment.objects.filter(booking__user_id=user_id),
+        PAYMENT, 'paymentId', 'paymentDate', start, end, cursor_values
+    )
+    claims = _branch(
+        InsuranceClaim.objects.filter(policy__booking__user_id=user_id),
+        CLAIM, 'claimId', 'claimDate', start, end, cursor_values
+    )
+    if limit is not None and connection.features.supports_slicing_ordering_in_compound:
+        # Cut each branch to the page size too, so neither scan runs past it
+        payments = payments.order_by(*LEDGER_ORDER)[:limit]
+        claims = claims.order_by(*LEDGER_ORDER)[:limit]
+    return payments.union(claims, all=True).order_by(*LEDGER_ORDER)
+
+
+def ledger_page(user_id, start, end, cursor_values, limit):
+    """One page of ledger keys and the cursor of the next page (None on the last)."""
+    queryset = ledger_queryset(user_id, start, end, cursor_values, limit + 1)
+    rows = list(queryset[:limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(*rows[-1])
@@ -0,0 +1,86 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A page is fetched with ``WHERE (k1, k2, ...) > (v1, v2, ...) ORDER BY k1, k2, ...
+LIMIT n`` instead of OFFSET, so every page costs the same index range scan
+no matter how deep it is. Cursors are the last row's key values, JSON-encoded
+and base64url-wrapped so clients treat them as opaque.
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime
+
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    """Raised for cursors that were not produced by ``encode_cursor``."""
+
+
+def _to_json(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def encode_cursor(*values):
+    raw = json.dumps([_to_json(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token, parsers):
+    """
+    Decode ``token`` into key values, applying one parser per key
+    (e.g. ``(datetime.fromisoformat, int)``). Raises InvalidCursor.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(parsers):
+            raise InvalidCursor("Malformed cursor")
+        return [parse(value) for parse, value in zip(parsers, values)]
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError, TypeError, ValueError) as e:
+        raise InvalidCursor("Malformed cursor") from e
+
+
+def keyset_after(fields, values, descending=False):
+    """
+    Q for rows strictly after ``values`` in ascending ``fields`` order, i.e.
+    ``f1 > v1 OR (f1 = v1 AND f2 > v2) OR ...`` (``<`` when ``descending``).
+    """
+    op = "lt" if descending else "gt"
+    condition = Q()
+    for i in range(len(fields) - 1, -1, -1):
+        step = Q(**{f"{fields[i]}__{op}": values[i]})
+        if i < len(fields) - 1:
+            step |= Q(**{fields[i]: values[i]}) & condition
+        condition = step
+    return condition
+
+
+def paginate(queryset, fields, cursor_values, limit, projection=None):
+    """
+    Order ``queryset`` by ``fields``, start after ``cursor_values`` (if any)
+    and return ``(rows, next_cursor)``; ``next_cursor`` is None on the last page.
+    With a ``projection`` (see api.services.serializers) rows are dicts, which
+    must include ``fields``.
+    """
+    queryset = queryset.order_by(*fields)
+    if cursor_values is not None:
+        queryset = queryset.filter(keyset_after(fields, cursor_values))
+    if projection is not None:
+        rows = projection.rows(queryset[:limit + 1])
+    else:
+        rows = list(queryset[:limit + 1])
+    return _page(rows, fields, limit)
+
+
+def _page(rows, fields, limit):
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    if isinstance(last, dict):
+        return rows, encode_cursor(*(last[field] for field in fields))
+    return rows, encode_cursor(*(getattr(last, field) for field in fields))
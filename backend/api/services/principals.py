@@ -0,0 +1,123 @@
+"""
+Request principal for JWT-authenticated endpoints.
+
+``current_user`` is the dependency to use:
+
+    @router.get("/me")
+    async def get_me(principal: Principal = Depends(current_user)): ...
+
+Endpoints that also serve anonymous callers use ``optional_current_user``,
+which gives None when no bearer token is sent.
+
+It verifies the bearer access token once and resolves the login account and
+its passenger profile (AppUser, via the ``account`` foreign key) from an
+in-process LRU keyed by the Django user id. Entries expire after
+``PRINCIPAL_CACHE_TTL_SECONDS`` and are evicted immediately when the User or
+AppUser row changes in this process (core.signals), so the TTL only bounds
+how long edits made by other processes take to show.
+"""
+from dataclasses import dataclass
+from typing import Optional
+
+import jwt
+from django.conf import settings
+from django.contrib.auth.models import User
+from fastapi import Depends, HTTPException
+from fastapi.security import OAuth2PasswordBearer
+
+from api.services.user_cache import MemoryBackend
+from core.executors import orm_executor
+from core.models import AppUser
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
+
+
+@dataclass(frozen=True)
+class Principal:
+    user_id: int  # AppUser id (the id the rest of the API takes), else the Django user id
+    django_user_id: int
+    username: str
+    email: str
+    full_name: str
+
+
+def resolve_app_user(user):
+    """Passenger profile of a login account; legacy profiles are linked by email on first use."""
+    app_user = AppUser.objects.filter(account=user).first()
+    if app_user is None and user.email:
+        app_user = AppUser.objects.filter(email=user.email, account__isnull=True).first()
+        if app_user is not None:
+            AppUser.objects.filter(pk=app_user.pk).update(account=user)
+    return app_user
+
+
+async def aresolve_app_user(user):
+    return await orm_executor.run(resolve_app_user, user)
+
+
+def load_principal(django_user_id):
+    user = User.objects.filter(pk=django_user_id, is_active=True).select_related('app_user').first()
+    if user is None:
+        return None
+    try:
+        app_user = user.app_user
+    except AppUser.DoesNotExist:
+        app_user = resolve_app_user(user)
+    return Principal(
+        user_id=app_user.user_id if app_user else user.id,
+        django_user_id=user.id,
+        username=user.username,
+        email=user.email,
+        full_name=app_user.name if app_user else user.get_full_name() or user.username,
+    )
+
+
+class PrincipalCache:
+    def __init__(self, max_entries, ttl):
+        self.backend = MemoryBackend(max_entries)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    async def aget(self, django_user_id):
+        principal = self.backend.get(django_user_id)
+        if principal is not None:
+            self.hits += 1
+            return principal
+        self.misses += 1
+        principal = await orm_executor.run(load_principal, django_user_id)
+        if principal is not None:
+            self.backend.set(django_user_id, principal, self.ttl)
+        return principal
+
+    def evict(self, django_user_id):
+        self.backend.delete(django_user_id)
+
+
+principal_cache = PrincipalCache(settings.PRINCIPAL_CACHE_SIZE, settings.PRINCIPAL_CACHE_TTL_SECONDS)
+
+
+def decode_access_token(token):
+    """Verified claims of an access token; 401 for anything else."""
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+    except jwt.PyJWTError:
+        raise HTTPException(status_code=401, detail="Invalid authentication credentials")
+    if payload.get("sub") is None or payload.get("type") != "access":
+        raise HTTPException(status_code=401, detail="Invalid authentication credentials")
+    return payload
+
+
+async def current_user(token: str = Depends(oauth2_scheme)) -> Principal:
+    payload = decode_access_token(token)
+    principal = await principal_cache.aget(payload.get("django_user_id", payload.get("user_id")))
+    if principal is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return principal
+
+
+async def optional_current_user(token: Optional[str] = Depends(optional_oauth2_scheme)) -> Optional[Principal]:
+    if token is None:
+        return None
+    return await current_user(token)
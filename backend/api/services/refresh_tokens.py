@@ -0,0 +1,282 @@
+"""
+Refresh-token rotation and revocation.
+
+Every refresh token carries a ``jti`` and the ``fam`` (family) id of the
+login it descends from. ``POST /api/auth/refresh`` spends the presented
+token and issues the next one in the same family; presenting a spent token
+again means it was copied, so the whole family is revoked (the legitimate
+holder has to log in again). Logout revokes the family too.
+
+Tokens issued before rotation carry neither id. Their ``jti`` and ``fam``
+are derived from a digest of the token (``legacy_token_ids``), so each one
+can be refreshed exactly once into a family of its own instead of signing
+every session out on deploy; they age out within ``REFRESH_TOKEN_LIFETIME``.
+
+Spent jtis and revoked families live in the RevokedRefreshToken table until
+the tokens they cover expire. Checks never scan it:
+
+  * a Bloom filter over every unexpired key answers "definitely not
+    revoked" for the common case without touching the database;
+  * a bounded TTL set of recently revoked keys confirms most positives;
+  * only a Bloom positive missing from the TTL set (a false positive, or an
+    old revocation) costs one indexed lookup.
+
+Spending a token is an INSERT on the unique ``key``, so reuse is caught
+exactly even when the copies race through different processes. Revocations
+made by other processes are picked up every ``REFRESH_REVOCATION_SYNC_SECONDS``
+(an indexed read of the newest rows).
+
+The full rebuild (a scan of the table that also purges expired rows) runs on
+a background thread started with the app, every
+``REFRESH_REVOCATION_PURGE_SECONDS``; requests keep using the current filter
+until the new one is swapped in.
+"""
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+from loguru import logger
+
+from core.models import RevokedRefreshToken
+
+REFRESH_TOKEN_LIFETIME = timedelta(days=7)
+SYNC_OVERLAP = timedelta(seconds=60)  # re-read window for rows committed late
+
+
+def legacy_token_ids(token):
+    """Stable ``(jti, family)`` for a refresh token issued before rotation."""
+    digest = hashlib.sha256(token.encode()).hexdigest()
+    return digest[:32], digest[32:]
+
+
+class RefreshTokenRevoked(Exception):
+    """The token's family was revoked (logout or detected reuse)."""
+
+
+class RefreshTokenReused(RefreshTokenRevoked):
+    """The token was already spent; its family has been revoked."""
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter (double hashing over one blake2b digest)."""
+
+    def __init__(self, capacity, error_rate):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RevocationStore:
+    def __init__(self, bloom_capacity, bloom_error_rate, cache_size, sync_seconds, purge_seconds):
+        self.bloom_capacity = bloom_capacity
+        self.bloom_error_rate = bloom_error_rate
+        self.cache_size = cache_size
+        self.sync_seconds = sync_seconds
+        self.purge_seconds = purge_seconds
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._bloom = None
+        self._recent = OrderedDict()  # key -> expiry (epoch seconds)
+        self._synced_at = None  # wall clock of the last DB sync
+        self._next_sync = 0.0
+        self._rebuild_log = None  # keys remembered while a rebuild scans, replayed before the swap
+        self._stop = threading.Event()
+        self._thread = None
+        self.bloom_negatives = 0
+        self.cache_hits = 0
+        self.db_checks = 0
+        self.reuse_detected = 0
+
+    # -- in-memory structures -------------------------------------------------
+
+    def _remember(self, key, expires_at):
+        self._bloom.add(key)
+        self._recent[key] = expires_at.timestamp()
+        self._recent.move_to_end(key)
+        while len(self._recent) > self.cache_size:
+            self._recent.popitem(last=False)
+        if self._rebuild_log is not None:
+            self._rebuild_log.append((key, expires_at))
+
+    def _rebuild(self):
+        """
+        Reload every unexpired key into new structures and swap them in; also
+        drops expired rows from the table. Caller holds ``_refresh_lock``.
+        """
+        with self._lock:
+            self._rebuild_log = []
+        try:
+            now = timezone.now()
+            RevokedRefreshToken.objects.filter(expiresAt__lte=now).delete()
+            bloom = BloomFilter(self.bloom_capacity, self.bloom_error_rate)
+            rows = RevokedRefreshToken.objects.filter(expiresAt__gt=now).order_by('createdAt')
+            recent = OrderedDict()
+            for key, expires_at in rows.values_list('key', 'expiresAt').iterator(chunk_size=5000):
+                bloom.add(key)
+                recent[key] = expires_at.timestamp()
+                if len(recent) > self.cache_size:
+                    recent.popitem(last=False)
+            with self._lock:
+                # Revocations made in this process during the scan may have missed it
+                for key, expires_at in self._rebuild_log:
+                    bloom.add(key)
+                    recent[key] = expires_at.timestamp()
+                    recent.move_to_end(key)
+                while len(recent) > self.cache_size:
+                    recent.popitem(last=False)
+                self._bloom, self._recent, self._synced_at = bloom, recent, now
+                self._next_sync = time.monotonic() + self.sync_seconds
+        finally:
+            with self._lock:
+                self._rebuild_log = None
+
+    def _sync(self):
+        """Pick up keys revoked by other processes since the last sync."""
+        now = timezone.now()
+        rows = RevokedRefreshToken.objects.filter(
+            createdAt__gte=self._synced_at - SYNC_OVERLAP, expiresAt__gt=now
+        ).values_list('key', 'expiresAt')
+        with self._lock:
+            for key, expires_at in rows:
+                self._remember(key, expires_at)
+            self._synced_at = now
+            self._next_sync = time.monotonic() + self.sync_seconds
+
+    def _refresh(self):
+        if self._bloom is None:
+            # Normally built by the background thread at startup; processes
+            # that never start it (scripts, tests) build on first use
+            with self._refresh_lock:
+                if self._bloom is None:
+                    self._rebuild()
+            return
+        if time.monotonic() < self._next_sync:
+            return
+        # One thread syncs; the others carry on with the current structures
+        if self._refresh_lock.acquire(blocking=False):
+            try:
+                self._sync()
+            finally:
+                self._refresh_lock.release()
+
+    def is_revoked(self, key):
+        self._refresh()
+        with self._lock:
+            if key not in self._bloom:
+                self.bloom_negatives += 1
+                return False
+            expiry = self._recent.get(key)
+            if expiry is not None:
+                self.cache_hits += 1
+                return expiry > time.time()
+            self.db_checks += 1
+        row = RevokedRefreshToken.objects.filter(key=key, expiresAt__gt=timezone.now()).values_list(
+            'expiresAt', flat=True
+        ).first()
+        if row is None:
+            return False
+        with self._lock:
+            self._remember(key, row)
+        return True
+
+    # -- background rebuild ---------------------------------------------------
+
+    def _run(self):
+        logger.info("🧹 Refresh-token revocation rebuilder started")
+        delay = 0.0
+        while not self._stop.wait(delay):
+            close_old_connections()
+            try:
+                with self._refresh_lock:
+                    self._rebuild()
+            except Exception as e:
+                logger.error(f"❌ Revocation filter rebuild failed: {e}")
+                delay = self.sync_seconds
+            else:
+                delay = self.purge_seconds
+        close_old_connections()
+        logger.info("🛑 Refresh-token revocation rebuilder stopped")
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="refresh-revocation-rebuilder", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    # -- writes ---------------------------------------------------------------
+
+    def _insert(self, key, kind, expires_at):
+        """Persist a revocation; False if the key was already revoked."""
+        self._refresh()
+        try:
+            with transaction.atomic():
+                RevokedRefreshToken.objects.create(key=key, kind=kind, expiresAt=expires_at)
+        except IntegrityError:
+            inserted = False
+        else:
+            inserted = True
+        with self._lock:
+            self._remember(key, expires_at)
+        return inserted
+
+    def revoke_family(self, family):
+        # A family outlives any single token: cover the longest a new one could live
+        self._insert(family, RevokedRefreshToken.KIND_FAMILY, timezone.now() + REFRESH_TOKEN_LIFETIME)
+
+    def spend(self, jti, family, expires_at):
+        """
+        Mark a refresh token used. Raises RefreshTokenRevoked if its family
+        is revoked, RefreshTokenReused (and revokes the family) if the token
+        was spent before.
+        """
+        if self.is_revoked(family):
+            raise RefreshTokenRevoked(family)
+        if self.is_revoked(jti) or not self._insert(jti, RevokedRefreshToken.KIND_TOKEN, expires_at):
+            with self._lock:
+                self.reuse_detected += 1
+            self.revoke_family(family)
+            raise RefreshTokenReused(jti)
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "bloom_bits": self._bloom.size if self._bloom else 0,
+                "recent_keys": len(self._recent),
+                "bloom_negatives": self.bloom_negatives,
+                "cache_hits": self.cache_hits,
+                "db_checks": self.db_checks,
+                "reuse_detected": self.reuse_detected,
+            }
+
+
+refresh_token_store = RevocationStore(
+    settings.REFRESH_REVOCATION_BLOOM_CAPACITY,
+    settings.REFRESH_REVOCATION_BLOOM_ERROR_RATE,
+    settings.REFRESH_REVOCATION_CACHE_SIZE,
+    settings.REFRESH_REVOCATION_SYNC_SECONDS,
+    settings.REFRESH_REVOCATION_PURGE_SECONDS,
+)
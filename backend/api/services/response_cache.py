@@ -0,0 +1,84 @@
+"""
+Conditional-GET response cache (strong ETags, If-None-Match -> 304).
+
+Entries are serialized JSON bodies keyed by normalized request parameters
+and tagged with the CacheVersion of the data they were built from. A lookup
+is valid only while that version is unchanged, so writers in any process
+invalidate precisely by bumping the version (see ``core.cache_versions``).
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict
+
+from django.conf import settings
+from fastapi import Response
+
+from api.services.serializers import dumps
+
+
+@dataclass
+class CachedResponse:
+    version: int
+    body: bytes
+    etag: str
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+def make_etag(body):
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match, etag):
+    """RFC 9110 If-None-Match check (weak comparison, ``*`` matches anything)."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in candidates or any(tag.removeprefix('W/') == etag for tag in candidates)
+
+
+class ResponseCache:
+    """Bounded LRU of CachedResponse, safe to share between threads."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, version, payload, headers=None):
+        body = dumps(payload)
+        entry = CachedResponse(version=version, body=body, etag=make_etag(body), headers=dict(headers or {}))
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def conditional_response(entry, if_none_match, extra_headers=None):
+    """200 with the cached body, or an empty 304 when the client's ETag is current."""
+    headers = {**entry.headers, **(extra_headers or {}), 'ETag': entry.etag, 'Cache-Control': 'no-cache'}
+    if etag_matches(if_none_match, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type='application/json', headers=headers)
+
+
+flight_response_cache = ResponseCache(settings.FLIGHT_RESPONSE_CACHE_SIZE)
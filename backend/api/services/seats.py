@@ -0,0 +1,281 @@
+"""
+Seat inventory engine.
+
+Each flight has one FlightSeatInventory row per cabin holding a bitmap of
+taken seats plus a ``seatsAvailable`` counter. Seats are assigned inside the
+booking transaction after locking the inventory rows (SELECT ... FOR UPDATE),
+so concurrent bookings can never hand out the same seat or oversell a cabin,
+and availability is read from the counters instead of counting Ticket rows.
+Cancelling a booking or deleting a ticket (directly or with its booking)
+gives the seat back.
+"""
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Least
+
+from core.cache_versions import bump_versions, flight_scopes
+from core.models import FlightSeatInventory, Ticket
+from core.status_registry import get_status
+
+# Cabin layout shared by all flights: row numbers are contiguous across cabins
+SEAT_LAYOUT = {
+    "business": {"first_row": 1, "rows": 4, "letters": "ACDF"},
+    "economy": {"first_row": 5, "rows": 30, "letters": "ABCDEF"},
+}
+DEFAULT_CABIN = "economy"
+# Tickets sold before the inventory existed only record whether the seat was premium
+LEGACY_PREMIUM = {"business": True, "economy": False}
+# Tickets of cancelled bookings no longer hold their seat
+CANCELLED = ("Cancelled", "booking")
+TOTAL_CAPACITY = sum(c["rows"] * len(c["letters"]) for c in SEAT_LAYOUT.values())
+
+
+class SeatsUnavailable(Exception):
+    """The requested cabin has no free seats left."""
+
+
+def cabin_capacity(cabin):
+    layout = SEAT_LAYOUT[cabin]
+    return layout["rows"] * len(layout["letters"])
+
+
+def seat_label(cabin, index):
+    layout = SEAT_LAYOUT[cabin]
+    letters = layout["letters"]
+    return f"{layout['first_row'] + index // len(letters)}{letters[index % len(letters)]}"
+
+
+def seat_index(cabin, label):
+    """Inverse of ``seat_label``; None when ``label`` is not a seat of ``cabin``."""
+    layout = SEAT_LAYOUT[cabin]
+    letters = layout["letters"]
+    row, letter = label[:-1], label[-1:]
+    if not row.isdigit() or not letter or letter not in letters:
+        return None
+    row = int(row) - layout["first_row"]
+    if not 0 <= row < layout["rows"]:
+        return None
+    return row * len(letters) + letters.index(letter)
+
+
+def ticket_cabin(ticket):
+    return "business" if ticket.isPremium else "economy"
+
+
+class SeatMap:
+    """Bitmap of taken seats for one cabin."""
+
+    def __init__(self, capacity, data=b""):
+        self.capacity = capacity
+        self.bits = int.from_bytes(bytes(data or b""), "little")
+
+    def take_next(self):
+        """Mark the lowest free seat as taken and return its index (None if full)."""
+        free_bit = ~self.bits & (self.bits + 1)  # lowest clear bit
+        index = free_bit.bit_length() - 1
+        if index >= self.capacity:
+            return None
+        self.bits |= free_bit
+        return index
+
+    def release(self, index):
+        self.bits &= ~(1 << index)
+
+    def taken(self):
+        """Indices of the taken seats, lowest first."""
+        return [index for index in range(self.capacity) if self.bits >> index & 1]
+
+    def to_bytes(self):
+        return self.bits.to_bytes((self.capacity + 7) // 8, "little")
+
+
+def _legacy_taken(flight_ids):
+    """Tickets per flight and cabin sold before the inventory existed."""
+    return {
+        row["booking__flight_id"]: row
+        for row in Ticket.objects.filter(booking__flight_id__in=flight_ids)
+        .values("booking__flight_id")
+        .annotate(**{
+            cabin: Count("ticketId", filter=Q(isPremium=premium))
+            for cabin, premium in LEGACY_PREMIUM.items()
+        })
+    }
+
+
+def _create_inventory(flight_ids):
+    """
+    Create the cabin rows for flights that have none yet.
+
+    Tickets sold before the inventory existed (all with placeholder seat
+    numbers) are counted as taken so capacity is still respected.
+    """
+    legacy = _legacy_taken(flight_ids)
+    rows = []
+    for flight_id in flight_ids:
+        for cabin in SEAT_LAYOUT:
+            capacity = cabin_capacity(cabin)
+            seat_map = SeatMap(capacity)
+            for _ in range(min(legacy.get(flight_id, {}).get(cabin, 0), capacity)):
+                seat_map.take_next()
+            taken = bin(seat_map.bits).count("1")
+            rows.append(FlightSeatInventory(
+                flight_id=flight_id,
+                cabin=cabin,
+                capacity=capacity,
+                seatsAvailable=capacity - taken,
+                seatMap=seat_map.to_bytes(),
+            ))
+    # Two first bookings for the same flight may race here; the unique
+    # (flight, cabin) constraint keeps exactly one set of rows.
+    FlightSeatInventory.objects.bulk_create(rows, ignore_conflicts=True)
+
+
+def _lock_inventory(flight_ids):
+    # Always lock in (flight, cabin) order so batches over the same flights can't deadlock
+    return {
+        (inv.flight_id, inv.cabin): inv
+        for inv in FlightSeatInventory.objects.select_for_update()
+        .filter(flight_id__in=flight_ids)
+        .order_by("flight_id", "cabin")
+    }
+
+
+def allocate_seats(demand):
+    """
+    Assign seats for ``demand`` = ``{(flight_id, cabin): count}``.
+
+    Must run inside the booking's ``transaction.atomic`` block. Returns
+    ``{(flight_id, cabin): [seat labels]}``; a list is shorter than requested
+    when the cabin sells out.
+    """
+    flight_ids = {flight_id for flight_id, _ in demand}
+    inventory = _lock_inventory(flight_ids)
+    missing = flight_ids - {flight_id for flight_id, _ in inventory}
+    if missing:
+        _create_inventory(missing)
+        inventory = _lock_inventory(flight_ids)
+
+    allocated, changed = {}, []
+    for (flight_id, cabin), count in demand.items():
+        inv = inventory[(flight_id, cabin)]
+        seat_map = SeatMap(inv.capacity, inv.seatMap)
+        seats = []
+        while len(seats) < count and inv.seatsAvailable > 0:
+            index = seat_map.take_next()
+            if index is None:
+                break
+            seats.append(seat_label(cabin, index))
+            inv.seatsAvailable -= 1
+        if seats:
+            inv.seatMap = seat_map.to_bytes()
+            changed.append(inv)
+        allocated[(flight_id, cabin)] = seats
+
+    if changed:
+        FlightSeatInventory.objects.bulk_update(changed, ["seatMap", "seatsAvailable"])
+        # seats_available is part of the cached flight responses
+        scopes = flight_scopes({inv.flight_id for inv in changed})
+        transaction.on_commit(lambda: bump_versions(scopes))
+    return allocated
+
+
+def allocate_seat(flight_id, cabin=DEFAULT_CABIN):
+    """Assign one seat or raise SeatsUnavailable."""
+    seats = allocate_seats({(flight_id, cabin): 1})[(flight_id, cabin)]
+    if not seats:
+        raise SeatsUnavailable(f"No {cabin} seats left on flight {flight_id}")
+    return seats[0]
+
+
+def release_seats(flight_id, cabin, seat_numbers):
+    """
+    Give the seats of deleted tickets back to ``(flight_id, cabin)``.
+
+    Must run in the cancelling or deleting transaction, once the tickets no
+    longer hold their seats. A seat is only freed when no live ticket (one
+    of a booking that isn't cancelled) holds it; a ticket whose
+    number isn't one of its own bits (sold before the inventory existed)
+    frees the lowest taken seat that no ticket holds. Flights without an
+    inventory yet need nothing: their availability counts Ticket rows.
+    """
+    inv = _lock_inventory([flight_id]).get((flight_id, cabin))
+    if inv is None:
+        return
+    seat_map = SeatMap(inv.capacity, inv.seatMap)
+    held = {
+        seat_index(cabin, number)
+        for number in Ticket.objects.filter(
+            booking__flight_id=flight_id, isPremium=LEGACY_PREMIUM[cabin]
+        ).exclude(booking__status=get_status(*CANCELLED)).values_list("seatNumber", flat=True)
+    }
+    unheld = [index for index in seat_map.taken() if index not in held]
+    released = 0
+    for number in seat_numbers:
+        index = seat_index(cabin, number)
+        if index not in unheld:
+            if not unheld:
+                break
+            index = unheld[0]
+        unheld.remove(index)
+        seat_map.release(index)
+        released += 1
+    if released:
+        inv.seatMap = seat_map.to_bytes()
+        inv.seatsAvailable = min(inv.seatsAvailable + released, inv.capacity)
+        inv.save(update_fields=["seatMap", "seatsAvailable"])
+        scopes = flight_scopes([flight_id])
+        transaction.on_commit(lambda: bump_versions(scopes))
+
+
+def is_cancelled(status_id):
+    return status_id == get_status(*CANCELLED).pk
+
+
+def release_booking_seats(booking):
+    """Free the seats of a booking that has just been cancelled."""
+    seats = {}
+    for ticket in Ticket.objects.filter(booking=booking).only("seatNumber", "isPremium"):
+        seats.setdefault(ticket_cabin(ticket), []).append(ticket.seatNumber)
+    for cabin, seat_numbers in seats.items():
+        release_seats(booking.flight_id, cabin, seat_numbers)
+
+
+def with_seats_available(queryset):
+    """
+    Annotate each flight with ``seats_available``: the sum of its inventory
+    counters or, before its first booking created them, the capacity left
+    after its legacy tickets. Matches ``get_availability`` for every flight.
+    """
+    remaining = FlightSeatInventory.objects.filter(
+        flight=OuterRef('pk')
+    ).values('flight').annotate(total=Sum('seatsAvailable')).values('total')
+    legacy_available = Value(0)
+    for cabin, premium in LEGACY_PREMIUM.items():
+        sold = Ticket.objects.filter(
+            booking__flight=OuterRef('pk'), isPremium=premium
+        ).values('booking__flight').annotate(n=Count('ticketId')).values('n')
+        capacity = cabin_capacity(cabin)
+        legacy_available = legacy_available + Value(capacity) - Least(
+            Coalesce(Subquery(sold), Value(0)), Value(capacity)
+        )
+    return queryset.annotate(
+        seats_available=Coalesce(Subquery(remaining), legacy_available, output_field=IntegerField())
+    )
+
+
+def get_availability(flight_id):
+    """``{cabin: {"capacity": n, "available": n}}`` for one flight."""
+    rows = {
+        inv.cabin: inv
+        for inv in FlightSeatInventory.objects.filter(flight_id=flight_id).only("cabin", "capacity", "seatsAvailable")
+    }
+    legacy = {} if rows else _legacy_taken([flight_id]).get(flight_id, {})
+    availability = {}
+    for cabin in SEAT_LAYOUT:
+        inv = rows.get(cabin)
+        if inv:
+            availability[cabin] = {"capacity": inv.capacity, "available": inv.seatsAvailable}
+        else:
+            capacity = cabin_capacity(cabin)
+            availability[cabin] = {"capacity": capacity, "available": max(capacity - legacy.get(cabin, 0), 0)}
+    return availability
@@ -0,0 +1,71 @@
+"""
+Projection serializers for list endpoints.
+
+List endpoints fetch only the columns a response needs with
+``.values_list()``, shape rows into plain dicts and encode them once with
+orjson, returned as a ready-made ``JSONBytesResponse``. FastAPI does no
+per-row Pydantic validation for a Response, so the response models serve
+only as OpenAPI documentation on this path.
+"""
+from decimal import Decimal
+
+from fastapi import Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # stdlib fallback, same output
+    orjson = None
+    import json
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode='json')
+    if orjson is None and hasattr(value, 'isoformat'):
+        # Match Pydantic/orjson's "Z" suffix for UTC datetimes
+        return value.isoformat().replace('+00:00', 'Z')
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(payload):
+    """Encode to JSON bytes (UTC datetimes as ``...Z``, Decimals as strings)."""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_UTC_Z)
+    return json.dumps(payload, default=_default, separators=(',', ':')).encode()
+
+
+class JSONBytesResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content):
+        return content if isinstance(content, bytes) else dumps(content)
+
+
+class Projection:
+    """
+    Named ``values_list`` projection: ``Projection(id='flightId',
+    status_code='status__code')`` selects just those columns and yields dicts
+    keyed by the output names.
+    """
+
+    def __init__(self, **fields):
+        self.names = tuple(fields)
+        self.lookups = tuple(fields.values())
+
+    def apply(self, queryset):
+        return queryset.values_list(*self.lookups)
+
+    def rows(self, queryset):
+        names = self.names
+        return [dict(zip(names, row)) for row in self.apply(queryset)]
+
+
+def first_by_key(rows, key):
+    """``{row[key]: row}`` keeping the first row per key (rows in pk order)."""
+    first = {}
+    for row in rows:
+        first.setdefault(row[key], row)
+    return first
@@ -0,0 +1,116 @@
+"""
+Per-user response cache for ``/api/policies/mine`` and ``/transactions``.
+
+Entries are CachedResponse bodies (see api.services.response_cache) keyed by
+user, view and request parameters, tagged with the user's ``user:<id>``
+CacheVersion. Every write that changes a user's policies, payments, claims,
+bookings or flights bumps that version on commit (core.policy_summary's
+flush), so a cached response is served only while it is still current; the
+TTL just bounds how long an idle entry lingers.
+
+The store is pluggable through ``USER_RESPONSE_CACHE_BACKEND``: ``memory``
+(per-process LRU) or the alias of a Django cache in ``CACHES`` (e.g. Redis)
+to share entries between workers.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from api.services.response_cache import CachedResponse, make_etag
+from core.cache_versions import get_version, user_scope
+
+
+class MemoryBackend:
+    """Bounded in-process LRU with per-entry expiry, safe to share between threads."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class DjangoCacheBackend:
+    """Shared store on a Django cache alias; values are pickled CachedResponses."""
+
+    def __init__(self, alias):
+        self.cache = caches[alias]
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value, ttl):
+        self.cache.set(key, value, ttl)
+
+    def clear(self):
+        self.cache.clear()
+
+
+def make_backend(name):
+    if name == 'memory':
+        return MemoryBackend(settings.USER_RESPONSE_CACHE_SIZE)
+    return DjangoCacheBackend(name)
+
+
+class UserResponseCache:
+    def __init__(self, backend, ttl):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(view, user_id, params=()):
+        digest = hashlib.sha256(repr(params).encode()).hexdigest()[:16]
+        return f"user_views:{user_id}:{view}:{digest}"
+
+    def version(self, user_id):
+        return get_version(user_scope(user_id))
+
+    def get(self, key, version):
+        entry = self.backend.get(key)
+        if entry is None or entry.version != version:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def put(self, key, version, body, headers=None):
+        """Store an encoded JSON ``body`` built from data at ``version``."""
+        entry = CachedResponse(version=version, body=body, etag=make_etag(body), headers=dict(headers or {}))
+        self.backend.set(key, entry, self.ttl)
+        return entry
+
+
+user_response_cache = UserResponseCache(
+    make_backend(settings.USER_RESPONSE_CACHE_BACKEND), settings.USER_RESPONSE_CACHE_TTL_SECONDS
+)
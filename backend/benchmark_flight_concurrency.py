@@ -0,0 +1,132 @@
+"""
+Concurrent flight search throughput: Django's async ORM vs the ORM pool.
+
+Django's async queryset methods (``aget``, ``afirst``, ``async for`` ...) run
+every query on asgiref's single thread-sensitive thread, so all of them in a
+process execute one at a time. This fires the same burst of flight-list page
+queries (the ``GET /api/flights/`` query, response cache bypassed) two ways:
+
+  async-orm  ``sync_to_async(thread_sensitive=True)``, what the async ORM does
+  orm-pool   ``orm_executor``, what the endpoints use
+
+Synthetic flights are inserted first and deleted afterwards. Against a
+local SQLite file the query never leaves the process, so ``--rtt-ms`` can add
+a per-query network round trip (a GIL-free sleep) to model a database server.
+
+Usage:
+    python benchmark_flight_concurrency.py                    # 2000 queries, 50 concurrent
+    python benchmark_flight_concurrency.py --queries 5000 --concurrency 100
+    python benchmark_flight_concurrency.py --rtt-ms 2         # SQLite, emulating a remote DB
+"""
+
+import os
+import sys
+import django
+from pathlib import Path
+
+# Setup Django
+sys.path.insert(0, str(Path(__file__).parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+import argparse
+import asyncio
+import random
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.db import connection
+from django.utils import timezone
+
+from api.endpoints.flights import FLIGHT_LIST_PROJECTION, FLIGHT_PAGE_KEY, filter_flights
+from api.services.pagination import paginate
+from api.services.seats import with_seats_available
+from core.airports import AIRPORTS
+from core.executors import orm_executor
+from core.models import Flight, StatusLookup
+
+MARKER = f"Benchmark {os.getpid()}"
+DAYS = 30
+RTT_SECONDS = 0.0
+
+
+def seed(rows, start):
+    status, _ = StatusLookup.objects.get_or_create(code='Scheduled', statusType='flight')
+    flights = []
+    for _ in range(rows):
+        origin, destination = random.sample(AIRPORTS, 2)
+        departure = start + timedelta(minutes=random.randint(0, 60 * 24 * DAYS))
+        flights.append(Flight(
+            origin=f"{MARKER} {origin[1]} {origin[0]}",
+            destination=f"{destination[1]} {destination[0]}",
+            originCode=origin[0],
+            destinationCode=destination[0],
+            departureTime=departure,
+            arrivalTime=departure + timedelta(hours=random.randint(1, 14)),
+            status=status
+        ))
+    Flight.objects.bulk_create(flights, batch_size=5000)
+
+
+def network_round_trip(execute, sql, params, many, context):
+    time.sleep(RTT_SECONDS)
+    return execute(sql, params, many, context)
+
+
+def search_page(day):
+    queryset = filter_flights(with_seats_available(Flight.objects.all()), "", "", day)
+    with connection.execute_wrapper(network_round_trip):
+        return paginate(queryset, FLIGHT_PAGE_KEY, None, 50, projection=FLIGHT_LIST_PROJECTION)
+
+
+async def phase(label, run_query, days, concurrency):
+    gate = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(day):
+        async with gate:
+            began = time.perf_counter()
+            await run_query(day)
+            latencies.append((time.perf_counter() - began) * 1000)
+
+    began = time.perf_counter()
+    await asyncio.gather(*(one(day) for day in days))
+    elapsed = time.perf_counter() - began
+    latencies.sort()
+    print(f"  {label:<10} {len(days) / elapsed:8.1f} queries/s   "
+          f"p50 {latencies[len(latencies) // 2]:7.1f} ms   p95 {latencies[int(len(latencies) * 0.95)]:7.1f} ms")
+
+
+async def run(args, start):
+    days = [(start + timedelta(days=random.randrange(DAYS))).date() for _ in range(args.queries)]
+    thread_sensitive = sync_to_async(search_page, thread_sensitive=True)
+
+    print(f"\n=== {args.queries} searches, {args.concurrency} concurrent, +{args.rtt_ms} ms per query "
+          f"(ORM pool: {orm_executor.max_workers} workers) ===")
+    await phase("async-orm", thread_sensitive, days, args.concurrency)
+    await phase("orm-pool", lambda day: orm_executor.run(search_page, day), days, args.concurrency)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent flight search benchmark')
+    parser.add_argument('--rows', type=int, default=20000, help='Synthetic flights to insert')
+    parser.add_argument('--queries', type=int, default=2000, help='Searches per phase')
+    parser.add_argument('--concurrency', type=int, default=50, help='Searches in flight at once')
+    parser.add_argument('--rtt-ms', type=float, default=0.0, help='Emulated network round trip per query')
+    args = parser.parse_args()
+    global RTT_SECONDS
+    RTT_SECONDS = args.rtt_ms / 1000
+
+    start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    print(f"🌱 Seeding {args.rows} flights (deleted afterwards)...")
+    seed(args.rows, start)
+    try:
+        asyncio.run(run(args, start))
+    finally:
+        Flight.objects.filter(origin__startswith=MARKER).delete()
+        print("\n🧹 Synthetic flights deleted")
+
+
+if __name__ == "__main__":
+    main()
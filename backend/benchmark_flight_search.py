@@ -0,0 +1,109 @@
+"""
+Flight search benchmark: query plans and timings for the date/route filters.
+
+Seeds synthetic flights inside a transaction that is rolled back at the end
+(the database is left untouched), then compares the legacy
+``departureTime__date`` filter with the half-open range used by
+``GET /api/flights/`` and prints the plan of each.
+
+Usage:
+    python benchmark_flight_search.py                # 50k flights, 20 runs
+    python benchmark_flight_search.py --rows 200000 --runs 50
+"""
+
+import os
+import sys
+import django
+from pathlib import Path
+
+# Setup Django
+sys.path.insert(0, str(Path(__file__).parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+import argparse
+import random
+import time
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.airports import AIRPORTS
+from core.models import Flight, StatusLookup
+from api.endpoints.flights import departure_day_range
+
+
+class Rollback(Exception):
+    pass
+
+
+def seed(rows, start):
+    status, _ = StatusLookup.objects.get_or_create(code='Scheduled', statusType='flight')
+    flights = []
+    for i in range(rows):
+        origin, destination = random.sample(AIRPORTS, 2)
+        departure = start + timedelta(minutes=random.randint(0, 60 * 24 * 90))
+        flights.append(Flight(
+            origin=f"{origin[1]} {origin[0]}",
+            destination=f"{destination[1]} {destination[0]}",
+            originCode=origin[0],
+            destinationCode=destination[0],
+            departureTime=departure,
+            arrivalTime=departure + timedelta(hours=random.randint(1, 14)),
+            status=status
+        ))
+    Flight.objects.bulk_create(flights, batch_size=5000)
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE flight")
+
+
+def timed(queryset, runs):
+    samples = []
+    for _ in range(runs):
+        began = time.perf_counter()
+        list(queryset.all())  # fresh clone: skip the result cache
+        samples.append((time.perf_counter() - began) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def report(label, queryset, runs):
+    print(f"\n=== {label} ===")
+    print(queryset.explain())
+    print(f"median {timed(queryset, runs):.2f} ms over {runs} runs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Flight search query-plan benchmark')
+    parser.add_argument('--rows', type=int, default=50000, help='Synthetic flights to insert')
+    parser.add_argument('--runs', type=int, default=20, help='Timed runs per query')
+    args = parser.parse_args()
+
+    start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    day = (start + timedelta(days=30)).date()
+    base = Flight.objects.order_by('departureTime', 'flightId')
+
+    try:
+        with transaction.atomic():
+            print(f"🌱 Seeding {args.rows} flights (rolled back afterwards)...")
+            seed(args.rows, start)
+
+            report("date filter: departureTime__date (legacy)",
+                   base.filter(departureTime__date=day)[:50], args.runs)
+            report("date filter: half-open range",
+                   base.filter(**departure_day_range(day))[:50], args.runs)
+            report("route + date: originCode + range",
+                   base.filter(originCode='JFK', **departure_day_range(day))[:50], args.runs)
+            report("route: origin__icontains (legacy)",
+                   base.filter(origin__icontains='New York')[:50], args.runs)
+            report("route: originCode__in",
+                   base.filter(originCode__in=['JFK', 'LGA', 'EWR'])[:50], args.runs)
+            raise Rollback()
+    except Rollback:
+        print("\n🧹 Synthetic flights rolled back")
+
+
+if __name__ == "__main__":
+    main()
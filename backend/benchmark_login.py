@@ -0,0 +1,123 @@
+"""
+Login throughput benchmark: inline PBKDF2 vs the password process pool.
+
+Creates a throwaway Django user, then fires a burst of concurrent logins two
+ways while a probe keeps running a small flight query on the ORM executor
+(standing in for the rest of the API) and timing it:
+
+  inline  authenticate() on Starlette's shared threadpool (the old sync
+          ``login`` endpoint)
+  pool    the async ``login`` endpoint, hashing on ``password_executor``
+
+The user is deleted afterwards.
+
+Usage:
+    python benchmark_login.py                       # 100 logins, 40 concurrent
+    python benchmark_login.py --logins 500 --concurrency 100
+"""
+
+import os
+import sys
+import django
+from pathlib import Path
+
+# Setup Django
+sys.path.insert(0, str(Path(__file__).parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+import argparse
+import asyncio
+import time
+
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from starlette.concurrency import run_in_threadpool
+
+from api.endpoints.auth import LoginRequest, login
+from core.executors import orm_executor, password_executor
+from core.models import Flight
+from core.passwords import hash_password
+
+USERNAME = f"benchmark_login_{os.getpid()}"
+PASSWORD = "benchmark-password"
+
+
+def probe_query():
+    return list(Flight.objects.order_by('departureTime', 'flightId').values_list('flightId', flat=True)[:50])
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def probe(stop, samples):
+    while not stop.is_set():
+        began = time.perf_counter()
+        await orm_executor.run(probe_query)
+        samples.append((time.perf_counter() - began) * 1000)
+        await asyncio.sleep(0.02)
+
+
+async def inline_login():
+    return await run_in_threadpool(authenticate, username=USERNAME, password=PASSWORD)
+
+
+async def pool_login():
+    return await login(LoginRequest(username=USERNAME, password=PASSWORD))
+
+
+async def phase(label, login_fn, logins, concurrency):
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with gate:
+            await login_fn()
+
+    stop, samples = asyncio.Event(), []
+    prober = asyncio.create_task(probe(stop, samples))
+    began = time.perf_counter()
+    if login_fn is None:
+        await asyncio.sleep(2)
+    else:
+        await asyncio.gather(*(one() for _ in range(logins)))
+    elapsed = time.perf_counter() - began
+    stop.set()
+    await prober
+
+    rate = f"{logins / elapsed:7.1f} logins/s" if login_fn else " " * 16
+    print(f"  {label:<8} {rate}   probe p50 {percentile(samples, 0.5):7.1f} ms   "
+          f"p95 {percentile(samples, 0.95):7.1f} ms   max {max(samples):7.1f} ms")
+
+
+async def run(args):
+    # Start the worker processes before timing anything
+    await asyncio.gather(*(password_executor.run(hash_password, PASSWORD) for _ in range(password_executor.max_workers)))
+
+    print(f"\n=== {args.logins} logins, {args.concurrency} concurrent "
+          f"(password pool: {password_executor.max_workers} workers) ===")
+    await phase("idle", None, 0, 0)
+    await phase("inline", inline_login, args.logins, args.concurrency)
+    await phase("pool", pool_login, args.logins, args.concurrency)
+    print(f"\n  password executor: {password_executor.metrics()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Login throughput benchmark')
+    parser.add_argument('--logins', type=int, default=100, help='Logins per phase')
+    parser.add_argument('--concurrency', type=int, default=40, help='Logins in flight at once')
+    args = parser.parse_args()
+
+    print(f"🌱 Creating benchmark user {USERNAME} (deleted afterwards)...")
+    User.objects.create(username=USERNAME, email=f"{USERNAME}@example.com", password=make_password(PASSWORD))
+    try:
+        asyncio.run(run(args))
+    finally:
+        User.objects.filter(username=USERNAME).delete()
+        print("\n🧹 Benchmark user deleted")
+
+
+if __name__ == "__main__":
+    main()
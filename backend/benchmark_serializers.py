@@ -0,0 +1,191 @@
+"""
+List serialization benchmark: model instances + Pydantic vs values_list projections + orjson.
+
+Seeds synthetic flights and one user's bookings (ticket, payment, policy
+each) inside a transaction that is rolled back at the end, then times the
+data path of the flights and policies list endpoints both ways:
+
+  legacy      select_related/prefetch instances -> attribute copies ->
+              Pydantic response-model validation -> jsonable_encoder -> json
+  projection  values_list projection -> dicts -> orjson (api.services.serializers)
+  summary     (policies only) stored policy_summary rows joined as-is
+
+Usage:
+    python benchmark_serializers.py              # 10k rows, 5 runs
+    python benchmark_serializers.py --rows 50000 --runs 10
+"""
+
+import os
+import sys
+import django
+from pathlib import Path
+
+# Setup Django
+sys.path.insert(0, str(Path(__file__).parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+import argparse
+import json
+import time
+from datetime import timedelta
+from typing import List
+
+from django.db import transaction
+from django.utils import timezone
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from core.models import AppUser, Booking, Flight, InsurancePolicy, Payment, PolicySummary, StatusLookup, Ticket
+from api.endpoints.flights import FLIGHT_LIST_PROJECTION, FlightSchema, to_flight_schema, with_seats_available
+from api.endpoints.policies import PolicyResponse
+from api.services.serializers import dumps
+from core.policy_summary import (
+    PAYMENT_AMOUNT_PROJECTION, SUMMARY_PROJECTION, TICKET_PROJECTION,
+    first_rows_by_booking, rebuild_policy_summaries
+)
+
+
+class Rollback(Exception):
+    pass
+
+
+def seed(rows):
+    now = timezone.now()
+    scheduled, _ = StatusLookup.objects.get_or_create(code='Scheduled', statusType='flight')
+    confirmed, _ = StatusLookup.objects.get_or_create(code='Confirmed', statusType='booking')
+    completed, _ = StatusLookup.objects.get_or_create(code='Completed', statusType='payment')
+    active, _ = StatusLookup.objects.get_or_create(code='Active', statusType='policy')
+    user = AppUser.objects.create(name='Benchmark User', email='benchmark@example.com')
+
+    flights = Flight.objects.bulk_create([
+        Flight(origin='New York JFK', destination='London Heathrow', originCode='JFK', destinationCode='LHR',
+               departureTime=now + timedelta(minutes=i), arrivalTime=now + timedelta(minutes=i, hours=7),
+               status=scheduled)
+        for i in range(rows)
+    ], batch_size=2000)
+    bookings = Booking.objects.bulk_create([
+        Booking(user=user, flight=flight, bookingDate=now, status=confirmed) for flight in flights
+    ], batch_size=2000)
+    Ticket.objects.bulk_create([
+        Ticket(booking=b, seatNumber='12A', company='Global Air', price=500, issueDate=now, isPremium=False)
+        for b in bookings
+    ], batch_size=2000)
+    Payment.objects.bulk_create([
+        Payment(booking=b, amount=525, paymentMethod='Credit Card', paymentDate=now, status=completed)
+        for b in bookings
+    ], batch_size=2000)
+    InsurancePolicy.objects.bulk_create([
+        InsurancePolicy(booking=b, coverageAmount=250, premium=25, status=active) for b in bookings
+    ], batch_size=2000)
+    return user
+
+
+def legacy_flights():
+    flights = with_seats_available(Flight.objects.select_related('status')).order_by('departureTime', 'flightId')
+    payload = TypeAdapter(List[FlightSchema]).validate_python([to_flight_schema(f) for f in flights])
+    return json.dumps(jsonable_encoder(payload)).encode()
+
+
+def projection_flights():
+    flights = with_seats_available(Flight.objects.all()).order_by('departureTime', 'flightId')
+    return dumps(FLIGHT_LIST_PROJECTION.rows(flights))
+
+
+def policy_row(user, policy, ticket, payment):
+    flight = policy['flight']
+    return {
+        "id": policy['id'], "user_id": user.user_id, "flight_id": f"FL{flight['id']}",
+        "premium_paid": str(policy['premium']), "coverage_amount": str(policy['coverage']),
+        "start_time": flight['departure'].isoformat(), "end_time": flight['arrival'].isoformat(),
+        "status": policy['status'].upper(), "route": f"{flight['origin']} → {flight['destination']}",
+        "origin": flight['origin'], "destination": flight['destination'],
+        "ticket_price": str(ticket['price']) if ticket else "0.00",
+        "seat_number": ticket['seat'] if ticket else "N/A",
+        "total_paid": str(payment['amount']) if payment else "0.00",
+        "booking_id": policy['booking_id'], "passenger": user.name, "email": user.email, "phone": user.phone,
+    }
+
+
+def legacy_policies(user):
+    policies = InsurancePolicy.objects.filter(booking__user=user).select_related(
+        'booking', 'booking__flight', 'booking__flight__status', 'status'
+    ).prefetch_related('booking__ticket_set', 'booking__payment_set').order_by('policyId')
+    rows = []
+    for p in policies:
+        flight = p.booking.flight
+        ticket = next(iter(p.booking.ticket_set.all()), None)
+        payment = next(iter(p.booking.payment_set.all()), None)
+        rows.append(policy_row(
+            user,
+            {"id": p.policyId, "premium": p.premium, "coverage": p.coverageAmount, "status": p.status.code,
+             "booking_id": p.booking.bookingId,
+             "flight": {"id": flight.flightId, "origin": flight.origin, "destination": flight.destination,
+                        "departure": flight.departureTime, "arrival": flight.arrivalTime}},
+            {"price": ticket.price, "seat": ticket.seatNumber} if ticket else None,
+            {"amount": payment.amount} if payment else None,
+        ))
+    payload = TypeAdapter(List[PolicyResponse]).validate_python(rows)
+    return json.dumps(jsonable_encoder(payload)).encode()
+
+
+def projection_policies(user):
+    policies = SUMMARY_PROJECTION.rows(InsurancePolicy.objects.filter(booking__user=user).order_by('policyId'))
+    booking_ids = {p['booking_id'] for p in policies}
+    tickets = first_rows_by_booking(TICKET_PROJECTION, Ticket, booking_ids)
+    payments = first_rows_by_booking(PAYMENT_AMOUNT_PROJECTION, Payment, booking_ids)
+    rows = []
+    for p in policies:
+        p['flight'] = {"id": p['flight_id'], "origin": p['origin'], "destination": p['destination'],
+                       "departure": p['departure'], "arrival": p['arrival']}
+        rows.append(policy_row(user, p, tickets.get(p['booking_id']), payments.get(p['booking_id'])))
+    return dumps(rows)
+
+
+def summary_policies(user):
+    payloads = PolicySummary.objects.filter(user=user).order_by('policy_id').values_list('payload', flat=True)
+    return ("[" + ",".join(payloads) + "]").encode()
+
+
+def timed(label, fn, runs):
+    samples, size = [], 0
+    for _ in range(runs):
+        began = time.perf_counter()
+        size = len(fn())
+        samples.append((time.perf_counter() - began) * 1000)
+    samples.sort()
+    median = samples[len(samples) // 2]
+    print(f"  {label:<12} median {median:8.1f} ms   ({size / 1024:.0f} KiB)")
+    return median
+
+
+def main():
+    parser = argparse.ArgumentParser(description='List serialization benchmark')
+    parser.add_argument('--rows', type=int, default=10000, help='Flights/policies to insert')
+    parser.add_argument('--runs', type=int, default=5, help='Timed runs per path')
+    args = parser.parse_args()
+
+    try:
+        with transaction.atomic():
+            print(f"🌱 Seeding {args.rows} flights and policies (rolled back afterwards)...")
+            user = seed(args.rows)
+
+            print(f"\n=== flights list ({Flight.objects.count()} rows) ===")
+            legacy = timed("legacy", legacy_flights, args.runs)
+            fast = timed("projection", projection_flights, args.runs)
+            print(f"  speedup      {legacy / fast:.1f}x")
+
+            print(f"\n=== my policies ({args.rows} rows) ===")
+            legacy = timed("legacy", lambda: legacy_policies(user), args.runs)
+            fast = timed("projection", lambda: projection_policies(user), args.runs)
+            print(f"  speedup      {legacy / fast:.1f}x")
+            rebuild_policy_summaries(InsurancePolicy.objects.filter(booking__user=user).values_list('policyId', flat=True))
+            summary = timed("summary", lambda: summary_policies(user), args.runs)
+            print(f"  speedup      {legacy / summary:.1f}x")
+            raise Rollback()
+    except Rollback:
+        print("\n🧹 Synthetic rows rolled back")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Standing ERC20 allowance for the insurance contract.
+
+Rather than approving each premium right before buyPolicy, the deployer keeps
+one large allowance for the UserDelayInsurance contract and the remaining
+budget is tracked locally. An approve transaction is only sent when the budget
+runs low, so it disappears from the per-policy hot path.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from loguru import logger
+
+
+class AllowanceBudget:
+    def __init__(self, web3, token, owner, spender, standing_amount, low_water):
+        self._w3 = web3
+        self.token = token
+        self.owner = owner
+        self.spender = spender
+        self.standing_amount = standing_amount
+        self.low_water = low_water
+        self._lock = threading.Lock()
+        self._remaining = None  # unknown until first read from the chain
+        self.top_ups = 0
+
+    def _read_allowance(self):
+        return self.token.functions.allowance(self.owner, self.spender).call(block_identifier='pending')
+
+    def _top_up(self, nonces):
+        logger.info(f"🔓 Topping up token allowance for {self.spender} to {self.standing_amount}")
+        nonces.transact(
+            self.token.functions.approve(self.spender, self.standing_amount),
+            self.owner
+        )
+        self._remaining = self.standing_amount
+        self.top_ups += 1
+
+    @contextmanager
+    def spending(self, amount, nonces):
+        """
+        Reserve ``amount`` of allowance for a transaction sent inside the block.
+
+        The lock is held until the block exits, so the spending transaction
+        always takes a nonce after any top-up approve it depends on. If the
+        block raises, the budget is re-read from the chain next time.
+        """
+        with self._lock:
+            if self._remaining is None:
+                self._remaining = self._read_allowance()
+            if self._remaining < max(amount, self.low_water):
+                self._top_up(nonces)
+            self._remaining -= amount
+            try:
+                yield
+            except Exception:
+                self._remaining = None
+                raise
+
+    def invalidate(self):
+        with self._lock:
+            self._remaining = None
+
+    @property
+    def remaining(self):
+        return self._remaining
+
+
+_budget = None
+_budget_lock = threading.Lock()
+
+
+def get_allowance_budget(token, owner, spender):
+    """Shared budget for ``owner`` -> ``spender`` on ``token`` (rebuilt if they change)."""
+    global _budget
+    from blockchain.contract_loader import w3
+    with _budget_lock:
+        if _budget is None or (_budget.token.address, _budget.owner, _budget.spender) != (token.address, owner, spender):
+            _budget = AllowanceBudget(
+                w3,
+                token,
+                owner,
+                spender,
+                standing_amount=w3.to_wei(settings.TOKEN_ALLOWANCE_STANDING, 'ether'),
+                low_water=w3.to_wei(settings.TOKEN_ALLOWANCE_LOW_WATER, 'ether'),
+            )
+        return _budget
@@ -4,6 +4,8 @@ Loads deployed smart contracts and provides Web3 interface.
 """
 import json
 import os
+import threading
+import time
 from pathlib import Path
 from web3 import Web3
 from loguru import logger
@@ -11,6 +13,9 @@ from loguru import logger
 # Get blockchain RPC URL from environment
 BLOCKCHAIN_RPC_URL = os.environ.get('BLOCKCHAIN_RPC_URL', 'http://127.0.0.1:8545')
 
+# How often contract lookups re-check that the node is reachable
+CONNECTION_CHECK_SECONDS = float(os.environ.get('BLOCKCHAIN_CONNECTION_CHECK_SECONDS', '5'))
+
 # Path to deployed addresses JSON
 DEPLOYED_ADDRESSES_PATH = Path(__file__).parent.parent.parent / "smart contracts and etls" / "deployed_addresses.json"
 
@@ -31,8 +36,8 @@ except Exception as e:
     w3 = None
 
 
-def load_deployed_addresses():
-    """Load deployed contract addresses from JSON file."""
+def read_deployed_addresses():
+    """Read deployed contract addresses from the JSON file on disk."""
     try:
         with open(DEPLOYED_ADDRESSES_PATH, 'r') as f:
             addresses = json.load(f)
@@ -46,9 +51,13 @@ def load_deployed_addresses():
         return None
 
 
-def load_contract_abi(contract_name):
-    """Load contract ABI from artifacts."""
-    abi_file = ABI_PATH / f"{contract_name}.sol" / f"{contract_name}.json"
+def artifact_path(contract_name):
+    return ABI_PATH / f"{contract_name}.sol" / f"{contract_name}.json"
+
+
+def read_contract_abi(contract_name):
+    """Read a contract ABI from its Hardhat artifact on disk."""
+    abi_file = artifact_path(contract_name)
     try:
         with open(abi_file, 'r') as f:
             artifact = json.load(f)
@@ -61,56 +70,145 @@ def load_contract_abi(contract_name):
         return None
 
 
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class ContractRegistry:
+    """
+    Process-wide cache of deployed addresses, ABIs and contract objects.
+
+    Files are parsed once and re-read only when their mtime changes (a
+    redeploy rewrites deployed_addresses.json, a recompile the artifacts), so
+    a lookup costs two ``stat`` calls. Failed loads are cached against the
+    same mtimes and retried once the files change. Node connectivity is
+    re-checked at most every ``CONNECTION_CHECK_SECONDS`` instead of on
+    every lookup.
+    """
+
+    def __init__(self, connection_check_seconds):
+        self.connection_check_seconds = connection_check_seconds
+        self._lock = threading.Lock()
+        self._addresses = (None, None)  # (mtime, addresses)
+        self._abis = {}  # contract name -> (mtime, abi)
+        self._contracts = {}  # contract name -> ((addresses mtime, abi mtime), contract)
+        self._connected = None  # (checked at, connected)
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def is_connected(self):
+        if not w3:
+            return False
+        now = time.monotonic()
+        if self._connected is not None and now - self._connected[0] < self.connection_check_seconds:
+            return self._connected[1]
+        try:
+            connected = w3.is_connected()
+        except Exception:
+            connected = False
+        self._connected = (now, connected)
+        return connected
+
+    def _addresses_at(self, mtime):
+        if self._addresses[0] != mtime or mtime is None:
+            self._addresses = (mtime, read_deployed_addresses())
+        return self._addresses[1]
+
+    def _abi_at(self, contract_name, mtime):
+        entry = self._abis.get(contract_name)
+        if entry is None or entry[0] != mtime or mtime is None:
+            entry = self._abis[contract_name] = (mtime, read_contract_abi(contract_name))
+        return entry[1]
+
+    def deployed_addresses(self):
+        """Copy of the current deployed addresses, or None if unavailable."""
+        mtime = _mtime(DEPLOYED_ADDRESSES_PATH)
+        with self._lock:
+            addresses = self._addresses_at(mtime)
+        return dict(addresses) if addresses else None
+
+    def abi(self, contract_name):
+        mtime = _mtime(artifact_path(contract_name))
+        with self._lock:
+            return self._abi_at(contract_name, mtime)
+
+    def contract(self, contract_name, address_key):
+        """Contract object for ``contract_name`` at ``addresses[address_key]``, or None."""
+        if not self.is_connected():
+            return None
+        stamp = (_mtime(DEPLOYED_ADDRESSES_PATH), _mtime(artifact_path(contract_name)))
+        with self._lock:
+            entry = self._contracts.get(contract_name)
+            if entry is not None and entry[0] == stamp and None not in stamp:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            if entry is not None and entry[0] != stamp:
+                self.reloads += 1
+
+            addresses = self._addresses_at(stamp[0])
+            abi = self._abi_at(contract_name, stamp[1])
+            contract_address = addresses.get(address_key) if addresses else None
+            contract = None
+            if addresses and abi:
+                if contract_address:
+                    contract = w3.eth.contract(address=contract_address, abi=abi)
+                    logger.info(f"✅ Loaded {contract_name} contract at {contract_address}")
+                else:
+                    logger.error(f"❌ {contract_name} address not found in deployed addresses")
+            self._contracts[contract_name] = (stamp, contract)
+            return contract
+
+    def clear(self):
+        with self._lock:
+            self._addresses = (None, None)
+            self._abis.clear()
+            self._contracts.clear()
+            self._connected = None
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "contracts": sorted(name for name, (_, contract) in self._contracts.items() if contract),
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+            }
+
+
+contract_registry = ContractRegistry(CONNECTION_CHECK_SECONDS)
+
+
+def load_deployed_addresses():
+    """Load deployed contract addresses (cached until the file changes)."""
+    return contract_registry.deployed_addresses()
+
+
+def load_contract_abi(contract_name):
+    """Load contract ABI from artifacts (cached until the file changes)."""
+    return contract_registry.abi(contract_name)
+
+
 def get_insurance_contract():
     """Get UserDelayInsurance contract instance."""
-    if not w3 or not w3.is_connected():
+    contract = contract_registry.contract("UserDelayInsurance", 'userInsurance')
+    if contract is None and not contract_registry.is_connected():
         logger.warning("⚠️ Blockchain not connected, returning None")
-        return None
-    
-    addresses = load_deployed_addresses()
-    if not addresses:
-        return None
-    
-    abi = load_contract_abi("UserDelayInsurance")
-    if not abi:
-        return None
-    
-    contract_address = addresses.get('userInsurance')
-    if not contract_address:
-        logger.error("❌ UserDelayInsurance address not found in deployed addresses")
-        return None
-    
-    contract = w3.eth.contract(address=contract_address, abi=abi)
-    logger.info(f"✅ Loaded UserDelayInsurance contract at {contract_address}")
     return contract
 
 
 def get_token_contract():
     """Get MockToken contract instance."""
-    if not w3 or not w3.is_connected():
-        return None
-    
-    addresses = load_deployed_addresses()
-    if not addresses:
-        return None
-    
-    abi = load_contract_abi("MockToken")
-    if not abi:
-        return None
-    
-    contract_address = addresses.get('token')
-    if not contract_address:
-        logger.error("❌ MockToken address not found")
-        return None
-    
-    contract = w3.eth.contract(address=contract_address, abi=abi)
-    logger.info(f"✅ Loaded MockToken contract at {contract_address}")
-    return contract
+    return contract_registry.contract("MockToken", 'token')
 
 
 def get_default_account():
     """Get default account for transactions (deployer account)."""
-    if not w3 or not w3.is_connected():
+    if not contract_registry.is_connected():
         return None
     
     try:
@@ -131,5 +229,6 @@ __all__ = [
     'get_insurance_contract',
     'get_token_contract',
     'get_default_account',
-    'load_deployed_addresses'
+    'load_deployed_addresses',
+    'contract_registry'
 ]
@@ -0,0 +1,107 @@
+"""
+On-chain policy issuance for UserDelayInsurance.
+
+Used by the policy outbox worker; never called on the HTTP request path.
+Issuance is split into ``submit_buy_policy`` (send, no waiting) and
+``confirm_buy_policy`` (wait for the receipt) so the worker can put a whole
+batch of transactions in flight before waiting on any of them.
+"""
+from loguru import logger
+from web3 import Web3
+from web3.exceptions import TransactionNotFound
+
+from blockchain.contract_loader import (
+    get_insurance_contract,
+    get_token_contract,
+    get_default_account,
+    w3
+)
+from blockchain.nonce_manager import get_nonce_manager
+from blockchain.allowance import get_allowance_budget
+from blockchain.receipt_waiter import wait_for_receipt
+
+# For demo: use a fixed flight ID that we know exists
+# In production, flights would be properly synced between DB and blockchain
+DEMO_FLIGHT_ID = "DEMO_FLIGHT"
+
+
+class BlockchainUnavailable(RuntimeError):
+    """Raised when the node, contract or deployer account cannot be reached."""
+
+
+def submit_buy_policy(policy, ticket_id, delay_threshold):
+    """
+    Send buyPolicy for a database policy and return the transaction hash
+    without waiting for it to be mined.
+
+    The premium is drawn from the deployer's standing allowance; an approve
+    is only sent (with an earlier nonce) when that budget runs low.
+    Raises BlockchainUnavailable when the chain is not reachable.
+    """
+    contract = get_insurance_contract()
+    account = get_default_account()
+    nonces = get_nonce_manager()
+    if not (contract and account and w3 and nonces):
+        raise BlockchainUnavailable("Blockchain not available")
+
+    # Convert amounts to Wei (blockchain format)
+    premium_wei = w3.to_wei(policy.premium, 'ether')
+    payout_wei = w3.to_wei(policy.coverageAmount, 'ether')
+
+    buy_policy = contract.functions.buyPolicy(
+        DEMO_FLIGHT_ID,             # flightId - using demo flight for now
+        ticket_id,                  # ticketId
+        policy.booking_id,          # bookingId
+        delay_threshold,            # delayThresholdMinutes
+        premium_wei,                # premiumAmount
+        payout_wei                  # payoutAmount
+    )
+
+    token_contract = get_token_contract()
+    if not token_contract:
+        return nonces.transact(buy_policy, account)
+
+    budget = get_allowance_budget(token_contract, account, contract.address)
+    with budget.spending(premium_wei, nonces):
+        return nonces.transact(buy_policy, account)
+
+
+def confirm_buy_policy(tx_hash, timeout=120):
+    """Wait for a buyPolicy transaction and return ``(tx_hash_hex, blockchain_policy_id)``."""
+    contract = get_insurance_contract()
+    receipt = wait_for_receipt(tx_hash, timeout=timeout)
+    # 0x-prefixed, the same form the outbox stores
+    tx_hash_hex = Web3.to_hex(tx_hash)
+    if receipt['status'] != 1:
+        raise RuntimeError(f"buyPolicy reverted: {tx_hash_hex}")
+
+    # Get blockchain policy ID from event logs
+    blockchain_policy_id = None
+    event = contract.events.PolicyCreated().process_receipt(receipt)
+    if event:
+        blockchain_policy_id = event[0]['args']['policyId']
+
+    logger.info(f"✅ Blockchain policy created: TX={tx_hash_hex}, PolicyID={blockchain_policy_id}")
+    return tx_hash_hex, blockchain_policy_id
+
+
+def lookup_transaction(tx_hash):
+    """
+    State of a transaction sent earlier: ``'mined'``, ``'reverted'``,
+    ``'pending'`` (known to the node but not mined yet) or ``'dropped'``.
+    Raises BlockchainUnavailable when the chain is not reachable.
+    """
+    if not w3:
+        raise BlockchainUnavailable("Blockchain not available")
+    try:
+        receipt = w3.eth.get_transaction_receipt(tx_hash)
+    except TransactionNotFound:
+        receipt = None
+    if receipt is not None:
+        return 'mined' if receipt['status'] == 1 else 'reverted'
+    try:
+        w3.eth.get_transaction(tx_hash)
+    except TransactionNotFound:
+        return 'dropped'
+    return 'pending'
+
@@ -0,0 +1,90 @@
+"""
+Process-wide nonce manager for the deployer and oracle accounts.
+
+Instead of letting the node pick the nonce (which forces callers to wait for
+each receipt before sending the next transaction), nonces are handed out
+locally so many transactions from the same account can be in flight at once.
+The counter is seeded from the node's ``pending`` transaction count and
+resynced whenever a send fails, so a dropped nonce never leaves a gap that
+stalls later transactions.
+"""
+import threading
+
+from loguru import logger
+from web3 import Web3
+
+# Substrings of node errors that mean our local counter has drifted
+NONCE_ERRORS = (
+    "nonce too low",
+    "nonce too high",
+    "already known",
+    "replacement transaction underpriced",
+    "nonce has already been used",
+    "invalid nonce",
+)
+
+
+def is_nonce_error(error):
+    message = str(error).lower()
+    return any(fragment in message for fragment in NONCE_ERRORS)
+
+
+class NonceManager:
+    def __init__(self, web3):
+        self._w3 = web3
+        self._lock = threading.Lock()
+        self._next = {}  # checksum address -> next nonce to hand out
+
+    def _chain_nonce(self, address):
+        return self._w3.eth.get_transaction_count(address, 'pending')
+
+    def reserve(self, address):
+        """Hand out the next nonce for ``address``."""
+        address = Web3.to_checksum_address(address)
+        with self._lock:
+            if address not in self._next:
+                self._next[address] = self._chain_nonce(address)
+            nonce = self._next[address]
+            self._next[address] = nonce + 1
+            return nonce
+
+    def resync(self, address):
+        """Reset the local counter to the node's pending count (fills gaps)."""
+        address = Web3.to_checksum_address(address)
+        with self._lock:
+            self._next[address] = self._chain_nonce(address)
+            logger.info(f"🔄 Nonce for {address} resynced to {self._next[address]}")
+
+    def transact(self, contract_call, sender, tx=None, retries=1):
+        """
+        Send ``contract_call`` from ``sender`` with a locally managed nonce and
+        return the transaction hash without waiting for the receipt.
+
+        Any send failure resyncs the counter; nonce conflicts are retried up to
+        ``retries`` times, other errors are re-raised.
+        """
+        for attempt in range(retries + 1):
+            nonce = self.reserve(sender)
+            try:
+                return contract_call.transact({**(tx or {}), 'from': sender, 'nonce': nonce})
+            except Exception as e:
+                logger.warning(f"⚠️ Transaction with nonce {nonce} from {sender} failed: {e}")
+                self.resync(sender)
+                if attempt == retries or not is_nonce_error(e):
+                    raise
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_nonce_manager():
+    """Shared NonceManager bound to contract_loader.w3 (None when offline)."""
+    global _manager
+    from blockchain.contract_loader import w3
+    if not w3:
+        return None
+    with _manager_lock:
+        if _manager is None:
+            _manager = NonceManager(w3)
+        return _manager
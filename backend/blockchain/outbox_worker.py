@@ -0,0 +1,190 @@
+"""
+Background worker that drains the policy issuance outbox.
+
+Bookings commit an InsurancePolicy together with a PolicyIssuanceOutbox row in
+state ``issuing``. This worker claims due rows, calls buyPolicy, and records
+``blockchainPolicyId``/``blockchainTxHash`` on the policy, so booking latency
+no longer depends on block times.
+
+Claiming is a conditional UPDATE that pushes ``nextAttemptAt`` forward by the
+lease, so several workers (or a crashed one) never double-submit a row while
+its lease is live. The hash of every buyPolicy sent is saved on the row
+(state ``submitted``) before its receipt is awaited; a retry after a receipt
+timeout, a crash or an expired lease looks that transaction up first and only
+sends buyPolicy again if it reverted or was dropped by the node.
+
+Runs in-process from config/asgi.py on startup, or standalone via
+``python policy_outbox_worker.py``.
+"""
+import threading
+from concurrent.futures import Future
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from hexbytes import HexBytes
+from loguru import logger
+from web3 import Web3
+
+from core.executors import blockchain_executor, ExecutorSaturated
+from core.models import PolicyIssuanceOutbox
+
+
+PENDING_STATES = (PolicyIssuanceOutbox.STATE_ISSUING, PolicyIssuanceOutbox.STATE_SUBMITTED)
+
+
+def _backoff(attempts):
+    """Exponential retry delay: 5s, 10s, 20s, ... capped at 5 minutes."""
+    return timedelta(seconds=min(5 * 2 ** max(attempts - 1, 0), 300))
+
+
+class PolicyIssuanceWorker:
+    def __init__(self, poll_seconds=None, batch_size=None, max_attempts=None, lease_seconds=None):
+        self.poll_seconds = poll_seconds or settings.POLICY_OUTBOX_POLL_SECONDS
+        self.batch_size = batch_size or settings.POLICY_OUTBOX_BATCH_SIZE
+        self.max_attempts = max_attempts or settings.POLICY_OUTBOX_MAX_ATTEMPTS
+        self.lease = timedelta(seconds=lease_seconds or settings.POLICY_OUTBOX_LEASE_SECONDS)
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    # -- claiming -----------------------------------------------------------
+
+    def _due_ids(self):
+        return list(
+            PolicyIssuanceOutbox.objects.filter(
+                state__in=PENDING_STATES,
+                nextAttemptAt__lte=timezone.now()
+            ).order_by('nextAttemptAt').values_list('outboxId', flat=True)[:self.batch_size]
+        )
+
+    def _claim(self, outbox_id):
+        """Take the lease on a row; False if another worker got there first."""
+        now = timezone.now()
+        return PolicyIssuanceOutbox.objects.filter(
+            outboxId=outbox_id,
+            state__in=PENDING_STATES,
+            nextAttemptAt__lte=now
+        ).update(
+            attempts=F('attempts') + 1,
+            nextAttemptAt=now + self.lease,
+            updatedAt=now
+        ) == 1
+
+    # -- processing ---------------------------------------------------------
+
+    def _submit(self, outbox_id):
+        """Claim a row and send its transactions; returns (row, tx_hash) or None."""
+        from blockchain.issuance import submit_buy_policy, lookup_transaction
+
+        if not self._claim(outbox_id):
+            return None
+        row = PolicyIssuanceOutbox.objects.select_related('policy').get(outboxId=outbox_id)
+        try:
+            if row.txHash:
+                status = lookup_transaction(row.txHash)
+                if status in ('mined', 'pending'):
+                    return row, HexBytes(row.txHash)
+                logger.warning(f"⚠️ Policy {row.policy_id} buyPolicy {row.txHash} was {status}, sending it again")
+            tx_hash = submit_buy_policy(row.policy, row.ticketId, row.delayThreshold)
+        except Exception as e:
+            self._record_failure(row, e)
+            return None
+
+        row.txHash = Web3.to_hex(tx_hash)
+        row.state = PolicyIssuanceOutbox.STATE_SUBMITTED
+        row.save(update_fields=['txHash', 'state', 'updatedAt'])
+        return row, tx_hash
+
+    def _confirm(self, row, tx_hash):
+        from blockchain.issuance import confirm_buy_policy
+
+        try:
+            tx_hash_hex, blockchain_policy_id = confirm_buy_policy(tx_hash)
+        except Exception as e:
+            self._record_failure(row, e)
+            return False
+
+        policy = row.policy
+        with transaction.atomic():
+            policy.blockchainPolicyId = blockchain_policy_id
+            policy.blockchainTxHash = tx_hash_hex
+            policy.save(update_fields=['blockchainPolicyId', 'blockchainTxHash'])
+            row.state = PolicyIssuanceOutbox.STATE_ISSUED
+            row.lastError = None
+            row.save(update_fields=['state', 'lastError', 'updatedAt'])
+        return True
+
+    def _record_failure(self, row, error):
+        row.lastError = f"{type(error).__name__}: {error}"
+        if row.attempts >= self.max_attempts:
+            row.state = PolicyIssuanceOutbox.STATE_FAILED
+            logger.error(f"❌ Policy {row.policy_id} issuance failed after {row.attempts} attempts: {error}")
+        else:
+            row.nextAttemptAt = timezone.now() + _backoff(row.attempts)
+            logger.warning(f"⚠️ Policy {row.policy_id} issuance attempt {row.attempts} failed, retrying: {error}")
+        row.save(update_fields=['state', 'lastError', 'nextAttemptAt', 'updatedAt'])
+
+    def run_once(self):
+        """
+        Process every currently due row; returns the number issued.
+
+        All transactions of the batch are submitted first (nonces are managed
+        locally), then the receipts are collected, so a batch costs roughly
+        one block time instead of one block per policy.
+        """
+        in_flight = [sent for sent in map(self._submit, self._due_ids()) if sent]
+        # Receipts are awaited on the blockchain executor so they overlap
+        # without taking threads from the request-serving pools.
+        confirmations = []
+        for row, tx_hash in in_flight:
+            try:
+                confirmations.append(blockchain_executor.submit(self._confirm, row, tx_hash))
+            except ExecutorSaturated:
+                confirmations.append(self._confirm(row, tx_hash))
+        return sum(1 for c in confirmations if (c.result() if isinstance(c, Future) else c))
+
+    # -- lifecycle ----------------------------------------------------------
+
+    def notify(self):
+        """Wake the worker immediately (called after a booking commits)."""
+        self._wake.set()
+
+    def _run(self):
+        logger.info("🚚 Policy issuance outbox worker started")
+        while not self._stop.is_set():
+            close_old_connections()
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"❌ Outbox worker iteration failed: {e}")
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+        close_old_connections()
+        logger.info("🛑 Policy issuance outbox worker stopped")
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="policy-outbox-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+
+_worker = None
+
+
+def get_worker():
+    """Process-wide worker instance (created lazily so settings are loaded)."""
+    global _worker
+    if _worker is None:
+        _worker = PolicyIssuanceWorker()
+    return _worker
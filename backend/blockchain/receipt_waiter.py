@@ -0,0 +1,157 @@
+"""
+Shared, block-driven transaction receipt waiter.
+
+``w3.eth.wait_for_transaction_receipt`` polls the node separately for every
+hash. This service follows new blocks once for the whole process and resolves
+every pending hash found in them, so RPC traffic grows with the number of
+blocks rather than with pending transactions times polls. Callers get a
+``concurrent.futures.Future`` (or block on ``wait_for_receipt``).
+"""
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from loguru import logger
+from web3 import Web3
+from web3.exceptions import TimeExhausted, TransactionNotFound
+
+
+def _key(tx_hash):
+    if isinstance(tx_hash, str):
+        return tx_hash.lower() if tx_hash.startswith('0x') else f"0x{tx_hash.lower()}"
+    return Web3.to_hex(tx_hash).lower()
+
+
+class ReceiptWaiter:
+    def __init__(self, web3, poll_interval=0.5):
+        self._w3 = web3
+        self.poll_interval = poll_interval
+        self._cond = threading.Condition()
+        self._pending = {}       # tx hash -> [Future, ...]
+        self._unchecked = set()  # newly registered hashes that need one direct lookup
+        self._last_block = None
+        self._thread = None
+        self.rpc_calls = 0
+
+    # -- public API ---------------------------------------------------------
+
+    def submit(self, tx_hash):
+        """Return a Future that resolves to the receipt of ``tx_hash``."""
+        key = _key(tx_hash)
+        future = Future()
+        with self._cond:
+            if key not in self._pending:
+                self._pending[key] = []
+                self._unchecked.add(key)
+            self._pending[key].append(future)
+            self._ensure_thread()
+            self._cond.notify()
+        return future
+
+    def wait_for_receipt(self, tx_hash, timeout=120):
+        """Block until ``tx_hash`` is mined; raises TimeExhausted on timeout."""
+        future = self.submit(tx_hash)
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            self._discard(_key(tx_hash), future)
+            raise TimeExhausted(f"Transaction {_key(tx_hash)} is not in the chain after {timeout} seconds")
+
+    @property
+    def pending_count(self):
+        with self._cond:
+            return len(self._pending)
+
+    # -- internals ----------------------------------------------------------
+
+    def _discard(self, key, future):
+        with self._cond:
+            futures = self._pending.get(key)
+            if futures and future in futures:
+                futures.remove(future)
+                if not futures:
+                    del self._pending[key]
+                    self._unchecked.discard(key)
+
+    def _resolve(self, key, receipt):
+        with self._cond:
+            futures = self._pending.pop(key, [])
+            self._unchecked.discard(key)
+        for future in futures:
+            if not future.done():
+                future.set_result(receipt)
+
+    def _fetch_receipt(self, key):
+        self.rpc_calls += 1
+        try:
+            return self._w3.eth.get_transaction_receipt(key)
+        except TransactionNotFound:
+            return None
+
+    def _poll(self):
+        # Read the head first: anything mined before it is caught by the direct
+        # lookups below, anything after it by the next block scan.
+        self.rpc_calls += 1
+        latest = self._w3.eth.block_number
+
+        with self._cond:
+            unchecked, self._unchecked = self._unchecked, set()
+        for key in unchecked:
+            receipt = self._fetch_receipt(key)
+            if receipt is not None:
+                self._resolve(key, receipt)
+
+        if self._last_block is None:
+            self._last_block = latest
+        for number in range(self._last_block + 1, latest + 1):
+            self.rpc_calls += 1
+            block = self._w3.eth.get_block(number)
+            with self._cond:
+                hits = [key for key in map(_key, block['transactions']) if key in self._pending]
+            for key in hits:
+                receipt = self._fetch_receipt(key)
+                if receipt is not None:
+                    self._resolve(key, receipt)
+        self._last_block = latest
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    # Idle: forget the head so the next batch starts fresh
+                    self._last_block = None
+                    self._cond.wait()
+            try:
+                self._poll()
+            except Exception as e:
+                logger.warning(f"⚠️ Receipt waiter poll failed: {e}")
+            with self._cond:
+                self._cond.wait(self.poll_interval)
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="receipt-waiter", daemon=True)
+            self._thread.start()
+
+
+_waiter = None
+_waiter_lock = threading.Lock()
+
+
+def get_receipt_waiter():
+    """Process-wide ReceiptWaiter bound to contract_loader.w3 (None when offline)."""
+    global _waiter
+    from blockchain.contract_loader import w3
+    if not w3:
+        return None
+    with _waiter_lock:
+        if _waiter is None:
+            _waiter = ReceiptWaiter(w3)
+        return _waiter
+
+
+def wait_for_receipt(tx_hash, timeout=120):
+    """Drop-in replacement for ``w3.eth.wait_for_transaction_receipt``."""
+    waiter = get_receipt_waiter()
+    if waiter is None:
+        raise RuntimeError("Blockchain not connected")
+    return waiter.wait_for_receipt(tx_hash, timeout)
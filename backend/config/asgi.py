@@ -24,6 +24,11 @@ except Exception as e:
 # Initialize FastAPI
 fastapi_app = FastAPI(title="Flight Delay Insurance API")
 
+# Token-bucket rate limiting, innermost so rejections are still access-logged
+# and carry CORS headers, but before any route, Django or ORM work
+from middleware import RateLimitMiddleware
+fastapi_app.add_middleware(RateLimitMiddleware)
+
 # Add Access Logging Middleware (Apache2 format)
 try:
     from middleware import AccessLogMiddleware
@@ -39,12 +44,64 @@ fastapi_app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Link", "X-Next-Cursor", "ETag", "Idempotent-Replayed"],
 )
 
+# A full ORM/password pool queue is a 503, wherever in a handler it is hit
+from fastapi.responses import JSONResponse
+from core.executors import ExecutorSaturated
+
+@fastapi_app.exception_handler(ExecutorSaturated)
+async def executor_saturated_handler(request, exc):
+    return JSONResponse(status_code=503, content={"detail": "Server busy, please retry"})
+
+# Policy issuance outbox worker (submits buyPolicy off the request path)
+from django.conf import settings
+
+@fastapi_app.on_event("startup")
+def start_policy_outbox_worker():
+    if settings.BLOCKCHAIN_ENABLED and settings.POLICY_OUTBOX_WORKER_ENABLED:
+        from blockchain.outbox_worker import get_worker
+        get_worker().start()
+
+@fastapi_app.on_event("shutdown")
+def stop_policy_outbox_worker():
+    if settings.BLOCKCHAIN_ENABLED and settings.POLICY_OUTBOX_WORKER_ENABLED:
+        from blockchain.outbox_worker import get_worker
+        get_worker().stop()
+
+# Refresh-token revocation filter, rebuilt and purged off the request path
+@fastapi_app.on_event("startup")
+def start_revocation_rebuilder():
+    from api.services.refresh_tokens import refresh_token_store
+    refresh_token_store.start()
+
+@fastapi_app.on_event("shutdown")
+def stop_revocation_rebuilder():
+    from api.services.refresh_tokens import refresh_token_store
+    refresh_token_store.stop()
+
 @fastapi_app.get("/api/health")
 def health_check():
     return {"status": "ok", "service": "Flight Delay Insurance Backend"}
 
+@fastapi_app.get("/api/health/executors")
+def executor_health():
+    from core.executors import executor_metrics
+    return {"executors": executor_metrics()}
+
+@fastapi_app.get("/api/health/rate-limits")
+def rate_limit_health():
+    from middleware import rate_limiter
+    return rate_limiter.metrics()
+
+@fastapi_app.get("/api/health/contracts")
+def contract_registry_health():
+    if not settings.BLOCKCHAIN_ENABLED:
+        return {"enabled": False}
+    from blockchain.contract_loader import contract_registry
+    return {"enabled": True, **contract_registry.metrics()}
+
 # Mount Django app under / (it will handle /admin, etc.)
 # Note: FastAPI routes take precedence if they don't match, it falls through?
 # Actually WSGIMiddleware is a catch-all usually, but we want FastAPI to handle /api/*
@@ -1,3 +1,4 @@
+import json
 import os
 from pathlib import Path
 from loguru import logger
@@ -47,7 +48,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'core.middleware.RequestLoggingMiddleware',
+    'core.request_logging.RequestLoggingMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -97,6 +98,77 @@ else:
         }
     }
 
+# Blockchain integration
+BLOCKCHAIN_ENABLED = os.environ.get('BLOCKCHAIN_ENABLED', 'False') == 'True'
+
+# Dedicated pools for ORM work, blockchain I/O and password hashing (see core/executors.py)
+ORM_EXECUTOR_WORKERS = int(os.environ.get('ORM_EXECUTOR_WORKERS', '16'))
+ORM_EXECUTOR_MAX_QUEUE = int(os.environ.get('ORM_EXECUTOR_MAX_QUEUE', '256'))
+BLOCKCHAIN_EXECUTOR_WORKERS = int(os.environ.get('BLOCKCHAIN_EXECUTOR_WORKERS', '4'))
+BLOCKCHAIN_EXECUTOR_MAX_QUEUE = int(os.environ.get('BLOCKCHAIN_EXECUTOR_MAX_QUEUE', '64'))
+PASSWORD_EXECUTOR_WORKERS = int(os.environ.get('PASSWORD_EXECUTOR_WORKERS', str(max(1, (os.cpu_count() or 2) // 2))))
+PASSWORD_EXECUTOR_MAX_QUEUE = int(os.environ.get('PASSWORD_EXECUTOR_MAX_QUEUE', '64'))
+
+# Policy issuance outbox worker (see blockchain/outbox_worker.py)
+POLICY_OUTBOX_WORKER_ENABLED = os.environ.get('POLICY_OUTBOX_WORKER_ENABLED', 'True') == 'True'
+POLICY_OUTBOX_POLL_SECONDS = float(os.environ.get('POLICY_OUTBOX_POLL_SECONDS', '1.0'))
+POLICY_OUTBOX_BATCH_SIZE = int(os.environ.get('POLICY_OUTBOX_BATCH_SIZE', '20'))
+POLICY_OUTBOX_MAX_ATTEMPTS = int(os.environ.get('POLICY_OUTBOX_MAX_ATTEMPTS', '5'))
+POLICY_OUTBOX_LEASE_SECONDS = int(os.environ.get('POLICY_OUTBOX_LEASE_SECONDS', '300'))
+
+# Standing ERC20 allowance for the insurance contract, in tokens (see blockchain/allowance.py)
+TOKEN_ALLOWANCE_STANDING = int(os.environ.get('TOKEN_ALLOWANCE_STANDING', '100000'))
+TOKEN_ALLOWANCE_LOW_WATER = int(os.environ.get('TOKEN_ALLOWANCE_LOW_WATER', '1000'))
+
+# Idempotency-Key support for booking creation (see api/services/idempotency.py)
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', str(24 * 3600)))
+IDEMPOTENCY_LRU_SIZE = int(os.environ.get('IDEMPOTENCY_LRU_SIZE', '10000'))
+IDEMPOTENCY_LEASE_SECONDS = float(os.environ.get('IDEMPOTENCY_LEASE_SECONDS', '30'))
+
+# ETag response cache for the flight endpoints (see api/services/response_cache.py)
+FLIGHT_RESPONSE_CACHE_SIZE = int(os.environ.get('FLIGHT_RESPONSE_CACHE_SIZE', '1000'))
+
+# Per-user cache for the policy and transaction views (see api/services/user_cache.py).
+# Backend is "memory" or the alias of a CACHES entry shared between workers.
+USER_RESPONSE_CACHE_BACKEND = os.environ.get('USER_RESPONSE_CACHE_BACKEND', 'memory')
+USER_RESPONSE_CACHE_SIZE = int(os.environ.get('USER_RESPONSE_CACHE_SIZE', '5000'))
+USER_RESPONSE_CACHE_TTL_SECONDS = int(os.environ.get('USER_RESPONSE_CACHE_TTL_SECONDS', '300'))
+
+# Resolved principals behind the current_user dependency (see api/services/principals.py)
+PRINCIPAL_CACHE_SIZE = int(os.environ.get('PRINCIPAL_CACHE_SIZE', '10000'))
+PRINCIPAL_CACHE_TTL_SECONDS = int(os.environ.get('PRINCIPAL_CACHE_TTL_SECONDS', '60'))
+
+# Refresh-token rotation / revocation store (see api/services/refresh_tokens.py)
+REFRESH_REVOCATION_BLOOM_CAPACITY = int(os.environ.get('REFRESH_REVOCATION_BLOOM_CAPACITY', '1000000'))
+REFRESH_REVOCATION_BLOOM_ERROR_RATE = float(os.environ.get('REFRESH_REVOCATION_BLOOM_ERROR_RATE', '0.001'))
+REFRESH_REVOCATION_CACHE_SIZE = int(os.environ.get('REFRESH_REVOCATION_CACHE_SIZE', '100000'))
+REFRESH_REVOCATION_SYNC_SECONDS = float(os.environ.get('REFRESH_REVOCATION_SYNC_SECONDS', '5'))
+REFRESH_REVOCATION_PURGE_SECONDS = float(os.environ.get('REFRESH_REVOCATION_PURGE_SECONDS', '3600'))
+
+# ASGI token-bucket rate limits (see middleware/rate_limit.py). Longest matching
+# path prefix wins; "ip"/"user" are [tokens per second, burst]. Override with a
+# JSON object in RATE_LIMIT_RULES.
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'True') == 'True'
+RATE_LIMIT_RULES = json.loads(os.environ['RATE_LIMIT_RULES']) if os.environ.get('RATE_LIMIT_RULES') else {
+    '/api/auth/login': {'ip': [0.5, 10]},
+    '/api/auth/register': {'ip': [0.1, 5]},
+    '/api/auth/refresh': {'ip': [1, 20], 'user': [0.5, 10]},
+    '/api/flights/': {'ip': [20, 60], 'user': [10, 30]},
+    '/api/': {'ip': [50, 100], 'user': [25, 50]},
+}
+RATE_LIMIT_TRUST_FORWARDED_FOR = os.environ.get('RATE_LIMIT_TRUST_FORWARDED_FOR', 'False') == 'True'
+RATE_LIMIT_EVICT_SECONDS = float(os.environ.get('RATE_LIMIT_EVICT_SECONDS', '60'))
+RATE_LIMIT_MAX_BUCKETS = int(os.environ.get('RATE_LIMIT_MAX_BUCKETS', '100000'))
+
+# Rows fetched per server-side cursor round trip by GET /api/flights/export
+FLIGHT_EXPORT_CHUNK_SIZE = int(os.environ.get('FLIGHT_EXPORT_CHUNK_SIZE', '2000'))
+
+# Flight status push feed, GET /api/flights/stream (see core/flight_events.py)
+FLIGHT_STREAM_POLL_SECONDS = float(os.environ.get('FLIGHT_STREAM_POLL_SECONDS', '2'))
+FLIGHT_STREAM_HEARTBEAT_SECONDS = float(os.environ.get('FLIGHT_STREAM_HEARTBEAT_SECONDS', '15'))
+FLIGHT_STREAM_QUEUE_SIZE = int(os.environ.get('FLIGHT_STREAM_QUEUE_SIZE', '100'))
+FLIGHT_STREAM_MAX_FLIGHTS = int(os.environ.get('FLIGHT_STREAM_MAX_FLIGHTS', '100'))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
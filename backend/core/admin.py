@@ -1,7 +1,8 @@
 from django.contrib import admin
 from .models import (
     StatusLookup, AppUser, Developer, Flight, Booking, 
-    Ticket, InsurancePolicy, Payment, InsuranceClaim
+    Ticket, InsurancePolicy, Payment, InsuranceClaim, PolicyIssuanceOutbox,
+    IdempotencyKey, FlightSeatInventory, CacheVersion, PolicySummary, RevokedRefreshToken
 )
 
 # Register all models with the admin site
@@ -13,8 +14,9 @@ class StatusLookupAdmin(admin.ModelAdmin):
 
 @admin.register(AppUser)
 class AppUserAdmin(admin.ModelAdmin):
-    list_display = ('user_id', 'name', 'email', 'phone')
+    list_display = ('user_id', 'name', 'email', 'phone', 'account')
     search_fields = ('name', 'email')
+    raw_id_fields = ('account',)
 
 @admin.register(Developer)
 class DeveloperAdmin(admin.ModelAdmin):
@@ -23,9 +25,9 @@ class DeveloperAdmin(admin.ModelAdmin):
 
 @admin.register(Flight)
 class FlightAdmin(admin.ModelAdmin):
-    list_display = ('flightId', 'origin', 'destination', 'departureTime', 'arrivalTime', 'status')
-    list_filter = ('status', 'origin', 'destination')
-    search_fields = ('origin', 'destination')
+    list_display = ('flightId', 'origin', 'destination', 'originCode', 'destinationCode', 'departureTime', 'arrivalTime', 'status')
+    list_filter = ('status', 'originCode', 'destinationCode')
+    search_fields = ('origin', 'destination', '=originCode', '=destinationCode')
     date_hierarchy = 'departureTime'
 
 @admin.register(Booking)
@@ -56,6 +58,42 @@ class PaymentAdmin(admin.ModelAdmin):
 
 @admin.register(InsuranceClaim)
 class InsuranceClaimAdmin(admin.ModelAdmin):
-    list_display = ('claimId', 'policy', 'delayDuration', 'claimStatus', 'payoutAmount')
+    list_display = ('claimId', 'policy', 'delayDuration', 'claimStatus', 'payoutAmount', 'claimDate')
     list_filter = ('claimStatus',)
     search_fields = ('policy__booking__user__name',)
+
+@admin.register(PolicyIssuanceOutbox)
+class PolicyIssuanceOutboxAdmin(admin.ModelAdmin):
+    list_display = ('outboxId', 'policy', 'state', 'attempts', 'txHash', 'nextAttemptAt', 'updatedAt')
+    list_filter = ('state',)
+    search_fields = ('policy__policyId', 'txHash', 'lastError')
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    list_display = ('idempotencyId', 'scope', 'userId', 'key', 'state', 'createdAt', 'leaseExpiresAt')
+    list_filter = ('scope', 'state')
+    search_fields = ('key',)
+
+@admin.register(FlightSeatInventory)
+class FlightSeatInventoryAdmin(admin.ModelAdmin):
+    list_display = ('inventoryId', 'flight', 'cabin', 'capacity', 'seatsAvailable')
+    list_filter = ('cabin',)
+    exclude = ('seatMap',)
+
+@admin.register(CacheVersion)
+class CacheVersionAdmin(admin.ModelAdmin):
+    list_display = ('scope', 'version')
+    search_fields = ('scope',)
+
+@admin.register(PolicySummary)
+class PolicySummaryAdmin(admin.ModelAdmin):
+    list_display = ('policy', 'user', 'updatedAt')
+    search_fields = ('user__name', 'user__email')
+    readonly_fields = ('policy', 'user', 'payload', 'updatedAt')
+
+@admin.register(RevokedRefreshToken)
+class RevokedRefreshTokenAdmin(admin.ModelAdmin):
+    list_display = ('key', 'kind', 'createdAt', 'expiresAt')
+    list_filter = ('kind',)
+    search_fields = ('=key',)
+    date_hierarchy = 'createdAt'
@@ -0,0 +1,170 @@
+"""
+Airport catalogue, free-text -> IATA code normalisation and an in-memory
+prefix trie for autocomplete.
+
+Flight.origin/destination are free text ("New York JFK", "London Heathrow",
+"Paris"). ``resolve_airport_code`` maps such a string to one IATA code; it
+fills Flight.originCode/destinationCode (see ``core.signals``) so searches
+can hit an index instead of scanning with ``icontains``.
+``AirportTrie`` serves ``/api/flights/airports?prefix=`` from memory.
+"""
+import re
+import threading
+
+# (IATA code, city, airport name, country). The first airport listed for a
+# city is the one a bare city name ("London") resolves to.
+AIRPORTS = [
+    ("JFK", "New York", "John F. Kennedy", "United States"),
+    ("LGA", "New York", "LaGuardia", "United States"),
+    ("EWR", "New York", "Newark Liberty", "United States"),
+    ("LAX", "Los Angeles", "Los Angeles International", "United States"),
+    ("SFO", "San Francisco", "San Francisco International", "United States"),
+    ("ORD", "Chicago", "O'Hare", "United States"),
+    ("MIA", "Miami", "Miami International", "United States"),
+    ("SEA", "Seattle", "Seattle-Tacoma", "United States"),
+    ("BOS", "Boston", "Logan", "United States"),
+    ("DEN", "Denver", "Denver International", "United States"),
+    ("ATL", "Atlanta", "Hartsfield-Jackson", "United States"),
+    ("DFW", "Dallas", "Dallas/Fort Worth", "United States"),
+    ("YYZ", "Toronto", "Pearson", "Canada"),
+    ("LHR", "London", "Heathrow", "United Kingdom"),
+    ("LGW", "London", "Gatwick", "United Kingdom"),
+    ("CDG", "Paris", "Charles de Gaulle", "France"),
+    ("ORY", "Paris", "Orly", "France"),
+    ("FRA", "Frankfurt", "Frankfurt am Main", "Germany"),
+    ("BER", "Berlin", "Brandenburg", "Germany"),
+    ("AMS", "Amsterdam", "Schiphol", "Netherlands"),
+    ("FCO", "Rome", "Fiumicino", "Italy"),
+    ("MAD", "Madrid", "Barajas", "Spain"),
+    ("IST", "Istanbul", "Istanbul Airport", "Turkey"),
+    ("SVO", "Moscow", "Sheremetyevo", "Russia"),
+    ("GYD", "Baku", "Heydar Aliyev", "Azerbaijan"),
+    ("DXB", "Dubai", "Dubai International", "United Arab Emirates"),
+    ("DOH", "Doha", "Hamad", "Qatar"),
+    ("SIN", "Singapore", "Changi", "Singapore"),
+    ("HKG", "Hong Kong", "Hong Kong International", "Hong Kong"),
+    ("PEK", "Beijing", "Capital", "China"),
+    ("NRT", "Tokyo", "Narita", "Japan"),
+    ("HND", "Tokyo", "Haneda", "Japan"),
+    ("SYD", "Sydney", "Kingsford Smith", "Australia"),
+]
+
+AIRPORTS_BY_CODE = {code: (code, city, name, country) for code, city, name, country in AIRPORTS}
+
+CODES_BY_CITY = {}
+for _code, _city, _name, _country in AIRPORTS:
+    CODES_BY_CITY.setdefault(_city.lower(), []).append(_code)
+
+_WORD = re.compile(r"[A-Za-z]+")
+
+
+def _normalize(text):
+    return " ".join(_WORD.findall(text or "")).lower()
+
+
+def resolve_airport_code(text):
+    """
+    Map free-text airport/city to a single IATA code, or None.
+
+    Tries, in order: an explicit code token ("New York JFK", "lhr"), an
+    airport name ("London Heathrow"), then a city name ("Paris" -> CDG).
+    """
+    if not text:
+        return None
+    stripped = text.strip()
+    if stripped.upper() in AIRPORTS_BY_CODE:
+        return stripped.upper()
+    for token in _WORD.findall(stripped):
+        if len(token) == 3 and token.isupper() and token in AIRPORTS_BY_CODE:
+            return token
+
+    normalized = _normalize(stripped)
+    padded = f" {normalized} "
+    for code, _, name, _ in AIRPORTS:
+        if f" {_normalize(name)} " in padded:
+            return code
+    for city, codes in CODES_BY_CITY.items():
+        if normalized == city or normalized.startswith(city + " "):
+            return codes[0]
+    return None
+
+
+def codes_for_query(text):
+    """
+    IATA codes a search term should match, or None when it does not name a
+    known airport/city (callers then fall back to a text match).
+
+    A city name matches all of its airports; anything else resolves to one.
+    """
+    if not text or not text.strip():
+        return None
+    codes = CODES_BY_CITY.get(_normalize(text))
+    if codes:
+        return list(codes)
+    code = resolve_airport_code(text)
+    return [code] if code else None
+
+
+class _Node:
+    __slots__ = ("children", "codes")
+
+    def __init__(self):
+        self.children = {}
+        self.codes = []
+
+
+class AirportTrie:
+    """
+    Prefix trie over airport codes, city names, airport names and their words.
+
+    Every node keeps the (ranked) codes of all terms below it, so a lookup is
+    O(len(prefix)) and never walks the subtree.
+    """
+
+    def __init__(self, airports=AIRPORTS):
+        self._root = _Node()
+        for rank, (code, city, name, _) in enumerate(airports):
+            terms = {code.lower(), _normalize(city), _normalize(name)}
+            terms.update(_normalize(city).split())
+            terms.update(_normalize(name).split())
+            for term in terms:
+                # Exact code hits rank ahead of everything else
+                self._insert(term, code, (0 if term == code.lower() else 1, rank))
+        self._finalize(self._root)
+
+    def _insert(self, term, code, rank):
+        node = self._root
+        for char in term:
+            node = node.children.setdefault(char, _Node())
+            node.codes.append((rank, code))
+
+    def _finalize(self, node):
+        best = {}
+        for rank, code in node.codes:
+            if code not in best or rank < best[code]:
+                best[code] = rank
+        node.codes = [code for code, _ in sorted(best.items(), key=lambda item: item[1])]
+        for child in node.children.values():
+            self._finalize(child)
+
+    def search(self, prefix, limit=10):
+        """Airports whose code, city or name (or a word of it) starts with ``prefix``."""
+        node = self._root
+        for char in _normalize(prefix):
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return [AIRPORTS_BY_CODE[code] for code in node.codes[:limit]]
+
+
+_trie = None
+_trie_lock = threading.Lock()
+
+
+def get_airport_trie():
+    global _trie
+    if _trie is None:
+        with _trie_lock:
+            if _trie is None:
+                _trie = AirportTrie()
+    return _trie
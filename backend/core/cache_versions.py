@@ -0,0 +1,42 @@
+"""
+Cross-process cache invalidation through CacheVersion rows.
+
+Writers call ``bump_versions``; readers compare the version they cached a
+response under with ``get_version``. Missing rows read as 0
+and are created on first bump.
+"""
+from django.db.models import F
+
+from core.models import CacheVersion
+
+FLIGHTS_SCOPE = 'flights'
+
+
+def flight_scope(flight_id):
+    return f'flight:{flight_id}'
+
+
+def flight_scopes(flight_ids):
+    """Scopes to bump when the given flights change: each flight plus the list."""
+    return [FLIGHTS_SCOPE] + [flight_scope(flight_id) for flight_id in flight_ids]
+
+
+def user_scope(user_id):
+    """Version of everything cached for one user (see api.services.user_cache)."""
+    return f'user:{user_id}'
+
+
+def bump_versions(scopes):
+    scopes = list(dict.fromkeys(scopes))
+    updated = CacheVersion.objects.filter(scope__in=scopes).update(version=F('version') + 1)
+    if updated < len(scopes):
+        existing = set(CacheVersion.objects.filter(scope__in=scopes).values_list('scope', flat=True))
+        CacheVersion.objects.bulk_create(
+            [CacheVersion(scope=scope, version=1) for scope in scopes if scope not in existing],
+            ignore_conflicts=True
+        )
+
+
+def get_version(scope):
+    return CacheVersion.objects.filter(scope=scope).values_list('version', flat=True).first() or 0
+
@@ -0,0 +1,179 @@
+"""
+Dedicated, bounded thread pools for blocking work.
+
+FastAPI runs every sync ``def`` endpoint on Starlette's shared threadpool, so
+a handful of slow web3 calls can starve flight searches. ORM work and
+blockchain I/O each get their own pool here, with a bounded queue (excess
+work is rejected instead of piling up) and counters exported through
+``GET /api/health/executors``. CPU-bound password hashing runs on a bounded
+process pool, so a login burst neither holds the GIL nor takes every core.
+
+Usage:
+    @router.get("/")
+    @offload(orm_executor)
+    def handler(...): ...            # runs on the ORM pool
+
+    await blockchain_executor.run(fn, *args)
+    await password_executor.run(hash_password, raw)   # fn must be picklable
+"""
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+from fastapi import HTTPException
+
+
+class ExecutorSaturated(RuntimeError):
+    """Raised when an executor's workers and queue are all taken."""
+
+
+class BoundedExecutor:
+    def __init__(self, name, max_workers, max_queue):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = self._make_pool()
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._active = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def _make_pool(self):
+        return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+
+    def _call(self, fn, args, kwargs):
+        with self._lock:
+            self._active += 1
+        # Pool threads are long-lived; drop connections that outlived CONN_MAX_AGE
+        close_old_connections()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException:
+            with self._lock:
+                self.failed += 1
+            raise
+        else:
+            with self._lock:
+                self.completed += 1
+            return result
+        finally:
+            close_old_connections()
+            with self._lock:
+                self._active -= 1
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue ``fn``; raises ExecutorSaturated when the queue is full."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise ExecutorSaturated(f"{self.name} executor is saturated")
+        with self._lock:
+            self._pending += 1
+        future = self._dispatch(fn, args, kwargs)
+        future.add_done_callback(self._release)
+        return future
+
+    def _dispatch(self, fn, args, kwargs):
+        return self._pool.submit(self._call, fn, args, kwargs)
+
+    async def run(self, fn, *args, **kwargs):
+        """Await ``fn(*args, **kwargs)`` on this executor."""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "name": self.name,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "active": self._active,
+                "queue_depth": self._pending - self._active,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+            }
+
+
+def _init_process_worker(settings_module):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+class BoundedProcessExecutor(BoundedExecutor):
+    """
+    BoundedExecutor over worker processes (spawned, so they don't inherit the
+    server's threads and DB connections). Workers run ``django.setup()``
+    once; jobs must be module-level functions and must not touch the ORM.
+    """
+
+    def _make_pool(self):
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_process_worker,
+            initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings'),),
+        )
+
+    def _dispatch(self, fn, args, kwargs):
+        # The job runs in another process, so outcomes are counted on completion
+        return self._pool.submit(fn, *args, **kwargs)
+
+    def _release(self, future):
+        with self._lock:
+            if future.cancelled() or future.exception() is not None:
+                self.failed += 1
+            else:
+                self.completed += 1
+        super()._release(future)
+
+    def metrics(self):
+        metrics = super().metrics()
+        with self._lock:
+            pending = self._pending
+        # Jobs are not observable once handed to a worker: busy = min(pending, workers)
+        metrics["active"] = min(pending, self.max_workers)
+        metrics["queue_depth"] = max(pending - self.max_workers, 0)
+        return metrics
+
+
+orm_executor = BoundedExecutor(
+    "orm", settings.ORM_EXECUTOR_WORKERS, settings.ORM_EXECUTOR_MAX_QUEUE
+)
+blockchain_executor = BoundedExecutor(
+    "blockchain", settings.BLOCKCHAIN_EXECUTOR_WORKERS, settings.BLOCKCHAIN_EXECUTOR_MAX_QUEUE
+)
+
+password_executor = BoundedProcessExecutor(
+    "password", settings.PASSWORD_EXECUTOR_WORKERS, settings.PASSWORD_EXECUTOR_MAX_QUEUE
+)
+
+
+def executor_metrics():
+    return [orm_executor.metrics(), blockchain_executor.metrics(), password_executor.metrics()]
+
+
+def offload(executor):
+    """Run a sync endpoint on ``executor`` instead of Starlette's shared pool."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await executor.run(fn, *args, **kwargs)
+            except ExecutorSaturated:
+                raise HTTPException(status_code=503, detail="Server busy, please retry")
+        return wrapper
+    return decorator
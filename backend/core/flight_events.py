@@ -0,0 +1,160 @@
+"""
+In-process pub/sub for flight status changes (feeds ``/api/flights/stream``).
+
+Saves made in this process (admin, API) are published from a post_save
+signal as soon as they commit. Saves made by other processes, such as the
+oracle simulator, are picked up by a watcher task: while anyone is
+subscribed, it polls the subscribed flights' CacheVersion rows (bumped by
+every Flight save, see ``core.cache_versions``) and re-reads the status of
+flights whose version moved. Each change is delivered once per subscriber,
+whichever path sees it first.
+"""
+import asyncio
+import itertools
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from django.conf import settings
+from loguru import logger
+
+from core.cache_versions import flight_scope
+from core.executors import orm_executor
+from core.models import CacheVersion, Flight
+
+
+@dataclass
+class FlightStatusEvent:
+    id: int
+    flight_id: int
+    status: str
+    previous: str = None
+    at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+    def to_dict(self):
+        return {
+            "flightId": self.flight_id,
+            "status": self.status,
+            "previous": self.previous,
+            "at": self.at.isoformat(),
+        }
+
+
+class Subscription:
+    def __init__(self, broker, loop, flight_ids, queue_size):
+        self.broker = broker
+        self.loop = loop
+        self.flight_ids = frozenset(flight_ids)
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def _deliver(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow consumer: drop rather than grow without bound
+            self.dropped += 1
+
+    async def get(self, timeout):
+        """Next event, or None after ``timeout`` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class FlightStatusBroker:
+    def __init__(self, poll_seconds=None, queue_size=None):
+        self.poll_seconds = poll_seconds or settings.FLIGHT_STREAM_POLL_SECONDS
+        self.queue_size = queue_size or settings.FLIGHT_STREAM_QUEUE_SIZE
+        self._lock = threading.Lock()
+        self._subscriptions = set()
+        self._statuses = {}   # flight_id -> last status code seen
+        self._versions = {}   # flight_id -> last CacheVersion seen by the watcher
+        self._ids = itertools.count(1)
+        self._watcher = None
+
+    # -- subscribers ----------------------------------------------------------
+
+    def subscribe(self, flight_ids, initial_statuses):
+        """
+        Register a subscriber for ``flight_ids``; must be called from the
+        event loop. ``initial_statuses`` ({flight_id: code}) seeds change
+        detection so the watcher doesn't report the current state as a change.
+        """
+        loop = asyncio.get_running_loop()
+        subscription = Subscription(self, loop, flight_ids, self.queue_size)
+        with self._lock:
+            self._statuses.update(initial_statuses)
+            self._subscriptions.add(subscription)
+            if self._watcher is None or self._watcher.done():
+                self._watcher = loop.create_task(self._watch())
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def is_watched(self, flight_id):
+        with self._lock:
+            return any(flight_id in s.flight_ids for s in self._subscriptions)
+
+    def _watched_ids(self):
+        with self._lock:
+            return set().union(*(s.flight_ids for s in self._subscriptions))
+
+    # -- publishing -----------------------------------------------------------
+
+    def publish(self, flight_id, status):
+        """Fan a status out to subscribers of ``flight_id``; safe from any thread."""
+        with self._lock:
+            targets = [s for s in self._subscriptions if flight_id in s.flight_ids]
+            previous = self._statuses.get(flight_id)
+            if not targets or previous == status:
+                return None
+            self._statuses[flight_id] = status
+            event = FlightStatusEvent(id=next(self._ids), flight_id=flight_id, status=status, previous=previous)
+        for subscription in targets:
+            subscription.loop.call_soon_threadsafe(subscription._deliver, event)
+        return event
+
+    # -- cross-process watcher ------------------------------------------------
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            watched = self._watched_ids()
+            if not watched:
+                with self._lock:
+                    if not self._subscriptions:
+                        self._watcher = None
+                        self._versions.clear()
+                        return
+                continue
+            try:
+                await self._poll(watched)
+            except Exception as e:
+                logger.warning(f"⚠️ Flight status watcher poll failed: {e}")
+
+    def _read_moved(self, watched):
+        """Statuses of watched flights whose CacheVersion moved since the last poll."""
+        scopes = {flight_scope(flight_id): flight_id for flight_id in watched}
+        moved = []
+        for scope, version in CacheVersion.objects.filter(scope__in=scopes).values_list('scope', 'version'):
+            flight_id = scopes[scope]
+            if self._versions.get(flight_id) != version:
+                self._versions[flight_id] = version
+                moved.append(flight_id)
+        if not moved:
+            return []
+        return list(Flight.objects.filter(flightId__in=moved).values_list('flightId', 'status__code'))
+
+    async def _poll(self, watched):
+        for flight_id, status in await orm_executor.run(self._read_moved, watched):
+            self.publish(flight_id, status)
+
+
+flight_status_broker = FlightStatusBroker()
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_remove_code_unique_constraint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PolicyIssuanceOutbox',
+            fields=[
+                ('outboxId', models.AutoField(db_column='outboxid', primary_key=True, serialize=False)),
+                ('ticketId', models.IntegerField(db_column='ticketid')),
+                ('delayThreshold', models.IntegerField(db_column='delaythreshold')),
+                ('state', models.CharField(choices=[('issuing', 'Issuing'), ('issued', 'Issued'), ('failed', 'Failed')], default='issuing', max_length=20)),
+                ('attempts', models.IntegerField(default=0)),
+                ('lastError', models.TextField(blank=True, db_column='lasterror', null=True)),
+                ('nextAttemptAt', models.DateTimeField(db_column='nextattemptat')),
+                ('createdAt', models.DateTimeField(auto_now_add=True, db_column='createdat')),
+                ('updatedAt', models.DateTimeField(auto_now=True, db_column='updatedat')),
+                ('policy', models.OneToOneField(db_column='policyid', on_delete=django.db.models.deletion.CASCADE, related_name='issuance', to='core.insurancepolicy')),
+            ],
+            options={
+                'db_table': 'policy_issuance_outbox',
+                'managed': True,
+                'indexes': [models.Index(fields=['state', 'nextAttemptAt'], name='outbox_state_next_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_policy_issuance_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('idempotencyId', models.BigAutoField(db_column='idempotencyid', primary_key=True, serialize=False)),
+                ('scope', models.CharField(max_length=50)),
+                ('key', models.CharField(max_length=255)),
+                ('requestHash', models.CharField(db_column='requesthash', max_length=64)),
+                ('state', models.CharField(choices=[('in_progress', 'In progress'), ('completed', 'Completed')], default='in_progress', max_length=20)),
+                ('responseBody', models.TextField(blank=True, db_column='responsebody', null=True)),
+                ('createdAt', models.DateTimeField(db_column='createdat', db_index=True)),
+            ],
+            options={
+                'db_table': 'idempotency_key',
+                'managed': True,
+                'unique_together': {('scope', 'key')},
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FlightSeatInventory',
+            fields=[
+                ('inventoryId', models.AutoField(db_column='inventoryid', primary_key=True, serialize=False)),
+                ('cabin', models.CharField(max_length=20)),
+                ('capacity', models.IntegerField()),
+                ('seatsAvailable', models.IntegerField(db_column='seatsavailable')),
+                ('seatMap', models.BinaryField(db_column='seatmap')),
+                ('flight', models.ForeignKey(db_column='flightid', on_delete=django.db.models.deletion.CASCADE, related_name='seat_inventory', to='core.flight')),
+            ],
+            options={
+                'db_table': 'flight_seat_inventory',
+                'managed': True,
+                'unique_together': {('flight', 'cabin')},
+            },
+        ),
+    ]
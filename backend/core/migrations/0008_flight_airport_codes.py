@@ -0,0 +1,127 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:29
+
+import re
+
+from django.db import migrations, models
+
+
+# Frozen copy of core.airports' catalogue and resolver as of this migration,
+# so editing the live catalogue never changes what the backfill writes.
+# (IATA code, city, airport name); a city's first airport is its default.
+AIRPORTS = [
+    ("JFK", "New York", "John F. Kennedy"),
+    ("LGA", "New York", "LaGuardia"),
+    ("EWR", "New York", "Newark Liberty"),
+    ("LAX", "Los Angeles", "Los Angeles International"),
+    ("SFO", "San Francisco", "San Francisco International"),
+    ("ORD", "Chicago", "O'Hare"),
+    ("MIA", "Miami", "Miami International"),
+    ("SEA", "Seattle", "Seattle-Tacoma"),
+    ("BOS", "Boston", "Logan"),
+    ("DEN", "Denver", "Denver International"),
+    ("ATL", "Atlanta", "Hartsfield-Jackson"),
+    ("DFW", "Dallas", "Dallas/Fort Worth"),
+    ("YYZ", "Toronto", "Pearson"),
+    ("LHR", "London", "Heathrow"),
+    ("LGW", "London", "Gatwick"),
+    ("CDG", "Paris", "Charles de Gaulle"),
+    ("ORY", "Paris", "Orly"),
+    ("FRA", "Frankfurt", "Frankfurt am Main"),
+    ("BER", "Berlin", "Brandenburg"),
+    ("AMS", "Amsterdam", "Schiphol"),
+    ("FCO", "Rome", "Fiumicino"),
+    ("MAD", "Madrid", "Barajas"),
+    ("IST", "Istanbul", "Istanbul Airport"),
+    ("SVO", "Moscow", "Sheremetyevo"),
+    ("GYD", "Baku", "Heydar Aliyev"),
+    ("DXB", "Dubai", "Dubai International"),
+    ("DOH", "Doha", "Hamad"),
+    ("SIN", "Singapore", "Changi"),
+    ("HKG", "Hong Kong", "Hong Kong International"),
+    ("PEK", "Beijing", "Capital"),
+    ("NRT", "Tokyo", "Narita"),
+    ("HND", "Tokyo", "Haneda"),
+    ("SYD", "Sydney", "Kingsford Smith"),
+]
+
+_WORD = re.compile(r"[A-Za-z]+")
+
+
+def _normalize(text):
+    return " ".join(_WORD.findall(text or "")).lower()
+
+
+def _resolve_airport_code(text):
+    if not text:
+        return None
+    codes = {code for code, _, _ in AIRPORTS}
+    stripped = text.strip()
+    if stripped.upper() in codes:
+        return stripped.upper()
+    for token in _WORD.findall(stripped):
+        if len(token) == 3 and token.isupper() and token in codes:
+            return token
+
+    normalized = _normalize(stripped)
+    padded = f" {normalized} "
+    for code, _, name in AIRPORTS:
+        if f" {_normalize(name)} " in padded:
+            return code
+    for code, city, _ in AIRPORTS:
+        city = city.lower()
+        if normalized == city or normalized.startswith(city + " "):
+            return code
+    return None
+
+
+def backfill_airport_codes(apps, schema_editor):
+    Flight = apps.get_model('core', 'Flight')
+    flights = list(Flight.objects.only('flightId', 'origin', 'destination'))
+    for flight in flights:
+        flight.originCode = _resolve_airport_code(flight.origin)
+        flight.destinationCode = _resolve_airport_code(flight.destination)
+    Flight.objects.bulk_update(flights, ['originCode', 'destinationCode'], batch_size=500)
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # Free-text searches that don't resolve to an airport still use
+    # icontains, i.e. UPPER(col) LIKE '%..%'; on Postgres a trigram GIN index
+    # serves those. SQLite has no equivalent and keeps using the code indexes.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS flight_origin_trgm ON flight USING gin (UPPER(origin::text) gin_trgm_ops)"
+    )
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS flight_destination_trgm ON flight USING gin (UPPER(destination::text) gin_trgm_ops)"
+    )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS flight_origin_trgm")
+    schema_editor.execute("DROP INDEX IF EXISTS flight_destination_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_flight_seat_inventory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flight',
+            name='destinationCode',
+            field=models.CharField(blank=True, db_column='destinationcode', db_index=True, max_length=3, null=True),
+        ),
+        migrations.AddField(
+            model_name='flight',
+            name='originCode',
+            field=models.CharField(blank=True, db_column='origincode', db_index=True, max_length=3, null=True),
+        ),
+        migrations.RunPython(backfill_airport_codes, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_cache_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='flight',
+            name='destinationCode',
+            field=models.CharField(blank=True, db_column='destinationcode', max_length=3, null=True),
+        ),
+        migrations.AlterField(
+            model_name='flight',
+            name='originCode',
+            field=models.CharField(blank=True, db_column='origincode', max_length=3, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['originCode', 'departureTime'], name='flight_origin_dep_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['destinationCode', 'departureTime'], name='flight_dest_dep_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['origin', 'departureTime'], name='flight_origin_text_dep_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['destination', 'departureTime'], name='flight_dest_text_dep_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['departureTime', 'flightId'], name='flight_departure_idx'),
+        ),
+    ]
@@ -0,0 +1,112 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:37
+
+import json
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Frozen copy of the payload core.policy_summary built when this migration
+# was written, on historical models, so later changes to the live projection
+# can't change what the backfill does.
+
+def _duration(departure, arrival):
+    if not departure or not arrival:
+        return "N/A"
+    seconds = (arrival - departure).total_seconds()
+    return f"{int(seconds // 3600)}h {int((seconds % 3600) // 60)}m"
+
+
+def _fmt(value, pattern):
+    return value.strftime(pattern) if value else ""
+
+
+def _first_by_booking(model, booking_ids, *fields):
+    first = {}
+    for row in model.objects.filter(booking_id__in=booking_ids).order_by('pk').values('booking_id', *fields):
+        first.setdefault(row['booking_id'], row)
+    return first
+
+
+def backfill_policy_summaries(apps, schema_editor):
+    InsurancePolicy = apps.get_model('core', 'InsurancePolicy')
+    Ticket = apps.get_model('core', 'Ticket')
+    Payment = apps.get_model('core', 'Payment')
+    PolicySummary = apps.get_model('core', 'PolicySummary')
+
+    policies = list(InsurancePolicy.objects.values(
+        'policyId', 'premium', 'coverageAmount', 'status__code', 'booking_id', 'booking__bookingDate',
+        'booking__user_id', 'booking__user__name', 'booking__user__email', 'booking__user__phone',
+        'booking__flight_id', 'booking__flight__origin', 'booking__flight__destination',
+        'booking__flight__departureTime', 'booking__flight__arrivalTime',
+    ))
+    for start in range(0, len(policies), 500):
+        chunk = policies[start:start + 500]
+        booking_ids = {p['booking_id'] for p in chunk}
+        tickets = _first_by_booking(Ticket, booking_ids, 'price', 'seatNumber', 'company', 'isPremium')
+        payments = _first_by_booking(Payment, booking_ids, 'amount')
+        summaries = []
+        for p in chunk:
+            ticket, payment = tickets.get(p['booking_id']), payments.get(p['booking_id'])
+            departure, arrival = p['booking__flight__departureTime'], p['booking__flight__arrivalTime']
+            origin, destination = p['booking__flight__origin'], p['booking__flight__destination']
+            payload = {
+                "id": p['policyId'],
+                "user_id": p['booking__user_id'],
+                "flight_id": f"FL{p['booking__flight_id']}",
+                "premium_paid": str(p['premium']),
+                "coverage_amount": str(p['coverageAmount']),
+                "start_time": departure.isoformat() if departure else "",
+                "end_time": arrival.isoformat() if arrival else "",
+                "status": p['status__code'].upper(),
+                "contract_address": "0x7a3F...8b2C",
+                "route": f"{origin} → {destination}",
+                "origin": origin,
+                "destination": destination,
+                "departure_date": _fmt(departure, "%B %d, %Y"),
+                "departure_time_formatted": _fmt(departure, "%I:%M %p"),
+                "arrival_date": _fmt(arrival, "%B %d, %Y"),
+                "arrival_time_formatted": _fmt(arrival, "%I:%M %p"),
+                "flight_duration": _duration(departure, arrival),
+                "ticket_price": str(ticket['price']) if ticket else "0.00",
+                "seat_number": ticket['seatNumber'] if ticket else "N/A",
+                "airline": ticket['company'] if ticket else "Unknown Airline",
+                "is_premium_seat": ticket['isPremium'] if ticket else False,
+                "booking_id": p['booking_id'],
+                "booking_date": _fmt(p['booking__bookingDate'], "%B %d, %Y at %I:%M %p"),
+                "total_paid": str(payment['amount']) if payment else "0.00",
+                "passenger": p['booking__user__name'],
+                "email": p['booking__user__email'],
+                "phone": p['booking__user__phone'],
+            }
+            summaries.append(PolicySummary(
+                policy_id=p['policyId'],
+                user_id=p['booking__user_id'],
+                payload=json.dumps(payload, ensure_ascii=False, separators=(',', ':')),
+            ))
+        PolicySummary.objects.bulk_create(summaries)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_flight_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PolicySummary',
+            fields=[
+                ('policy', models.OneToOneField(db_column='policyid', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='core.insurancepolicy')),
+                ('payload', models.TextField()),
+                ('updatedAt', models.DateTimeField(auto_now=True, db_column='updatedat')),
+                ('user', models.ForeignKey(db_column='user_id', db_index=False, on_delete=django.db.models.deletion.CASCADE, to='core.appuser')),
+            ],
+            options={
+                'db_table': 'policy_summary',
+                'managed': True,
+                'indexes': [models.Index(fields=['user', 'policy'], name='policy_summary_user_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_policy_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:39
+
+from datetime import timedelta
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_claim_dates(apps, schema_editor):
+    # Existing claims had no timestamp; the best estimate is when the delayed
+    # flight actually left (scheduled departure + delay hours).
+    InsuranceClaim = apps.get_model('core', 'InsuranceClaim')
+    claims = list(InsuranceClaim.objects.select_related('policy__booking__flight'))
+    for claim in claims:
+        departure = claim.policy.booking.flight.departureTime
+        claim.claimDate = departure + timedelta(hours=claim.delayDuration or 0)
+    InsuranceClaim.objects.bulk_update(claims, ['claimDate'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_policy_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='insuranceclaim',
+            name='claimDate',
+            field=models.DateTimeField(db_column='claimdate', default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(backfill_claim_dates, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='insuranceclaim',
+            index=models.Index(fields=['policy', 'claimDate', 'claimId'], name='claim_policy_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['booking', 'paymentDate', 'paymentId'], name='payment_booking_date_idx'),
+        ),
+    ]
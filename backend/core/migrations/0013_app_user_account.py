@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def link_accounts_by_email(apps, schema_editor):
+    # Profiles were matched to login accounts by email until now
+    AppUser = apps.get_model('core', 'AppUser')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    account_ids = dict(User.objects.exclude(email='').values_list('email', 'id'))
+    profiles = list(AppUser.objects.filter(account__isnull=True, email__in=list(account_ids)))
+    for profile in profiles:
+        profile.account_id = account_ids[profile.email]
+    AppUser.objects.bulk_update(profiles, ['account'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_transaction_ledger'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appuser',
+            name='account',
+            field=models.OneToOneField(blank=True, db_column='account_id', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='app_user', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(link_accounts_by_email, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:47
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_app_user_account'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevokedRefreshToken',
+            fields=[
+                ('revocationId', models.BigAutoField(db_column='revocationid', primary_key=True, serialize=False)),
+                ('key', models.CharField(max_length=32, unique=True)),
+                ('kind', models.CharField(max_length=10)),
+                ('expiresAt', models.DateTimeField(db_column='expiresat', db_index=True)),
+                ('createdAt', models.DateTimeField(db_column='createdat', db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'revoked_refresh_token',
+                'managed': True,
+            },
+        ),
+    ]
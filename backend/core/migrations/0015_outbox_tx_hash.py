@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_revoked_refresh_token'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='policyissuanceoutbox',
+            name='txHash',
+            field=models.CharField(blank=True, db_column='txhash', max_length=66, null=True),
+        ),
+        migrations.AlterField(
+            model_name='policyissuanceoutbox',
+            name='state',
+            field=models.CharField(choices=[('issuing', 'Issuing'), ('submitted', 'Submitted'), ('issued', 'Issued'), ('failed', 'Failed')], default='issuing', max_length=20),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_outbox_tx_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='idempotencykey',
+            name='leaseExpiresAt',
+            field=models.DateTimeField(blank=True, db_column='leaseexpiresat', null=True),
+        ),
+    ]
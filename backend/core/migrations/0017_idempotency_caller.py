@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_idempotency_lease'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='idempotencykey',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='idempotencykey',
+            name='userId',
+            field=models.BigIntegerField(db_column='userid', default=0),
+        ),
+        migrations.AlterUniqueTogether(
+            name='idempotencykey',
+            unique_together={('scope', 'userId', 'key')},
+        ),
+    ]
@@ -1,4 +1,6 @@
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 class StatusLookup(models.Model):
     statusId = models.AutoField(primary_key=True, db_column='statusid')
@@ -18,6 +20,11 @@ class AppUser(models.Model):
     name = models.CharField(max_length=100)
     email = models.CharField(max_length=100, unique=True)
     phone = models.CharField(max_length=20, null=True, blank=True)
+    # Login account (django.contrib.auth User) this passenger profile belongs to
+    account = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+        db_column='account_id', related_name='app_user'
+    )
 
     class Meta:
         managed = True  # Changed for local SQLite development
@@ -40,6 +47,9 @@ class Flight(models.Model):
     flightId = models.AutoField(primary_key=True, db_column='flightid')
     origin = models.CharField(max_length=100)
     destination = models.CharField(max_length=100)
+    # IATA codes normalised from origin/destination (see core.airports)
+    originCode = models.CharField(max_length=3, null=True, blank=True, db_column='origincode')
+    destinationCode = models.CharField(max_length=3, null=True, blank=True, db_column='destinationcode')
     departureTime = models.DateTimeField(db_column='departuretime')
     arrivalTime = models.DateTimeField(db_column='arrivaltime')
     status = models.ForeignKey(StatusLookup, on_delete=models.CASCADE, db_column='statusid')
@@ -47,6 +57,15 @@ class Flight(models.Model):
     class Meta:
         managed = True  # Changed for local SQLite development
         db_table = 'flight'
+        indexes = [
+            # Route searches filter on the IATA codes, then by departure day/order
+            models.Index(fields=['originCode', 'departureTime'], name='flight_origin_dep_idx'),
+            models.Index(fields=['destinationCode', 'departureTime'], name='flight_dest_dep_idx'),
+            models.Index(fields=['origin', 'departureTime'], name='flight_origin_text_dep_idx'),
+            models.Index(fields=['destination', 'departureTime'], name='flight_dest_text_dep_idx'),
+            # Date range filter plus the (departureTime, flightId) keyset order
+            models.Index(fields=['departureTime', 'flightId'], name='flight_departure_idx'),
+        ]
 
     def __str__(self):
         return f"{self.origin} -> {self.destination} ({self.departureTime})"
@@ -99,6 +118,10 @@ class Payment(models.Model):
     class Meta:
         managed = True  # Changed for local SQLite development
         db_table = 'payment'
+        indexes = [
+            # Transaction ledger: per-booking history in time order
+            models.Index(fields=['booking', 'paymentDate', 'paymentId'], name='payment_booking_date_idx'),
+        ]
 
 class InsuranceClaim(models.Model):
     claimId = models.AutoField(primary_key=True, db_column='claimid')
@@ -106,7 +129,156 @@ class InsuranceClaim(models.Model):
     delayDuration = models.FloatField(db_column='delayduration')
     claimStatus = models.CharField(max_length=50, db_column='claimstatus')
     payoutAmount = models.DecimalField(max_digits=10, decimal_places=2, db_column='payoutamount')
+    claimDate = models.DateTimeField(default=timezone.now, db_column='claimdate')
 
     class Meta:
         managed = True  # Changed for local SQLite development
         db_table = 'insuranceclaim'
+        indexes = [
+            models.Index(fields=['policy', 'claimDate', 'claimId'], name='claim_policy_date_idx'),
+        ]
+
+class PolicyIssuanceOutbox(models.Model):
+    """
+    Durable outbox for on-chain policy issuance.
+
+    A row is written in the same transaction as the InsurancePolicy; the
+    issuance worker (blockchain.outbox_worker) picks it up, calls buyPolicy and
+    records the on-chain ids on the policy. Once buyPolicy has been sent the
+    row is ``submitted`` and keeps the transaction hash, so a retry checks
+    that transaction instead of buying the policy a second time.
+    """
+    STATE_ISSUING = 'issuing'
+    STATE_SUBMITTED = 'submitted'
+    STATE_ISSUED = 'issued'
+    STATE_FAILED = 'failed'
+    STATE_CHOICES = [
+        (STATE_ISSUING, 'Issuing'),
+        (STATE_SUBMITTED, 'Submitted'),
+        (STATE_ISSUED, 'Issued'),
+        (STATE_FAILED, 'Failed'),
+    ]
+
+    outboxId = models.AutoField(primary_key=True, db_column='outboxid')
+    policy = models.OneToOneField(InsurancePolicy, on_delete=models.CASCADE, db_column='policyid', related_name='issuance')
+    ticketId = models.IntegerField(db_column='ticketid')
+    delayThreshold = models.IntegerField(db_column='delaythreshold')  # minutes
+    state = models.CharField(max_length=20, choices=STATE_CHOICES, default=STATE_ISSUING)
+    attempts = models.IntegerField(default=0)
+    txHash = models.CharField(max_length=66, null=True, blank=True, db_column='txhash')  # last buyPolicy sent
+    lastError = models.TextField(null=True, blank=True, db_column='lasterror')
+    nextAttemptAt = models.DateTimeField(db_column='nextattemptat')  # also acts as the worker lease
+    createdAt = models.DateTimeField(auto_now_add=True, db_column='createdat')
+    updatedAt = models.DateTimeField(auto_now=True, db_column='updatedat')
+
+    class Meta:
+        managed = True
+        db_table = 'policy_issuance_outbox'
+        indexes = [
+            models.Index(fields=['state', 'nextAttemptAt'], name='outbox_state_next_idx'),
+        ]
+
+class IdempotencyKey(models.Model):
+    """
+    Stored outcome of a request sent with an ``Idempotency-Key`` header.
+
+    The row is inserted (state ``in_progress``) before the request is handled,
+    which serializes concurrent duplicates across workers through the unique
+    constraint, and is completed with the JSON response afterwards. An
+    ``in_progress`` row whose lease has run out belongs to a request that
+    died; the next retry takes it over. Keys are scoped to the caller
+    (``userId``), so two clients can never collide on or replay each
+    other's key.
+    """
+    STATE_IN_PROGRESS = 'in_progress'
+    STATE_COMPLETED = 'completed'
+    STATE_CHOICES = [
+        (STATE_IN_PROGRESS, 'In progress'),
+        (STATE_COMPLETED, 'Completed'),
+    ]
+
+    idempotencyId = models.BigAutoField(primary_key=True, db_column='idempotencyid')
+    scope = models.CharField(max_length=50)
+    userId = models.BigIntegerField(default=0, db_column='userid')  # caller; 0 for anonymous batch requests
+    key = models.CharField(max_length=255)
+    requestHash = models.CharField(max_length=64, db_column='requesthash')
+    state = models.CharField(max_length=20, choices=STATE_CHOICES, default=STATE_IN_PROGRESS)
+    responseBody = models.TextField(null=True, blank=True, db_column='responsebody')
+    createdAt = models.DateTimeField(db_column='createdat', db_index=True)
+    leaseExpiresAt = models.DateTimeField(null=True, blank=True, db_column='leaseexpiresat')  # owner of an in_progress row
+
+    class Meta:
+        managed = True
+        db_table = 'idempotency_key'
+        unique_together = (('scope', 'userId', 'key'),)
+
+class FlightSeatInventory(models.Model):
+    """
+    Per-flight, per-cabin seat bitmap (bit i set = seat i taken).
+
+    Rows are created lazily by api.services.seats the first time a flight is
+    booked and are locked with SELECT ... FOR UPDATE while seats are assigned.
+    """
+    inventoryId = models.AutoField(primary_key=True, db_column='inventoryid')
+    flight = models.ForeignKey(Flight, on_delete=models.CASCADE, db_column='flightid', related_name='seat_inventory')
+    cabin = models.CharField(max_length=20)
+    capacity = models.IntegerField()
+    seatsAvailable = models.IntegerField(db_column='seatsavailable')
+    seatMap = models.BinaryField(db_column='seatmap')
+
+    class Meta:
+        managed = True
+        db_table = 'flight_seat_inventory'
+        unique_together = (('flight', 'cabin'),)
+
+class CacheVersion(models.Model):
+    """
+    Monotonic version counter per cache scope (e.g. ``flights``, ``flight:42``).
+
+    Bumped whenever the data behind a scope changes, from any process (the
+    oracle simulator runs outside the API server), so cached responses can be
+    validated with one primary-key read.
+    """
+    scope = models.CharField(max_length=100, primary_key=True)
+    version = models.BigIntegerField(default=0)
+
+    class Meta:
+        managed = True
+        db_table = 'cache_version'
+
+class PolicySummary(models.Model):
+    """
+    Read model for ``GET /api/policies/mine``: one pre-joined, pre-formatted
+    JSON row per policy, maintained by core.policy_summary.
+    """
+    policy = models.OneToOneField(InsurancePolicy, on_delete=models.CASCADE, primary_key=True, db_column='policyid', related_name='summary')
+    user = models.ForeignKey(AppUser, on_delete=models.CASCADE, db_column='user_id', db_index=False)
+    payload = models.TextField()
+    updatedAt = models.DateTimeField(auto_now=True, db_column='updatedat')
+
+    class Meta:
+        managed = True
+        db_table = 'policy_summary'
+        indexes = [
+            models.Index(fields=['user', 'policy'], name='policy_summary_user_idx'),
+        ]
+
+class RevokedRefreshToken(models.Model):
+    """
+    Spent refresh-token ids and revoked token families, kept until the
+    tokens they cover expire. Mirrored in memory by
+    api.services.refresh_tokens; the unique ``key`` makes each refresh token
+    single-use across processes.
+    """
+    KIND_TOKEN = 'token'
+    KIND_FAMILY = 'family'
+
+    revocationId = models.BigAutoField(primary_key=True, db_column='revocationid')
+    key = models.CharField(max_length=32, unique=True)  # token jti or family id
+    kind = models.CharField(max_length=10)
+    expiresAt = models.DateTimeField(db_column='expiresat', db_index=True)
+    createdAt = models.DateTimeField(default=timezone.now, db_column='createdat', db_index=True)
+
+    class Meta:
+        managed = True
+        db_table = 'revoked_refresh_token'
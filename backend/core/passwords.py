@@ -0,0 +1,59 @@
+"""
+Password hashing off the event loop and the request threadpools.
+
+PBKDF2 with Django's default iteration count costs a core for a noticeable
+fraction of a second, so ``login``/``register`` run it on
+``password_executor`` (a bounded process pool, see core.executors) instead of
+inline. ``hash_password``/``verify_password`` are the jobs shipped to the
+workers: plain functions of strings that never touch the database.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password, identify_hasher, make_password
+
+from core.executors import orm_executor, password_executor
+
+
+def hash_password(raw_password):
+    return make_password(raw_password)
+
+
+def verify_password(raw_password, encoded):
+    """``(matches, needs_rehash)`` for a stored hash (worker side of check_password)."""
+    if not check_password(raw_password, encoded):
+        return False, False
+    try:
+        return True, identify_hasher(encoded).must_update(encoded)
+    except ValueError:
+        return True, False
+
+
+def _get_user(username):
+    UserModel = get_user_model()
+    return UserModel._default_manager.filter(**{UserModel.USERNAME_FIELD: username}).first()
+
+
+async def ahash_password(raw_password):
+    return await password_executor.run(hash_password, raw_password)
+
+
+async def aauthenticate(username, password):
+    """
+    Async equivalent of ``authenticate()`` with ModelBackend: the user is
+    loaded here, only the hash comparison runs on the pool. Unknown users
+    still cost one hash so response time doesn't reveal which usernames exist.
+    Raises ExecutorSaturated when a pool's queue is full.
+    """
+    if username is None or password is None:
+        return None
+    user = await orm_executor.run(_get_user, username)
+    if user is None:
+        await ahash_password(password)
+        return None
+    matches, needs_rehash = await password_executor.run(verify_password, password, user.password)
+    if not matches or not user.is_active:
+        return None
+    if needs_rehash:
+        # Same upgrade check_password(setter=...) does, e.g. after an iteration bump
+        user.password = await ahash_password(password)
+        await orm_executor.run(user.save, update_fields=['password'])
+    return user
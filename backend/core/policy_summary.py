@@ -0,0 +1,315 @@
+"""
+``policy_summary`` read model behind ``GET /api/policies/mine``.
+
+Each PolicySummary row holds the fully joined and formatted JSON object the
+endpoint returns for one policy (flight, ticket, payment and passenger
+details), so the endpoint is a single indexed scan on ``(user, policy)``
+that concatenates stored payloads.
+
+The booking services insert the rows of new policies inside the booking
+transaction from the objects they just created (``write_new_summaries``).
+Rows are rebuilt after commit whenever something they are made of changes:
+policies, tickets and payments of a booking (booking, payment and
+settlement writes), the flight (schedule/status) or the passenger. Model
+saves schedule this through ``core.signals``; bulk writers that bypass
+signals call ``schedule_refresh`` themselves.
+
+The same flush bumps the ``user:<id>`` cache version of every passenger
+involved, which invalidates their cached policy and transaction responses
+(api.services.user_cache) in every process.
+"""
+import threading
+import weakref
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.backends.utils import format_number
+from django.db.models import Q
+
+from api.services.serializers import Projection, dumps, first_by_key
+from core.cache_versions import bump_versions, user_scope
+from core.models import Booking, InsurancePolicy, Payment, PolicySummary, Ticket
+
+REBUILD_CHUNK = 500
+
+SUMMARY_PROJECTION = Projection(
+    id='policyId',
+    premium='premium',
+    coverage='coverageAmount',
+    status='status__code',
+    booking_id='booking_id',
+    booking_date='booking__bookingDate',
+    user_id='booking__user_id',
+    passenger='booking__user__name',
+    email='booking__user__email',
+    phone='booking__user__phone',
+    flight_id='booking__flight_id',
+    origin='booking__flight__origin',
+    destination='booking__flight__destination',
+    departure='booking__flight__departureTime',
+    arrival='booking__flight__arrivalTime',
+)
+TICKET_PROJECTION = Projection(
+    booking_id='booking_id', price='price', seat='seatNumber', company='company', is_premium='isPremium'
+)
+PAYMENT_AMOUNT_PROJECTION = Projection(booking_id='booking_id', amount='amount')
+
+
+def calculate_duration(departure, arrival):
+    """Calculate flight duration as a string"""
+    if not departure or not arrival:
+        return "N/A"
+    delta = arrival - departure
+    hours = int(delta.total_seconds() // 3600)
+    minutes = int((delta.total_seconds() % 3600) // 60)
+    return f"{hours}h {minutes}m"
+
+
+def fmt_date(value):
+    return value.strftime("%B %d, %Y") if value else ""
+
+
+def fmt_time(value):
+    return value.strftime("%I:%M %p") if value else ""
+
+
+def fmt_datetime(value):
+    return value.strftime("%B %d, %Y at %I:%M %p") if value else ""
+
+
+def first_rows_by_booking(projection, model, booking_ids):
+    """First related row per booking (lowest pk, as ``.first()`` would pick)."""
+    if not booking_ids:
+        return {}
+    queryset = model.objects.filter(booking_id__in=booking_ids).order_by('pk')
+    return first_by_key(projection.rows(queryset), 'booking_id')
+
+
+def summary_payload(p, ticket, payment):
+    departure, arrival = p['departure'], p['arrival']
+    return {
+        "id": p['id'],
+        "user_id": p['user_id'],
+        "flight_id": f"FL{p['flight_id']}",
+        "premium_paid": str(p['premium']),
+        "coverage_amount": str(p['coverage']),
+        "start_time": departure.isoformat() if departure else "",
+        "end_time": arrival.isoformat() if arrival else "",
+        "status": p['status'].upper(),
+        "contract_address": "0x7a3F...8b2C",
+        # Flight details
+        "route": f"{p['origin']} → {p['destination']}",
+        "origin": p['origin'],
+        "destination": p['destination'],
+        "departure_date": fmt_date(departure),
+        "departure_time_formatted": fmt_time(departure),
+        "arrival_date": fmt_date(arrival),
+        "arrival_time_formatted": fmt_time(arrival),
+        "flight_duration": calculate_duration(departure, arrival),
+        # Ticket details
+        "ticket_price": str(ticket['price']) if ticket else "0.00",
+        "seat_number": ticket['seat'] if ticket else "N/A",
+        "airline": ticket['company'] if ticket else "Unknown Airline",
+        "is_premium_seat": ticket['is_premium'] if ticket else False,
+        # Booking details
+        "booking_id": p['booking_id'],
+        "booking_date": fmt_datetime(p['booking_date']),
+        "total_paid": str(payment['amount']) if payment else "0.00",
+        # Passenger details
+        "passenger": p['passenger'],
+        "email": p['email'],
+        "phone": p['phone']
+    }
+
+
+def rebuild_policy_summaries(policy_ids):
+    """Recompute and upsert the summary rows of ``policy_ids``; returns the count."""
+    return len(_rebuild(InsurancePolicy.objects.filter(policyId__in=list(policy_ids))))
+
+
+def _rebuild(policies_queryset):
+    """Upsert the summaries of ``policies_queryset``; returns the projected policy rows."""
+    policies = SUMMARY_PROJECTION.rows(policies_queryset)
+    for start in range(0, len(policies), REBUILD_CHUNK):
+        chunk = policies[start:start + REBUILD_CHUNK]
+        booking_ids = {p['booking_id'] for p in chunk}
+        tickets = first_rows_by_booking(TICKET_PROJECTION, Ticket, booking_ids)
+        payments = first_rows_by_booking(PAYMENT_AMOUNT_PROJECTION, Payment, booking_ids)
+        PolicySummary.objects.bulk_create(
+            [
+                PolicySummary(
+                    policy_id=p['id'],
+                    user_id=p['user_id'],
+                    payload=dumps(summary_payload(
+                        p, tickets.get(p['booking_id']), payments.get(p['booking_id'])
+                    )).decode()
+                )
+                for p in chunk
+            ],
+            update_conflicts=True,
+            unique_fields=['policy'],
+            update_fields=['user', 'payload', 'updatedAt'],
+        )
+    return policies
+
+
+def _stored_decimal(model, field_name, value):
+    """``value`` as the model's DecimalField column reads back."""
+    field = model._meta.get_field(field_name)
+    return Decimal(format_number(field.to_python(value), field.max_digits, field.decimal_places))
+
+
+def write_new_summaries(created):
+    """
+    Insert the summaries of policies created in the current transaction
+    together with their booking, ticket and payment, built from those
+    objects (booking, passenger and flight loaded) instead of re-read after
+    commit. ``created`` holds ``(policy, ticket, payment)`` tuples.
+    """
+    summaries = []
+    for policy, ticket, payment in created:
+        booking = policy.booking
+        user, flight = booking.user, booking.flight
+        p = {
+            'id': policy.policyId,
+            'premium': _stored_decimal(InsurancePolicy, 'premium', policy.premium),
+            'coverage': _stored_decimal(InsurancePolicy, 'coverageAmount', policy.coverageAmount),
+            'status': policy.status.code,
+            'booking_id': booking.bookingId,
+            'booking_date': booking.bookingDate,
+            'user_id': user.user_id,
+            'passenger': user.name,
+            'email': user.email,
+            'phone': user.phone,
+            'flight_id': flight.flightId,
+            'origin': flight.origin,
+            'destination': flight.destination,
+            'departure': flight.departureTime,
+            'arrival': flight.arrivalTime,
+        }
+        ticket_row = {
+            'price': _stored_decimal(Ticket, 'price', ticket.price),
+            'seat': ticket.seatNumber,
+            'company': ticket.company,
+            'is_premium': ticket.isPremium,
+        }
+        payment_row = {'amount': _stored_decimal(Payment, 'amount', payment.amount)}
+        summaries.append(PolicySummary(
+            policy_id=policy.policyId,
+            user_id=user.user_id,
+            payload=dumps(summary_payload(p, ticket_row, payment_row)).decode()
+        ))
+    PolicySummary.objects.bulk_create(summaries)
+    _schedule(lambda batch: batch.written.update(summary.policy_id for summary in summaries))
+
+
+# -- refresh scheduling -------------------------------------------------------
+
+_pending = threading.local()
+
+
+class _RefreshBatch:
+    """Refresh keys collected during one transaction."""
+
+    def __init__(self):
+        self.bookings, self.flights, self.users, self.policies = set(), set(), set(), set()
+        self.new_bookings = {}  # booking id -> passenger id, for bookings created in the transaction
+        self.written = set()  # policies whose summaries were written in the transaction (write_new_summaries)
+
+
+class _BatchCommit:
+    """A batch's on_commit callback; Django drops it instead if the transaction rolls back."""
+
+    def __init__(self, batch):
+        self.batch = batch
+
+    def __call__(self):
+        _discard(self.batch)
+        flush_refresh(self.batch)
+
+
+def _discard(batch):
+    if getattr(_pending, 'batch', None) is batch:
+        _pending.batch = None
+
+
+def _transaction_batch():
+    """
+    The current transaction's batch, created on first use; None in autocommit.
+
+    The batch is cleared by its on_commit callback. When the transaction (or
+    the savepoint that created the batch) rolls back, Django drops that
+    callback instead, and the finalizer attached to it clears the batch, so
+    its keys never reach the next transaction on this thread.
+    """
+    if not transaction.get_connection().in_atomic_block:
+        return None
+    batch = getattr(_pending, 'batch', None)
+    if batch is None:
+        batch = _pending.batch = _RefreshBatch()
+        callback = _BatchCommit(batch)
+        weakref.finalize(callback, _discard, batch)
+        transaction.on_commit(callback)
+    return batch
+
+
+def _schedule(update):
+    batch = _transaction_batch()
+    if batch is None:
+        batch = _RefreshBatch()
+        update(batch)
+        flush_refresh(batch)
+    else:
+        update(batch)
+
+
+def schedule_refresh(booking_ids=(), flight_ids=(), user_ids=(), policy_ids=()):
+    """
+    Rebuild the summaries touching these bookings/flights/users/policies once
+    the current transaction commits (immediately in autocommit). Requests
+    within one transaction are merged into a single rebuild.
+    """
+    def update(batch):
+        batch.bookings.update(booking_ids)
+        batch.flights.update(flight_ids)
+        batch.users.update(user_ids)
+        batch.policies.update(policy_ids)
+    _schedule(update)
+
+
+def note_new_bookings(passengers):
+    """
+    Bookings created in the current transaction (``{booking id: passenger id}``).
+    Their own ticket and payment writes need no rebuild (a policy written
+    with them is refreshed through ``policy_ids``), only a bump of the
+    passenger's cached responses.
+    """
+    _schedule(lambda batch: batch.new_bookings.update(passengers))
+
+
+def flush_refresh(batch):
+    bookings = batch.bookings - batch.new_bookings.keys()
+    flights, users, policies = batch.flights, batch.users, batch.policies - batch.written
+    bumped = set(batch.new_bookings.values()) | users
+    if bookings or flights or users or policies:
+        condition = Q()
+        if bookings:
+            condition |= Q(booking_id__in=bookings)
+        if flights:
+            condition |= Q(booking__flight_id__in=flights)
+        if users:
+            condition |= Q(booking__user_id__in=users)
+        if policies:
+            condition |= Q(policyId__in=policies)
+        rebuilt = _rebuild(InsurancePolicy.objects.filter(condition))
+
+        # Passengers of rebuilt policies are known already; only uninsured
+        # bookings and flight-wide refreshes need a lookup
+        bumped |= {p['user_id'] for p in rebuilt}
+        bookings = bookings - {p['booking_id'] for p in rebuilt}
+        if bookings or flights:
+            bumped |= set(Booking.objects.filter(
+                Q(bookingId__in=bookings) | Q(flight_id__in=flights)
+            ).values_list('user_id', flat=True))
+    if bumped:
+        bump_versions([user_scope(user_id) for user_id in bumped])
@@ -0,0 +1,28 @@
+"""
+Lightweight per-request SQL query counter.
+
+Usage:
+    with count_queries() as counter:
+        ...ORM work...
+    logger.info(f"{counter.count} queries")
+"""
+from contextlib import contextmanager
+
+from django.db import connection
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def count_queries(using=connection):
+    """Count every statement executed on ``using`` inside the block."""
+    counter = QueryCounter()
+    with using.execute_wrapper(counter):
+        yield counter
@@ -0,0 +1,154 @@
+"""
+Model signal handlers that keep in-process caches coherent with the database.
+Connected from ``CoreConfig.ready``.
+"""
+from django.db import transaction
+from django.db.models import F, Q
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from api.services.principals import principal_cache
+from api.services.seats import is_cancelled, release_booking_seats, release_seats, ticket_cabin
+from core.airports import resolve_airport_code
+from core.cache_versions import FLIGHTS_SCOPE, bump_versions, flight_scopes
+from core.flight_events import flight_status_broker
+from core.models import (
+    AppUser, Booking, CacheVersion, Flight, InsuranceClaim, InsurancePolicy, Payment, PolicySummary, StatusLookup,
+    Ticket
+)
+from core.policy_summary import note_new_bookings, schedule_refresh
+from core.status_registry import status_registry
+
+
+@receiver(post_save, sender=StatusLookup)
+@receiver(post_delete, sender=StatusLookup)
+def invalidate_status_registry(sender, **kwargs):
+    status_registry.invalidate()
+
+
+@receiver(post_save, sender=StatusLookup)
+@receiver(post_delete, sender=StatusLookup)
+def invalidate_flight_responses_for_status(sender, instance, **kwargs):
+    # A renamed/removed flight status changes every cached flight response
+    if instance.statusType == 'flight':
+        transaction.on_commit(lambda: CacheVersion.objects.filter(
+            Q(scope=FLIGHTS_SCOPE) | Q(scope__startswith='flight:')
+        ).update(version=F('version') + 1))
+
+
+@receiver(post_save, sender=Flight)
+@receiver(post_delete, sender=Flight)
+def invalidate_flight_responses(sender, instance, **kwargs):
+    """Bump the flight's cache versions once the change (e.g. a status update) commits."""
+    scopes = flight_scopes([instance.pk])
+    transaction.on_commit(lambda: bump_versions(scopes))
+
+
+@receiver(pre_save, sender=Flight)
+def fill_flight_airport_codes(sender, instance, **kwargs):
+    """Keep originCode/destinationCode in step with the free-text columns."""
+    instance.originCode = resolve_airport_code(instance.origin)
+    instance.destinationCode = resolve_airport_code(instance.destination)
+
+
+@receiver(post_save, sender=Flight)
+def publish_flight_status(sender, instance, **kwargs):
+    """Push the flight's status to /api/flights/stream subscribers once committed."""
+    if flight_status_broker.is_watched(instance.pk):
+        flight_id, status = instance.pk, instance.status.code
+        transaction.on_commit(lambda: flight_status_broker.publish(flight_id, status))
+
+
+@receiver(post_save, sender=InsurancePolicy)
+def refresh_policy_summary(sender, instance, **kwargs):
+    schedule_refresh(policy_ids=[instance.pk])
+
+
+@receiver(post_save, sender=Ticket)
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Ticket)
+@receiver(post_delete, sender=Payment)
+def refresh_booking_policy_summaries(sender, instance, **kwargs):
+    """Booking, payment and settlement writes refresh the booking's policy summaries."""
+    schedule_refresh(booking_ids=[instance.booking_id])
+
+
+@receiver(post_delete, sender=Ticket)
+def release_ticket_seat(sender, instance, **kwargs):
+    """A deleted ticket, or one deleted with its booking, frees its seat."""
+    booking = Booking.objects.filter(pk=instance.booking_id).values('flight_id', 'status_id').first()
+    # A cancelled booking already gave its seats back
+    if booking is not None and not is_cancelled(booking['status_id']):
+        release_seats(booking['flight_id'], ticket_cabin(instance), [instance.seatNumber])
+
+
+@receiver(pre_save, sender=Booking)
+def remember_booking_status(sender, instance, **kwargs):
+    if not instance._state.adding:
+        instance._previous_status_id = Booking.objects.filter(
+            pk=instance.pk
+        ).values_list('status_id', flat=True).first()
+
+
+@receiver(post_save, sender=Booking)
+def release_cancelled_booking_seats(sender, instance, created, **kwargs):
+    """Cancelling a booking frees its seats for the next passenger."""
+    previous = getattr(instance, '_previous_status_id', None)
+    if not created and is_cancelled(instance.status_id) and previous is not None and not is_cancelled(previous):
+        release_booking_seats(instance)
+
+
+@receiver(post_delete, sender=InsurancePolicy)
+def drop_policy_summary(sender, instance, **kwargs):
+    """A deleted policy leaves /policies/mine and the passenger's cached responses."""
+    PolicySummary.objects.filter(policy_id=instance.pk).delete()
+    # When the booking itself is being deleted, refresh_deleted_booking_user names the passenger
+    schedule_refresh(booking_ids=[instance.booking_id])
+
+
+@receiver(post_save, sender=Booking)
+def refresh_booking_summaries(sender, instance, created, **kwargs):
+    if created:
+        # Nothing summarises a brand-new booking until a policy is written for it
+        note_new_bookings({instance.pk: instance.user_id})
+    else:
+        schedule_refresh(booking_ids=[instance.pk])
+
+
+@receiver(post_delete, sender=Booking)
+def refresh_deleted_booking_user(sender, instance, **kwargs):
+    # The booking row is gone by flush time, so name its passenger directly
+    schedule_refresh(user_ids=[instance.user_id])
+
+
+@receiver(post_save, sender=InsuranceClaim)
+@receiver(post_delete, sender=InsuranceClaim)
+def refresh_claim_user(sender, instance, **kwargs):
+    """Claims show up in the passenger's transaction ledger."""
+    schedule_refresh(booking_ids=[instance.policy.booking_id])
+
+
+@receiver(post_save, sender=Flight)
+def refresh_flight_policy_summaries(sender, instance, created, **kwargs):
+    if not created:
+        schedule_refresh(flight_ids=[instance.pk])
+
+
+@receiver(post_save, sender=AppUser)
+def refresh_user_policy_summaries(sender, instance, created, **kwargs):
+    if not created:
+        schedule_refresh(user_ids=[instance.pk])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def evict_account_principal(sender, instance, **kwargs):
+    principal_cache.evict(instance.pk)
+
+
+@receiver(post_save, sender=AppUser)
+@receiver(post_delete, sender=AppUser)
+def evict_profile_principal(sender, instance, **kwargs):
+    if instance.account_id is not None:
+        principal_cache.evict(instance.account_id)
@@ -0,0 +1,62 @@
+"""
+Warm in-process registry for StatusLookup rows.
+
+The status table is tiny and almost never changes, so instead of probing it
+with ``code__iexact`` on every request we load it once and serve lookups from
+memory. The registry is invalidated from ``core.signals`` whenever a
+StatusLookup row is saved or deleted.
+"""
+import threading
+
+from core.models import StatusLookup
+
+
+class StatusRegistry:
+    """Case-insensitive ``(statusType, code) -> StatusLookup`` cache."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_type = None   # {(statusType, code.lower()): StatusLookup}
+        self._by_code = None   # {code.lower(): StatusLookup}, first row wins
+
+    def _load(self):
+        by_type, by_code = {}, {}
+        for status in StatusLookup.objects.order_by('statusId'):
+            key = status.code.lower()
+            by_type[(status.statusType, key)] = status
+            by_code.setdefault(key, status)
+        self._by_type, self._by_code = by_type, by_code
+
+    def get(self, code, status_type):
+        """
+        Return the status with ``code`` (case-insensitive).
+
+        Prefers a row of ``status_type``; falls back to any row with the same
+        code (the historical ``code__iexact`` behaviour), and creates the row
+        when it does not exist at all.
+        """
+        key = code.lower()
+        with self._lock:
+            if self._by_type is None:
+                self._load()
+            status = self._by_type.get((status_type, key)) or self._by_code.get(key)
+        if status is not None:
+            return status
+
+        # Creating the row fires post_save, which invalidates the registry;
+        # the next lookup reloads it with the new row included.
+        status, _ = StatusLookup.objects.get_or_create(code=code, statusType=status_type)
+        return status
+
+    def invalidate(self):
+        with self._lock:
+            self._by_type = None
+            self._by_code = None
+
+
+status_registry = StatusRegistry()
+
+
+def get_status(code, status_type):
+    """Shortcut for ``status_registry.get``."""
+    return status_registry.get(code, status_type)
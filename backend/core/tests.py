@@ -0,0 +1,630 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest import mock
+
+import jwt
+from django.conf import settings
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.utils import timezone
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.exceptions import TimeExhausted
+
+from api.endpoints.auth import create_access_token, create_refresh_token, decode_refresh_token
+from api.services.bookings import create_booking_batch, create_booking_records
+from api.services.ledger import CLAIM, PAYMENT, day_bounds, ledger_page
+from api.services.pagination import InvalidCursor, decode_cursor, encode_cursor, paginate
+from api.services.idempotency import IdempotencyStore, IdempotencyInProgress, request_fingerprint
+from api.services.seats import SeatsUnavailable, allocate_seat, allocate_seats, cabin_capacity
+from api.services.refresh_tokens import BloomFilter, RefreshTokenReused, RevocationStore
+from blockchain.outbox_worker import PolicyIssuanceWorker
+from core.cache_versions import get_version, user_scope
+from core.policy_summary import rebuild_policy_summaries
+from core.models import (
+    StatusLookup, AppUser, Flight, Booking, InsurancePolicy, PolicyIssuanceOutbox, IdempotencyKey,
+    PolicySummary, Ticket, Payment, FlightSeatInventory, InsuranceClaim
+)
+from middleware.rate_limit import RateLimitMiddleware, TokenBucketLimiter, request_user_id
+
+TX_HASH = HexBytes('0x' + 'ab' * 32)
+RESENT_TX_HASH = HexBytes('0x' + 'cd' * 32)
+
+
+class PolicyIssuanceRetryTests(TestCase):
+    def setUp(self):
+        status = StatusLookup.objects.create(statusType='policy', code='active')
+        user = AppUser.objects.create(name='Test Passenger', email='passenger@example.com')
+        now = timezone.now()
+        flight = Flight.objects.create(
+            origin='Lisbon', destination='Porto', departureTime=now, arrivalTime=now, status=status
+        )
+        booking = Booking.objects.create(user=user, flight=flight, bookingDate=now, status=status)
+        self.policy = InsurancePolicy.objects.create(
+            booking=booking, coverageAmount=Decimal('100.00'), premium=Decimal('10.00'), status=status
+        )
+        self.row = PolicyIssuanceOutbox.objects.create(
+            policy=self.policy, ticketId=1, delayThreshold=30, nextAttemptAt=now
+        )
+        self.worker = PolicyIssuanceWorker(poll_seconds=1, batch_size=10, max_attempts=5, lease_seconds=60)
+
+    def make_due(self):
+        PolicyIssuanceOutbox.objects.filter(pk=self.row.pk).update(nextAttemptAt=timezone.now() - timedelta(seconds=1))
+
+    def run_worker(self, submit, confirm, lookup=None):
+        with mock.patch('blockchain.issuance.submit_buy_policy', submit), \
+                mock.patch('blockchain.issuance.confirm_buy_policy', confirm), \
+                mock.patch('blockchain.issuance.lookup_transaction', lookup or mock.Mock()), \
+                mock.patch('blockchain.outbox_worker.blockchain_executor.submit', side_effect=lambda fn, *a: fn(*a)):
+            return self.worker.run_once()
+
+    def test_receipt_timeout_is_confirmed_on_retry_without_resending(self):
+        submit = mock.Mock(return_value=TX_HASH)
+        issued = self.run_worker(submit, mock.Mock(side_effect=TimeExhausted('not mined')))
+        self.assertEqual(issued, 0)
+
+        self.row.refresh_from_db()
+        self.assertEqual(self.row.state, PolicyIssuanceOutbox.STATE_SUBMITTED)
+        self.assertEqual(self.row.txHash, TX_HASH.to_0x_hex())
+        self.assertGreater(self.row.nextAttemptAt, timezone.now())
+
+        self.make_due()
+        lookup = mock.Mock(return_value='pending')
+        confirm = mock.Mock(return_value=(TX_HASH.to_0x_hex(), 7))
+        issued = self.run_worker(submit, confirm, lookup)
+
+        self.assertEqual(issued, 1)
+        submit.assert_called_once()
+        lookup.assert_called_once_with(TX_HASH.to_0x_hex())
+        confirm.assert_called_once_with(TX_HASH)
+        self.row.refresh_from_db()
+        self.policy.refresh_from_db()
+        self.assertEqual(self.row.state, PolicyIssuanceOutbox.STATE_ISSUED)
+        self.assertEqual(self.policy.blockchainPolicyId, 7)
+
+    def test_dropped_transaction_is_sent_again(self):
+        submit = mock.Mock(side_effect=[TX_HASH, RESENT_TX_HASH])
+        self.run_worker(submit, mock.Mock(side_effect=TimeExhausted('not mined')))
+
+        self.make_due()
+        confirm = mock.Mock(return_value=(RESENT_TX_HASH.to_0x_hex(), 8))
+        issued = self.run_worker(submit, confirm, mock.Mock(return_value='dropped'))
+
+        self.assertEqual(issued, 1)
+        self.assertEqual(submit.call_count, 2)
+        confirm.assert_called_once_with(RESENT_TX_HASH)
+        self.row.refresh_from_db()
+        self.assertEqual(self.row.txHash, RESENT_TX_HASH.to_0x_hex())
+        self.assertEqual(self.row.state, PolicyIssuanceOutbox.STATE_ISSUED)
+
+
+    def test_confirmed_hash_matches_the_stored_outbox_hash(self):
+        from blockchain.issuance import confirm_buy_policy
+
+        contract = mock.Mock()
+        contract.events.PolicyCreated.return_value.process_receipt.return_value = [{'args': {'policyId': 7}}]
+        with mock.patch('blockchain.issuance.wait_for_receipt', return_value={'status': 1}), \
+                mock.patch('blockchain.issuance.get_insurance_contract', return_value=contract):
+            self.assertEqual(confirm_buy_policy(TX_HASH), (Web3.to_hex(TX_HASH), 7))
+
+
+class IdempotencyLeaseTests(TestCase):
+    payload = {"user_id": 1, "flight_id": 2}
+
+    def setUp(self):
+        self.store = IdempotencyStore(ttl_seconds=3600, lru_size=10, lease_seconds=30)
+
+    def leave_in_progress(self, lease_expires_at):
+        return IdempotencyKey.objects.create(
+            scope='bookings.create', userId=1, key='k1', requestHash=request_fingerprint(self.payload),
+            createdAt=timezone.now(), leaseExpiresAt=lease_expires_at
+        )
+
+    def execute(self, handler, user_id=1, store=None):
+        return (store or self.store).execute('bookings.create', user_id, 'k1', self.payload, handler)
+
+    def test_live_in_progress_key_is_rejected_immediately(self):
+        self.leave_in_progress(timezone.now() + timedelta(seconds=30))
+        handler = mock.Mock()
+        with self.assertRaises(IdempotencyInProgress):
+            self.execute(handler)
+        handler.assert_not_called()
+
+    def test_stale_in_progress_key_is_taken_over(self):
+        self.leave_in_progress(timezone.now() - timedelta(seconds=1))
+        response, replayed = self.execute(lambda claim: {"booking_id": 5})
+        self.assertEqual((response, replayed), ({"booking_id": 5}, False))
+
+        row = IdempotencyKey.objects.get(scope='bookings.create', userId=1, key='k1')
+        self.assertEqual(row.state, IdempotencyKey.STATE_COMPLETED)
+        replay = IdempotencyStore(ttl_seconds=3600, lru_size=10, lease_seconds=30)
+        self.assertEqual(self.execute(mock.Mock(), store=replay), ({"booking_id": 5}, True))
+
+    def test_completion_commits_with_the_write_even_if_the_process_dies_after(self):
+        def handler(claim):
+            with transaction.atomic():
+                AppUser.objects.create(name='Booked', email='booked@example.com')
+                claim.complete({"booking_id": 5})
+            raise KeyboardInterrupt  # dies before execute() sees the response
+
+        with self.assertRaises(KeyboardInterrupt):
+            self.execute(handler)
+
+        retry = mock.Mock()
+        fresh = IdempotencyStore(ttl_seconds=3600, lru_size=10, lease_seconds=30)
+        self.assertEqual(self.execute(retry, store=fresh), ({"booking_id": 5}, True))
+        retry.assert_not_called()
+        self.assertEqual(AppUser.objects.filter(email='booked@example.com').count(), 1)
+
+    def test_handler_that_lost_its_lease_rolls_its_write_back(self):
+        def handler(claim):
+            # A retry took the key over while this handler was running
+            IdempotencyKey.objects.update(leaseExpiresAt=timezone.now() + timedelta(minutes=5))
+            with transaction.atomic():
+                AppUser.objects.create(name='Booked', email='booked@example.com')
+                claim.complete({"booking_id": 5})
+
+        with self.assertRaises(IdempotencyInProgress):
+            self.execute(handler)
+        self.assertFalse(AppUser.objects.filter(email='booked@example.com').exists())
+        self.assertEqual(IdempotencyKey.objects.get().state, IdempotencyKey.STATE_IN_PROGRESS)
+
+    def test_keys_are_scoped_to_the_caller(self):
+        self.execute(lambda claim: {"booking_id": 5}, user_id=1)
+        response, replayed = self.execute(lambda claim: {"booking_id": 6}, user_id=2)
+        self.assertEqual((response, replayed), ({"booking_id": 6}, False))
+        self.assertEqual(IdempotencyKey.objects.count(), 2)
+
+
+class PolicySummaryRefreshTests(TestCase):
+    def setUp(self):
+        status = StatusLookup.objects.create(statusType='policy', code='active')
+        self.user = AppUser.objects.create(name='Test Passenger', email='passenger@example.com')
+        now = timezone.now()
+        flight = Flight.objects.create(
+            origin='Lisbon', destination='Porto', departureTime=now, arrivalTime=now, status=status
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.booking = Booking.objects.create(user=self.user, flight=flight, bookingDate=now, status=status)
+            self.policy = InsurancePolicy.objects.create(
+                booking=self.booking, coverageAmount=Decimal('100.00'), premium=Decimal('10.00'), status=status
+            )
+
+    def test_deleting_a_policy_drops_its_summary_and_bumps_the_user(self):
+        self.assertTrue(PolicySummary.objects.filter(policy_id=self.policy.pk).exists())
+        version = get_version(user_scope(self.user.pk))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.policy.delete()
+
+        self.assertFalse(PolicySummary.objects.filter(policy_id=self.policy.pk).exists())
+        self.assertGreater(get_version(user_scope(self.user.pk)), version)
+
+    def test_rolled_back_refresh_does_not_leak_into_the_next_transaction(self):
+        with mock.patch('core.policy_summary.flush_refresh') as flush:
+            with self.captureOnCommitCallbacks(execute=True):
+                with self.assertRaises(RuntimeError), transaction.atomic():
+                    Flight.objects.filter(pk=self.booking.flight_id).get().save()
+                    raise RuntimeError('rolled back')
+                self.user.save()
+
+        flush.assert_called_once()
+        batch = flush.call_args.args[0]
+        self.assertEqual((batch.flights, batch.users), (set(), {self.user.pk}))
+
+    def test_uninsured_booking_only_bumps_the_passenger(self):
+        version = get_version(user_scope(self.user.pk))
+        with mock.patch('core.policy_summary._rebuild') as rebuild, self.captureOnCommitCallbacks(execute=True):
+            booking = Booking.objects.create(
+                user=self.user, flight=self.booking.flight, bookingDate=timezone.now(), status=self.booking.status
+            )
+            Ticket.objects.create(booking=booking, seatNumber='1A', company='Air', price=Decimal('250.00'),
+                                  issueDate=timezone.now())
+            Payment.objects.create(booking=booking, amount=Decimal('250.00'), paymentMethod='Card',
+                                   paymentDate=timezone.now(), status=self.booking.status)
+
+        rebuild.assert_not_called()
+        self.assertGreater(get_version(user_scope(self.user.pk)), version)
+
+
+class BookingSummaryTests(TestCase):
+    def setUp(self):
+        status = StatusLookup.objects.create(statusType='flight', code='Scheduled')
+        self.user = AppUser.objects.create(name='Test Passenger', email='passenger@example.com', phone='555')
+        now = timezone.now()
+        self.flight = Flight.objects.create(
+            origin='Lisbon', destination='Porto', departureTime=now, arrivalTime=now + timedelta(hours=1),
+            status=status
+        )
+
+    def assert_matches_rebuild(self, policy_id):
+        written = PolicySummary.objects.get(policy_id=policy_id).payload
+        rebuild_policy_summaries([policy_id])
+        self.assertEqual(written, PolicySummary.objects.get(policy_id=policy_id).payload)
+
+    def test_booking_writes_its_summary_without_a_rebuild(self):
+        with mock.patch('core.policy_summary._rebuild') as rebuild, self.captureOnCommitCallbacks(execute=True):
+            result = create_booking_records(self.user.user_id, self.flight.flightId, True, 'standard')
+        rebuild.assert_not_called()
+        self.assert_matches_rebuild(result.policy.policyId)
+
+    def test_batch_writes_its_summaries_without_a_rebuild(self):
+        item = mock.Mock(user_id=self.user.user_id, flight_id=self.flight.flightId, with_insurance=True,
+                         insurance_plan_id='premium', cabin='business')
+        with mock.patch('core.policy_summary._rebuild') as rebuild, self.captureOnCommitCallbacks(execute=True):
+            results, _ = create_booking_batch([item, item])
+        rebuild.assert_not_called()
+        for slot in results:
+            self.assert_matches_rebuild(slot.result.policy.policyId)
+
+
+def make_flight():
+    status = StatusLookup.objects.create(statusType='flight', code='Scheduled')
+    now = timezone.now()
+    return Flight.objects.create(
+        origin='Lisbon', destination='Porto', departureTime=now, arrivalTime=now + timedelta(hours=1), status=status
+    )
+
+
+class SeatAllocationTests(TestCase):
+    def setUp(self):
+        self.flight = make_flight()
+        self.user = AppUser.objects.create(name='Test Passenger', email='passenger@example.com', phone='555')
+
+    def inventory(self, cabin):
+        return FlightSeatInventory.objects.get(flight=self.flight, cabin=cabin)
+
+    def test_first_booking_creates_the_inventory_counting_legacy_tickets(self):
+        booking = Booking.objects.create(
+            user=self.user, flight=self.flight, bookingDate=timezone.now(),
+            status=StatusLookup.objects.create(statusType='booking', code='Confirmed')
+        )
+        Ticket.objects.create(booking=booking, seatNumber='12A', company='Global Air', price=Decimal('500'),
+                              issueDate=timezone.now(), isPremium=False)
+        self.assertFalse(FlightSeatInventory.objects.filter(flight=self.flight).exists())
+
+        self.assertEqual(allocate_seat(self.flight.flightId), '5B')
+        self.assertEqual(self.inventory('economy').seatsAvailable, cabin_capacity('economy') - 2)
+        self.assertEqual(self.inventory('business').seatsAvailable, cabin_capacity('business'))
+
+    def test_cabins_have_their_own_rows(self):
+        self.assertEqual(allocate_seat(self.flight.flightId, 'business'), '1A')
+        self.assertEqual(allocate_seat(self.flight.flightId, 'economy'), '5A')
+        self.assertEqual(allocate_seat(self.flight.flightId, 'business'), '1C')
+
+    def test_sold_out_cabin_raises(self):
+        capacity = cabin_capacity('business')
+        key = (self.flight.flightId, 'business')
+        seats = allocate_seats({key: capacity + 2})[key]
+        self.assertEqual(len(seats), capacity)
+        self.assertEqual(len(set(seats)), capacity)
+        with self.assertRaises(SeatsUnavailable):
+            allocate_seat(self.flight.flightId, 'business')
+        self.assertEqual(allocate_seat(self.flight.flightId, 'economy'), '5A')
+
+    def test_deleting_a_booking_frees_its_seat(self):
+        result = create_booking_records(self.user.user_id, self.flight.flightId, False, cabin='business')
+        other = create_booking_records(self.user.user_id, self.flight.flightId, False, cabin='business')
+        result.booking.delete()
+        self.assertEqual(self.inventory('business').seatsAvailable, cabin_capacity('business') - 1)
+        self.assertEqual(allocate_seat(self.flight.flightId, 'business'), result.ticket.seatNumber)
+        self.assertNotEqual(other.ticket.seatNumber, result.ticket.seatNumber)
+
+    def test_cancelling_a_booking_frees_its_seat_once(self):
+        result = create_booking_records(self.user.user_id, self.flight.flightId, False)
+        booking = result.booking
+        booking.status = StatusLookup.objects.create(statusType='booking', code='Cancelled')
+        booking.save()
+        booking.save()
+        self.assertEqual(self.inventory('economy').seatsAvailable, cabin_capacity('economy'))
+        # The ticket of a cancelled booking no longer holds a seat to give back
+        result.ticket.delete()
+        self.assertEqual(self.inventory('economy').seatsAvailable, cabin_capacity('economy'))
+        self.assertEqual(allocate_seat(self.flight.flightId), result.ticket.seatNumber)
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentSeatAllocationTests(TransactionTestCase):
+    def test_concurrent_bookings_never_share_a_seat(self):
+        flight_id = make_flight().flightId
+        workers, per_worker = 8, 4
+        start = threading.Barrier(workers)
+        seats, errors = [], []
+
+        def book():
+            try:
+                start.wait()
+                for _ in range(per_worker):
+                    with transaction.atomic():
+                        seats.append(allocate_seat(flight_id, 'business'))
+            except SeatsUnavailable:
+                pass
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=book) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        capacity = cabin_capacity('business')
+        self.assertEqual(len(seats), capacity)
+        self.assertEqual(len(set(seats)), capacity)
+        self.assertEqual(FlightSeatInventory.objects.get(flight_id=flight_id, cabin='business').seatsAvailable, 0)
+
+
+class BookingBatchTests(TestCase):
+    def setUp(self):
+        self.flight = make_flight()
+        for status_type, code in (('booking', 'Confirmed'), ('payment', 'Completed'), ('policy', 'Active')):
+            StatusLookup.objects.create(statusType=status_type, code=code)
+        self.users = [
+            AppUser.objects.create(name=f'Passenger {i}', email=f'passenger{i}@example.com', phone='555')
+            for i in range(10)
+        ]
+
+    def item(self, user_id, flight_id=None, with_insurance=False, cabin='economy'):
+        return mock.Mock(user_id=user_id, flight_id=flight_id or self.flight.flightId,
+                         with_insurance=with_insurance, insurance_plan_id='standard', cabin=cabin)
+
+    def test_bad_items_are_reported_and_the_rest_commit(self):
+        items = [
+            self.item(self.users[0].user_id, with_insurance=True),
+            self.item(999999),
+            self.item(self.users[1].user_id, flight_id=999999),
+            self.item(self.users[2].user_id),
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            results, _ = create_booking_batch(items)
+
+        self.assertEqual([slot.error for slot in results], [None, "User not found", "Flight not found", None])
+        self.assertIsNotNone(results[0].result.policy)
+        self.assertIsNone(results[3].result.policy)
+        self.assertEqual(Booking.objects.count(), 2)
+        self.assertEqual(Payment.objects.count(), 2)
+        self.assertEqual(InsurancePolicy.objects.count(), 1)
+        self.assertEqual(len({slot.result.ticket.seatNumber for slot in (results[0], results[3])}), 2)
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        # Warm the status registry and create the flight's seat inventory
+        create_booking_batch([self.item(self.users[0].user_id, with_insurance=True)])
+        _, small = create_booking_batch([self.item(user.user_id, with_insurance=True) for user in self.users[:2]])
+        _, large = create_booking_batch([self.item(user.user_id, with_insurance=True) for user in self.users])
+        self.assertEqual(small, large)
+
+    def test_items_past_the_cabin_capacity_are_rejected(self):
+        items = [self.item(user.user_id, cabin='business') for user in self.users] * 2
+        results, _ = create_booking_batch(items)
+        errors = [slot.error for slot in results]
+        self.assertEqual(errors.count(None), cabin_capacity('business'))
+        self.assertEqual(errors.count("No seats available"), len(items) - cabin_capacity('business'))
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        status = StatusLookup.objects.create(statusType='flight', code='Scheduled')
+        start = timezone.now().replace(microsecond=0)
+        # Pairs of flights share a departure time, so pages must break ties on flightId
+        self.flights = [
+            Flight.objects.create(
+                origin='Lisbon', destination='Porto', departureTime=start + timedelta(hours=i // 2),
+                arrivalTime=start + timedelta(hours=i // 2 + 1), status=status
+            )
+            for i in range(7)
+        ]
+
+    def test_pages_cover_every_row_once_in_key_order(self):
+        fields = ('departureTime', 'flightId')
+        seen, cursor_values, pages = [], None, 0
+        while True:
+            rows, cursor = paginate(Flight.objects.all(), fields, cursor_values, 3)
+            seen += [flight.flightId for flight in rows]
+            pages += 1
+            if cursor is None:
+                break
+            cursor_values = decode_cursor(cursor, (datetime.fromisoformat, int))
+        self.assertEqual(pages, 3)
+        self.assertEqual(seen, [flight.flightId for flight in self.flights])
+
+    def test_an_exactly_full_last_page_has_no_cursor(self):
+        rows, cursor = paginate(Flight.objects.all(), ('departureTime', 'flightId'), None, 7)
+        self.assertEqual(len(rows), 7)
+        self.assertIsNone(cursor)
+
+    def test_tampered_cursors_are_rejected(self):
+        parsers = (datetime.fromisoformat, int)
+        for token in ('not-a-cursor', encode_cursor(1), encode_cursor('yesterday', 3)):
+            with self.assertRaises(InvalidCursor):
+                decode_cursor(token, parsers)
+
+
+class LedgerPageTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now().replace(microsecond=0)
+        flight = make_flight()
+        booking_status = StatusLookup.objects.create(statusType='booking', code='Confirmed')
+        paid = StatusLookup.objects.create(statusType='payment', code='Completed')
+        active = StatusLookup.objects.create(statusType='policy', code='Active')
+        self.user, other = [
+            AppUser.objects.create(name=name, email=f'{name}@example.com', phone='555') for name in ('ana', 'rui')
+        ]
+        self.expected = []
+        for user in (self.user, other):
+            booking = Booking.objects.create(user=user, flight=flight, bookingDate=self.now, status=booking_status)
+            policy = InsurancePolicy.objects.create(
+                booking=booking, coverageAmount=Decimal('500'), premium=Decimal('25'), status=active
+            )
+            for days in (3, 1):
+                payment = Payment.objects.create(
+                    booking=booking, amount=Decimal('100'), paymentMethod='Credit Card',
+                    paymentDate=self.now - timedelta(days=days), status=paid
+                )
+                if user == self.user:
+                    self.expected.append((days, PAYMENT, payment.paymentId))
+            for days in (2, 0):
+                claim = InsuranceClaim.objects.create(
+                    policy=policy, delayDuration=3, claimStatus='Paid', payoutAmount=Decimal('500'),
+                    claimDate=self.now - timedelta(days=days)
+                )
+                if user == self.user:
+                    self.expected.append((days, CLAIM, claim.claimId))
+        self.expected.sort()
+
+    def keys(self, rows):
+        return [(kind, entry_id) for _, kind, entry_id in rows]
+
+    def test_payments_and_claims_merge_newest_first_across_pages(self):
+        seen, cursor_values = [], None
+        while True:
+            rows, cursor = ledger_page(self.user.user_id, None, None, cursor_values, 3)
+            seen += rows
+            if cursor is None:
+                break
+            cursor_values = decode_cursor(cursor, (datetime.fromisoformat, str, int))
+        self.assertEqual(self.keys(seen), [(kind, entry_id) for _, kind, entry_id in self.expected])
+
+    def test_date_range_is_inclusive_of_both_days(self):
+        today = timezone.localdate(self.now)
+        start, end = day_bounds(today - timedelta(days=2), today - timedelta(days=1))
+        rows, cursor = ledger_page(self.user.user_id, start, end, None, 10)
+        self.assertIsNone(cursor)
+        self.assertEqual(
+            self.keys(rows), [(kind, entry_id) for days, kind, entry_id in self.expected if days in (1, 2)]
+        )
+
+
+class RateLimitUserTests(SimpleTestCase):
+    claims = {"sub": "passenger", "user_id": 3, "django_user_id": 7}
+
+    def scope(self, authorization=None, query=b""):
+        headers = [(b"authorization", authorization.encode())] if authorization else []
+        return {"headers": headers, "query_string": query}
+
+    def test_refresh_token_in_query_string_names_the_user(self):
+        token = create_refresh_token(self.claims)
+        self.assertEqual(request_user_id(self.scope(query=f"refresh_token={token}".encode())), 7)
+
+    def test_only_access_tokens_count_as_bearer_tokens(self):
+        self.assertEqual(request_user_id(self.scope(f"Bearer {create_access_token(self.claims)}")), 7)
+        self.assertIsNone(request_user_id(self.scope(f"Bearer {create_refresh_token(self.claims)}")))
+        access_in_query = f"refresh_token={create_access_token(self.claims)}".encode()
+        self.assertIsNone(request_user_id(self.scope(query=access_in_query)))
+
+
+class TokenBucketLimiterTests(SimpleTestCase):
+    rule = {"ip": [1, 2], "user": [0.5, 3]}
+
+    def setUp(self):
+        self.limiter = TokenBucketLimiter({"/api/": {"ip": [10, 10]}, "/api/bookings": self.rule}, 60, 1000)
+        self.clock = mock.patch('middleware.rate_limit.time.monotonic', return_value=100.0)
+        self.now = self.clock.start()
+        self.addCleanup(self.clock.stop)
+
+    def test_longest_prefix_wins(self):
+        self.assertEqual(self.limiter.match("/api/bookings/batch"), ("/api/bookings", self.rule))
+        self.assertEqual(self.limiter.match("/api/flights/")[0], "/api/")
+        self.assertIsNone(self.limiter.match("/admin/"))
+
+    def test_burst_then_wait_for_a_refill(self):
+        self.assertEqual(self.limiter.check("/api/bookings", self.rule, "1.2.3.4", None), 0)
+        self.assertEqual(self.limiter.check("/api/bookings", self.rule, "1.2.3.4", None), 0)
+        self.assertAlmostEqual(self.limiter.check("/api/bookings", self.rule, "1.2.3.4", None), 1.0)
+        self.now.return_value = 101.0
+        self.assertEqual(self.limiter.check("/api/bookings", self.rule, "1.2.3.4", None), 0)
+        self.assertEqual(self.limiter.metrics()["rejected"], 1)
+
+    def test_user_bucket_is_shared_across_addresses(self):
+        for ip in ("10.0.0.1", "10.0.0.2", "10.0.0.3"):
+            self.assertEqual(self.limiter.check("/api/bookings", self.rule, ip, 7), 0)
+        self.assertAlmostEqual(self.limiter.check("/api/bookings", self.rule, "10.0.0.4", 7), 2.0)
+        self.assertEqual(self.limiter.check("/api/bookings", self.rule, "10.0.0.4", 8), 0)
+
+    def test_rejected_requests_spend_no_tokens(self):
+        for _ in range(3):
+            self.limiter.check("/api/bookings", self.rule, "1.2.3.4", 7)
+        self.now.return_value = 101.0
+        # The IP bucket refilled one token; the user bucket (3 burst) still has one left
+        self.assertEqual(self.limiter.check("/api/bookings", self.rule, "1.2.3.4", 7), 0)
+
+    def test_full_buckets_are_evicted(self):
+        self.limiter.check("/api/bookings", self.rule, "1.2.3.4", 7)
+        self.limiter.evict(101.0)
+        self.assertEqual(self.limiter.metrics()["buckets"], 1)  # the user bucket needs 2s
+        self.limiter.evict(102.0)
+        self.assertEqual(self.limiter.metrics()["buckets"], 0)
+
+    def test_middleware_answers_429_without_calling_the_app(self):
+        app = mock.AsyncMock()
+        middleware = RateLimitMiddleware(app, self.limiter)
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "path": "/api/bookings/", "headers": [], "query_string": b"",
+                 "client": ("1.2.3.4", 5000)}
+        with self.settings(RATE_LIMIT_ENABLED=True, RATE_LIMIT_TRUST_FORWARDED_FOR=False):
+            for _ in range(3):
+                asyncio.run(middleware(scope, None, send))
+
+        self.assertEqual(app.await_count, 2)
+        self.assertEqual(sent[0]["status"], 429)
+        self.assertIn((b"retry-after", b"1"), sent[0]["headers"])
+
+
+class RevocationRebuildTests(TestCase):
+    def setUp(self):
+        self.store = RevocationStore(1000, 0.01, 100, sync_seconds=0, purge_seconds=0)
+        self.store.revoke_family('fam-before')
+
+    def test_requests_never_rebuild_once_loaded(self):
+        with mock.patch.object(self.store, '_rebuild') as rebuild:
+            self.assertTrue(self.store.is_revoked('fam-before'))
+            self.assertFalse(self.store.is_revoked('fam-other'))
+        rebuild.assert_not_called()
+
+    def test_keys_remembered_during_a_rebuild_survive_the_swap(self):
+        def revoke_mid_scan(*args):
+            # Stands in for a revocation committed after the scan's snapshot
+            with self.store._lock:
+                self.store._remember('fam-during', timezone.now() + timedelta(days=1))
+            return BloomFilter(*args)
+
+        with mock.patch('api.services.refresh_tokens.BloomFilter', side_effect=revoke_mid_scan), \
+                self.store._refresh_lock:
+            self.store._rebuild()
+
+        self.assertIn('fam-during', self.store._bloom)
+        self.assertIn('fam-before', self.store._bloom)
+        self.assertTrue(self.store.is_revoked('fam-during'))
+
+
+class LegacyRefreshTokenTests(TestCase):
+    def setUp(self):
+        self.store = RevocationStore(1000, 0.01, 100, sync_seconds=0, purge_seconds=0)
+        # Issued before rotation: no jti, no family
+        self.expires = timezone.now() + timedelta(days=1)
+        self.token = jwt.encode(
+            {"sub": "passenger", "user_id": 3, "exp": self.expires, "type": "refresh"},
+            settings.SECRET_KEY, algorithm="HS256"
+        )
+
+    def test_legacy_token_is_accepted_with_ids_derived_from_it(self):
+        payload = decode_refresh_token(self.token)
+        again = decode_refresh_token(self.token)
+        self.assertEqual((payload["jti"], payload["fam"]), (again["jti"], again["fam"]))
+        self.assertNotEqual(payload["jti"], payload["fam"])
+
+    def test_legacy_token_refreshes_only_once(self):
+        payload = decode_refresh_token(self.token)
+        self.store.spend(payload["jti"], payload["fam"], self.expires)
+        with self.assertRaises(RefreshTokenReused):
+            self.store.spend(payload["jti"], payload["fam"], self.expires)
+        # The replay revokes the family the first refresh started
+        self.assertTrue(self.store.is_revoked(payload["fam"]))
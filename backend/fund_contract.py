@@ -4,6 +4,7 @@ import os
 sys.path.insert(0, os.path.dirname(__file__))
 
 from blockchain.contract_loader import w3, load_deployed_addresses, get_token_contract
+from blockchain.receipt_waiter import wait_for_receipt
 import json
 from pathlib import Path
 
@@ -34,13 +35,13 @@ approve_tx = token.functions.approve(
     addresses['companyFunding'],
     funding_amount
 ).transact({'from': deployer})
-w3.eth.wait_for_transaction_receipt(approve_tx)
+wait_for_receipt(approve_tx)
 print(f"✅ Approval granted!")
 
 # Step 2: Call fundCompany to deposit into company balance
 print(f"\n📝 Depositing tokens into company balance...")
 fund_tx = company_funding.functions.fundCompany(funding_amount).transact({'from': deployer})
-receipt = w3.eth.wait_for_transaction_receipt(fund_tx)
+receipt = wait_for_receipt(fund_tx)
 
 if receipt['status'] == 1:
     print(f"✅ Company pool funded successfully!")
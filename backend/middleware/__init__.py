@@ -1,4 +1,5 @@
 """Middleware package"""
 from .logging_middleware import AccessLogMiddleware, log_blockchain_transaction, log_security_event
+from .rate_limit import RateLimitMiddleware, rate_limiter
 
-__all__ = ['AccessLogMiddleware', 'log_blockchain_transaction', 'log_security_event']
+__all__ = ['AccessLogMiddleware', 'RateLimitMiddleware', 'rate_limiter', 'log_blockchain_transaction', 'log_security_event']
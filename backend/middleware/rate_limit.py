@@ -0,0 +1,176 @@
+"""
+Token-bucket rate limiting as pure ASGI middleware.
+
+Requests are matched to the longest configured path prefix in
+``RATE_LIMIT_RULES`` and charged one token from a per-client-IP bucket and,
+for requests with a valid bearer access token (or a valid ``refresh_token``
+query parameter, which is how /api/auth/refresh and /logout take it), a
+per-user bucket. When either
+bucket is empty the request is answered ``429`` with ``Retry-After`` right
+here, before routing, so it never reaches FastAPI handlers, Django or the ORM.
+
+Buckets are ``[tokens, last_update, full_at]`` lists in one dict, refilled
+lazily on use. Everything runs on the event loop thread, so no locks are
+needed. Buckets that have refilled completely are indistinguishable from
+absent ones and are swept every ``RATE_LIMIT_EVICT_SECONDS`` (or sooner
+once ``RATE_LIMIT_MAX_BUCKETS`` is reached). Limits are per process.
+"""
+import json
+import math
+import time
+from urllib.parse import parse_qsl
+
+import jwt
+from django.conf import settings
+
+REJECTION_BODY = json.dumps({"detail": "Too many requests"}).encode()
+
+
+class TokenBucketLimiter:
+    def __init__(self, rules, evict_seconds, max_buckets):
+        # {prefix: {"ip": [rate_per_second, burst], "user": [rate_per_second, burst]}}
+        self.rules = sorted(rules.items(), key=lambda item: len(item[0]), reverse=True)
+        self.evict_seconds = evict_seconds
+        self.max_buckets = max_buckets
+        self._buckets = {}
+        self._evicted_at = time.monotonic()
+        self._next_evict = self._evicted_at + evict_seconds
+        self.allowed = 0
+        self.rejected = 0
+        self.evicted = 0
+
+    def match(self, path):
+        for prefix, rule in self.rules:
+            if path.startswith(prefix):
+                return prefix, rule
+        return None
+
+    def _refill(self, key, rate, burst, now):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(burst), now, now]
+        else:
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        return bucket
+
+    def check(self, prefix, rule, ip, user_id):
+        """Take a token from each applicable bucket; returns 0, or seconds until a retry can pass."""
+        now = time.monotonic()
+        # A full table forces an early sweep, at most once a second
+        if now >= self._next_evict or (len(self._buckets) >= self.max_buckets and now >= self._evicted_at + 1):
+            self.evict(now)
+
+        limits = []
+        if ip is not None and "ip" in rule:
+            limits.append((f"{prefix}|ip|{ip}", *rule["ip"]))
+        if user_id is not None and "user" in rule:
+            limits.append((f"{prefix}|user|{user_id}", *rule["user"]))
+
+        buckets = [(self._refill(key, rate, burst, now), rate, burst) for key, rate, burst in limits]
+        wait = max([(1 - bucket[0]) / rate for bucket, rate, _ in buckets if bucket[0] < 1], default=0.0)
+        if wait:
+            self.rejected += 1
+        else:
+            self.allowed += 1
+            for bucket, rate, burst in buckets:
+                bucket[0] -= 1
+        for bucket, rate, burst in buckets:
+            bucket[2] = now + (burst - bucket[0]) / rate
+        return wait
+
+    def evict(self, now=None):
+        """Drop buckets that have refilled to capacity."""
+        now = time.monotonic() if now is None else now
+        full = [key for key, bucket in self._buckets.items() if bucket[2] <= now]
+        for key in full:
+            del self._buckets[key]
+        self.evicted += len(full)
+        self._evicted_at = now
+        self._next_evict = now + self.evict_seconds
+
+    def metrics(self):
+        return {
+            "buckets": len(self._buckets),
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "evicted": self.evicted,
+        }
+
+
+def client_ip(scope):
+    if settings.RATE_LIMIT_TRUST_FORWARDED_FOR:
+        for name, value in scope["headers"]:
+            if name == b"x-forwarded-for":
+                # Right-most entry: the one our own proxy appended
+                return value.decode("latin-1").rsplit(",", 1)[-1].strip()
+    client = scope.get("client")
+    return client[0] if client else None
+
+
+def _token_user_id(token, token_type):
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+    except jwt.PyJWTError:
+        return None
+    if payload.get("type") != token_type:
+        return None
+    return payload.get("django_user_id", payload.get("user_id"))
+
+
+def bearer_user_id(scope):
+    """User id of a valid access token in the Authorization header, else None."""
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer" or not token:
+                return None
+            return _token_user_id(token, "access")
+    return None
+
+
+def refresh_token_user_id(scope):
+    """User id of a valid refresh token in the ``refresh_token`` query parameter, else None."""
+    for name, value in parse_qsl(scope.get("query_string", b"").decode("latin-1")):
+        if name == "refresh_token":
+            return _token_user_id(value, "refresh")
+    return None
+
+
+def request_user_id(scope):
+    return bearer_user_id(scope) or refresh_token_user_id(scope)
+
+
+class RateLimitMiddleware:
+    def __init__(self, app, limiter=None):
+        self.app = app
+        self.limiter = limiter or rate_limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.RATE_LIMIT_ENABLED:
+            return await self.app(scope, receive, send)
+        matched = self.limiter.match(scope["path"])
+        if matched is None:
+            return await self.app(scope, receive, send)
+
+        prefix, rule = matched
+        user_id = request_user_id(scope) if "user" in rule else None
+        wait = self.limiter.check(prefix, rule, client_ip(scope), user_id)
+        if not wait:
+            return await self.app(scope, receive, send)
+
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(REJECTION_BODY)).encode()),
+                (b"retry-after", str(math.ceil(wait)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": REJECTION_BODY})
+
+
+rate_limiter = TokenBucketLimiter(
+    settings.RATE_LIMIT_RULES, settings.RATE_LIMIT_EVICT_SECONDS, settings.RATE_LIMIT_MAX_BUCKETS
+)
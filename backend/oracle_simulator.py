@@ -19,11 +19,109 @@ sys.path.insert(0, str(Path(__file__).parent))
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 django.setup()
 
+from django.db import transaction
+from django.utils import timezone
 from core.models import Flight, InsurancePolicy, StatusLookup
-from blockchain.contract_loader import get_insurance_contract, get_default_account, w3, load_deployed_addresses
+from blockchain.contract_loader import get_insurance_contract, w3, load_deployed_addresses
+from blockchain.nonce_manager import get_nonce_manager
+from blockchain.receipt_waiter import wait_for_receipt
 from loguru import logger
 import argparse
-from datetime import datetime
+
+def submit_settlement(policy, delay_minutes, show_consensus=False):
+    """
+    Send settlePolicy for a policy without waiting for it to be mined.
+
+    Returns the transaction hash, or None when the policy cannot be settled.
+    Nonces for the oracle account come from the shared NonceManager, so many
+    settlements can be in flight at once.
+    """
+    contract = get_insurance_contract()
+
+    # Get oracle account (Account #1 from Hardhat)
+    addresses = load_deployed_addresses()
+    oracle_address = addresses.get('oracle') if addresses else None
+    nonces = get_nonce_manager()
+
+    if not contract or not oracle_address or not w3 or not nonces:
+        logger.error("❌ Blockchain not available")
+        return None
+
+    # Get blockchain policy ID from database (CRITICAL!)
+    blockchain_policy_id = policy.blockchainPolicyId
+
+    if not blockchain_policy_id:
+        logger.error(f"❌ Policy {policy.policyId} has no blockchain policy ID - was not created on blockchain!")
+        return None
+
+    if show_consensus:
+        logger.info(f"[PoW Layer] Settling blockchain policy {blockchain_policy_id} (DB policy {policy.policyId}) with {delay_minutes} minutes delay...")
+    else:
+        logger.info(f"🔍 Settling blockchain policy {blockchain_policy_id} (DB policy {policy.policyId}) with {delay_minutes} minutes delay...")
+
+    # Call settlePolicy on smart contract
+    return nonces.transact(
+        contract.functions.settlePolicy(
+            blockchain_policy_id,  # Use BLOCKCHAIN policy ID, not database ID!
+            delay_minutes
+        ),
+        oracle_address
+    )
+
+
+def finalize_settlement(policy, tx_hash, show_consensus=False):
+    """Wait for a settlePolicy transaction and record the payout in the database."""
+    # Wait for transaction
+    receipt = wait_for_receipt(tx_hash)
+
+    # Check if successful
+    if receipt['status'] != 1:
+        logger.error("❌ Transaction failed")
+        return False
+
+    if show_consensus:
+        logger.info(f"[PoW Layer] Policy settled successfully!")
+    else:
+        logger.info(f"✅ Policy settled successfully!")
+    logger.info(f"   Transaction: {tx_hash.hex()}")
+    logger.info(f"   Gas used: {receipt['gasUsed']}")
+
+    # Update policy status in database
+    claimed_status, _ = StatusLookup.objects.get_or_create(
+        code='Claimed',
+        statusType='policy'
+    )
+
+    # Create payment record for the payout
+    from core.models import Payment
+
+    completed_status, _ = StatusLookup.objects.get_or_create(
+        code='Completed',
+        statusType='payment'
+    )
+
+    # One transaction, so the passenger's policy summary and cached
+    # policy/transaction views are invalidated once, with both rows in place
+    with transaction.atomic():
+        policy.status = claimed_status
+        policy.save()
+
+        Payment.objects.create(
+            booking=policy.booking,
+            amount=policy.coverageAmount,
+            paymentMethod='Blockchain Payout',
+            paymentDate=timezone.now(),
+            status=completed_status
+        )
+
+    if show_consensus:
+        logger.info(f"[PoS Layer] Database updated: Policy {policy.policyId} marked as Claimed")
+        logger.info(f"[PoS Layer] Payout transaction recorded: ${policy.coverageAmount}")
+    else:
+        logger.info(f"✅ Database updated: Policy {policy.policyId} marked as Claimed")
+        logger.info(f"💰 Payout transaction recorded: ${policy.coverageAmount}")
+    return True
+
 
 def settle_policy_on_chain(policy, delay_minutes, show_consensus=False):
     """
@@ -34,83 +132,10 @@ def settle_policy_on_chain(policy, delay_minutes, show_consensus=False):
         delay_minutes: Actual delay in minutes
     """
     try:
-        contract = get_insurance_contract()
-        
-        # Get oracle account (Account #1 from Hardhat)
-        addresses = load_deployed_addresses()
-        oracle_address = addresses.get('oracle')
-        
-        if not contract or not oracle_address or not w3:
-            logger.error("❌ Blockchain not available")
-            return False
-        
-        # Get blockchain policy ID from database (CRITICAL!)
-        blockchain_policy_id = policy.blockchainPolicyId
-        
-        if not blockchain_policy_id:
-            logger.error(f"❌ Policy {policy.policyId} has no blockchain policy ID - was not created on blockchain!")
-            return False
-        
-        if show_consensus:
-            logger.info(f"[PoW Layer] Settling blockchain policy {blockchain_policy_id} (DB policy {policy.policyId}) with {delay_minutes} minutes delay...")
-        else:
-            logger.info(f"🔍 Settling blockchain policy {blockchain_policy_id} (DB policy {policy.policyId}) with {delay_minutes} minutes delay...")
-        
-        # Call settlePolicy on smart contract
-        tx_hash = contract.functions.settlePolicy(
-            blockchain_policy_id,  # Use BLOCKCHAIN policy ID, not database ID!
-            delay_minutes
-        ).transact({'from': oracle_address})
-        
-        # Wait for transaction
-        receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-        
-        # Check if successful
-        if receipt['status'] == 1:
-            if show_consensus:
-                logger.info(f"[PoW Layer] Policy settled successfully!")
-            else:
-                logger.info(f"✅ Policy settled successfully!")
-            logger.info(f"   Transaction: {tx_hash.hex()}")
-            logger.info(f"   Gas used: {receipt['gasUsed']}")
-            
-            # Update policy status in database
-            claimed_status, _ = StatusLookup.objects.get_or_create(
-                code='Claimed',
-                statusType='policy'
-            )
-            
-            policy.status = claimed_status
-            policy.save()
-            
-            # Create payment record for the payout
-            from core.models import Payment
-            from datetime import datetime
-            
-            completed_status, _ = StatusLookup.objects.get_or_create(
-                code='Completed',
-                statusType='payment'
-            )
-            
-            Payment.objects.create(
-                booking=policy.booking,
-                amount=policy.coverageAmount,
-                paymentMethod='Blockchain Payout',
-                paymentDate=datetime.now(),
-                status=completed_status
-            )
-            
-            if show_consensus:
-                logger.info(f"[PoS Layer] Database updated: Policy {policy.policyId} marked as Claimed")
-                logger.info(f"[PoS Layer] Payout transaction recorded: ${policy.coverageAmount}")
-            else:
-                logger.info(f"✅ Database updated: Policy {policy.policyId} marked as Claimed")
-                logger.info(f"💰 Payout transaction recorded: ${policy.coverageAmount}")
-            return True
-        else:
-            logger.error("❌ Transaction failed")
+        tx_hash = submit_settlement(policy, delay_minutes, show_consensus)
+        if tx_hash is None:
             return False
-            
+        return finalize_settlement(policy, tx_hash, show_consensus)
     except Exception as e:
         logger.error(f"❌ Failed to settle policy: {e}")
         return False
@@ -146,7 +171,9 @@ def simulate_flight_delay(flight_id, delay_minutes, show_consensus=False):
         
         logger.info(f"🔍 Found {policies.count()} active insurance policies")
         
-        settled_count = 0
+        # Submit every eligible settlement first, then wait for the receipts,
+        # so N payouts take about one block instead of N blocks.
+        pending = []
         for policy in policies:
             logger.info(f"\n{'='*60}")
             logger.info(f"Policy #{policy.policyId}")
@@ -162,15 +189,32 @@ def simulate_flight_delay(flight_id, delay_minutes, show_consensus=False):
                 logger.info(f"  ✅ Delay ({delay_minutes}m) >= Threshold ({threshold}m)")
                 logger.info(f"  💰 Triggering payout of ${policy.coverageAmount}...")
                 
-                if settle_policy_on_chain(policy, delay_minutes, show_consensus):
-                    settled_count += 1
-                    logger.info(f"  ✅ PAYOUT SUCCESSFUL!")
+                try:
+                    tx_hash = submit_settlement(policy, delay_minutes, show_consensus)
+                except Exception as e:
+                    logger.error(f"❌ Failed to settle policy: {e}")
+                    tx_hash = None
+                if tx_hash is not None:
+                    pending.append((policy, tx_hash))
                 else:
                     logger.warning(f"  ⚠️  Payout failed (check blockchain)")
             else:
                 logger.info(f"  ℹ️  Delay ({delay_minutes}m) < Threshold ({threshold}m)")
                 logger.info(f"  No payout triggered")
         
+        settled_count = 0
+        for policy, tx_hash in pending:
+            try:
+                settled = finalize_settlement(policy, tx_hash, show_consensus)
+            except Exception as e:
+                logger.error(f"❌ Failed to settle policy: {e}")
+                settled = False
+            if settled:
+                settled_count += 1
+                logger.info(f"  ✅ Policy #{policy.policyId} PAYOUT SUCCESSFUL!")
+            else:
+                logger.warning(f"  ⚠️  Policy #{policy.policyId} payout failed (check blockchain)")
+        
         logger.info(f"\n{'='*60}")
         logger.info(f"🎉 Settlement complete!")
         logger.info(f"   {settled_count}/{policies.count()} policies paid out")
@@ -0,0 +1,44 @@
+"""
+Standalone runner for the policy issuance outbox worker.
+
+Usage:
+    python policy_outbox_worker.py          # run forever
+    python policy_outbox_worker.py --once   # drain due rows and exit
+"""
+
+import os
+import sys
+import time
+import argparse
+import django
+from pathlib import Path
+
+# Setup Django
+sys.path.insert(0, str(Path(__file__).parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from blockchain.outbox_worker import get_worker
+from loguru import logger
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Policy issuance outbox worker')
+    parser.add_argument('--once', action='store_true', help='Drain due rows and exit')
+    args = parser.parse_args()
+
+    worker = get_worker()
+    if args.once:
+        logger.info(f"✅ Issued {worker.run_once()} policies")
+        return
+
+    worker.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        worker.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -4,6 +4,7 @@ import os
 sys.path.insert(0, os.path.dirname(__file__))
 
 from blockchain.contract_loader import w3, load_deployed_addresses
+from blockchain.receipt_waiter import wait_for_receipt
 import json
 from pathlib import Path
 
@@ -20,12 +21,12 @@ deployer = w3.eth.accounts[0]
 print("🔧 Granting COMPANY_ROLE to deployer...")
 company_role = contract.functions.COMPANY_ROLE().call()
 tx = contract.functions.grantRole(company_role, deployer).transact({'from': deployer})
-w3.eth.wait_for_transaction_receipt(tx)
+wait_for_receipt(tx)
 print("✅ Role granted!")
 
 print("📝 Registering DEMO_FLIGHT...")
 tx = contract.functions.registerFlight('DEMO_FLIGHT', 1700000000).transact({'from': deployer})
-receipt = w3.eth.wait_for_transaction_receipt(tx)
+receipt = wait_for_receipt(tx)
 
 if receipt['status'] == 1:
     print("✅ DEMO_FLIGHT registered successfully!")
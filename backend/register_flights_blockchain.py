@@ -8,6 +8,7 @@ import os
 sys.path.insert(0, os.path.dirname(__file__))
 
 from blockchain.contract_loader import w3, load_deployed_addresses
+from blockchain.receipt_waiter import get_receipt_waiter
 from web3 import Web3
 import json
 from pathlib import Path
@@ -36,6 +37,8 @@ def register_test_flight():
     """Register a generic test flight that always exists."""
     contract = get_ticket_provider()
     deployer = w3.eth.accounts[0]
+    waiter = get_receipt_waiter()
+    pending = []
     
     # Register a wildcard flight that accepts any ID starting with "FLIGHT"
     # For demo purposes, we'll register several common flight IDs
@@ -60,7 +63,11 @@ def register_test_flight():
             deployer  # company address
         ).transact({'from': deployer})
         
-        receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+        # Don't block per flight: the shared waiter resolves them all per block
+        pending.append((flight_id, waiter.submit(tx_hash)))
+    
+    for flight_id, future in pending:
+        receipt = future.result(timeout=120)
         
         if receipt['status'] == 1:
             print(f"  ✅ Registered {flight_id}")